@@ -0,0 +1,130 @@
+import asyncio
+import math
+import os
+import re
+import time
+import logging
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from prometheus_client import Counter
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Requests that walk the whole universe or many symbols; everything else is cheap
+# and is never queued, so /api/stocks and friends keep their latency while screens run
+HEAVY_ROUTES: List[Tuple[str, re.Pattern]] = [
+    ('POST', re.compile(r"^/api/screen$")),
+    ('POST', re.compile(r"^/api/screen/stream$")),
+    ('POST', re.compile(r"^/api/stocks/batch$")),
+    ('POST', re.compile(r"^/api/export$")),
+]
+
+# Heavy requests running at once; the rest of the threadpool stays free for cheap ones
+HEAVY_SLOTS = int(os.environ.get('ADMISSION_HEAVY_SLOTS', max(1, (os.cpu_count() or 2) // 2)))
+
+# Heavy requests allowed to wait for a slot; beyond this they get 429 straight away
+HEAVY_QUEUE = int(os.environ.get('ADMISSION_QUEUE', 8))
+
+# Longest a heavy request waits for a slot before it gets 429
+QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 5))
+
+SHED = Counter('screener_requests_shed', 'Heavy requests rejected with 429 by admission control', ['route'])
+
+class AdmissionController:
+    """Bounded concurrency with a bounded FIFO queue for heavy requests
+
+    Up to `slots` heavy requests run at once and up to `queue` more wait,
+    each for at most `timeout` seconds. A request that finds the queue full
+    or times out in it is rejected; `retry_after()` estimates when a slot
+    is likely to be free from recent heavy request durations.
+    """
+
+    def __init__(self, slots: int = HEAVY_SLOTS, queue: int = HEAVY_QUEUE, timeout: float = QUEUE_TIMEOUT):
+        self.slots = slots
+        self.queue = queue
+        self.timeout = timeout
+        self.running = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        # Moving average of heavy request durations, seeded with one second
+        self.average = 1.0
+        self.admitted = 0
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if needed; False means shed the request"""
+        if self.running < self.slots and not self.waiters:
+            self.running += 1
+            self.admitted += 1
+            return True
+        if len(self.waiters) >= self.queue:
+            self.rejected += 1
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        except BaseException:
+            # Cancelled (client gone) just after being handed a slot: pass the slot on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        self.admitted += 1
+        return True
+
+    def release(self, seconds: Optional[float] = None):
+        """Give the slot to the longest waiter, or free it"""
+        if seconds is not None:
+            self.average += 0.2 * (seconds - self.average)
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                # The slot moves to the waiter, so `running` is unchanged
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead should have drained, at least 1"""
+        return max(1, math.ceil(self.average * (len(self.waiters) + 1) / max(1, self.slots)))
+
+admission = AdmissionController()
+
+def is_heavy(scope) -> bool:
+    return any(scope['method'] == method and route.match(scope['path']) for method, route in HEAVY_ROUTES)
+
+class AdmissionMiddleware:
+    """Send heavy requests through `controller` and answer shed ones with 429 and Retry-After
+
+    The slot is held until the response body has been sent, so a streamed
+    screen counts against capacity for as long as it streams.
+    """
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not is_heavy(scope):
+            return await self.app(scope, receive, send)
+        controller = self.controller or admission
+        if not await controller.acquire():
+            SHED.labels(scope['path']).inc()
+            retry_after = controller.retry_after()
+            logger.warning(f"Shed {scope['method']} {scope['path']}: {controller.running} running, "
+                           f"{len(controller.waiters)} queued; retry after {retry_after}s")
+            response = JSONResponse({"detail": "Server busy, retry later"}, status_code=429,
+                                    headers={"Retry-After": str(retry_after)})
+            return await response(scope, receive, send)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(time.perf_counter() - start)
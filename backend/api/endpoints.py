@@ -1,23 +1,95 @@
-from fastapi import APIRouter, HTTPException, Query, Body
-from typing import List, Dict, Any
-from models.schemas import StockResponse, IndicatorRequest, ScreenerRequest
-from scripts.indicators import TechnicalIndicators
+from fastapi import APIRouter, HTTPException, Query, Body, Response, WebSocket
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Dict, Any, Callable, Optional
+from models.schemas import StockResponse, IndicatorRequest, ScreenerRequest, BatchRequest, BatchResponse, HistoryResponse, SavedScreenRequest, ExportRequest
+from scripts.panel import PriceSeries, day_strings, latest_indicators
+from scripts.shared_panel import panel_for
+from scripts.history import INDICATORS, load_history, to_arrow
+from scripts.versioning import current_version, default_db_path
+from scripts.metrics import register_cache, stage
+from scripts.saved_screens import save_screen, delete_screen, list_screens, get_screen, get_changes
+from scripts.screener import ScreenRun, all_symbols, cached_cross_section, parse_fields, parse_sort, screens_all, section_cache, validate_criteria
+from starlette.concurrency import run_in_threadpool
+from api.singleflight import SingleFlight
+from api.live import hub
+import json
 import logging
-import yfinance as yf
+import os
+import sqlite3
+import time
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
-indicators = TechnicalIndicators()
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that records its encoding time as the serialize stage"""
+
+    def render(self, content: Any) -> bytes:
+        with stage("serialize"):
+            return super().render(content)
+
+router = APIRouter(default_response_class=TimedJSONResponse)
+
+# Upper bound on symbols per batch request
+MAX_BATCH_SYMBOLS = 2000
+
+# Prices only change when ingestion runs, so history responses can be cached for a while
+HISTORY_CACHE_CONTROL = "public, max-age=300"
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Upper bound on screen matches per page
+MAX_SCREEN_LIMIT = 1000
+
+# Seconds a screen may scan before it answers with the matches found so far
+SCREEN_DEADLINE = float(os.environ.get('SCREEN_DEADLINE', 10))
+MAX_SCREEN_DEADLINE = 60
+
+# Concurrent identical requests share one Yahoo download or screen run
+yahoo_history = SingleFlight("yahoo_history")
+screens = SingleFlight("screen")
+
+register_cache("cross_section", section_cache.counts)
+register_cache("singleflight_yahoo_history", lambda: (yahoo_history.shared, yahoo_history.calls))
+register_cache("singleflight_screen", lambda: (screens.shared, screens.calls))
+
+def _json_floats(values: np.ndarray) -> List:
+    """Convert an array to a JSON-safe list with NaN as None"""
+    return [None if v != v else float(v) for v in values.tolist()]
+
+def _deadline(seconds: Optional[float]) -> float:
+    """perf_counter time at which a screen stops scanning"""
+    return time.perf_counter() + (SCREEN_DEADLINE if seconds is None else seconds)
+
+def _yahoo_history(symbol: str, period: str):
+    """Download price history from Yahoo"""
+    # yfinance (and pandas with it) only loads once a request needs Yahoo
+    import yfinance as yf
+    with stage("upstream_fetch"):
+        return yf.Ticker(symbol).history(period=period)
+
+async def _shared_history(symbol: str, period: str = "1y"):
+    """Yahoo history for a symbol, shared with concurrent requests for the same symbol"""
+    df = await yahoo_history.do((symbol, period), _yahoo_history, symbol, period)
+    # Callers rename columns, so each gets its own copy
+    return df.copy()
+
+def _stock_list(db_path: str) -> List[str]:
+    """Every stored symbol, or none for a database that has no prices yet"""
+    with stage("db_read"):
+        try:
+            return all_symbols(db_path)
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            return []
 
 @router.get("/stocks")
 async def get_stocks():
     """Get list of available stocks"""
     try:
         # Get stocks from database
-        indicators = TechnicalIndicators()
-        stocks = indicators.get_all_stocks()
-        return stocks
+        return await run_in_threadpool(_stock_list, default_db_path())
     except Exception as e:
         logger.error(f"Error getting stocks: {str(e)}")
         raise HTTPException(status_code=500, detail="Error getting stocks")
@@ -27,36 +99,33 @@ async def get_stock_data(symbol: str):
     """Get stock data with technical indicators"""
     try:
         # Get stock data using yfinance
-        stock = yf.Ticker(symbol)
-        df = stock.history(period="1y")
+        df = await _shared_history(symbol)
         
         if df.empty:
             raise HTTPException(status_code=404, detail=f"No data found for stock {symbol}")
             
-        # Rename columns to lowercase for consistency
-        df.columns = df.columns.str.lower()
-        
-        # Initialize indicators
-        indicators = TechnicalIndicators()
+        # Leave pandas at the boundary; the kernels work on the arrays
+        series = PriceSeries.from_frame(df, symbol)
         
         # Calculate indicators
-        rsi = indicators.calculate_rsi(df)
-        macd, signal, _ = indicators.calculate_macd(df)
-        mas = indicators.calculate_moving_averages(df)
+        with stage("compute"):
+            rsi = series.rsi()
+            macd, signal, _ = series.macd()
+            mas = series.moving_averages()
         
         # Create response
         response = {
             "symbol": symbol,
-            "price": float(df['close'].iloc[-1]),
-            "date": df.index[-1].strftime('%Y-%m-%d'),
+            "price": float(series.close[-1]),
+            "date": series.last_date(),
             "indicators": {
-                "RSI": float(rsi.iloc[-1]),
+                "RSI": float(rsi[-1]),
                 "MACD": {
-                    "macd": float(macd.iloc[-1]),
-                    "signal": float(signal.iloc[-1])
+                    "macd": float(macd[-1]),
+                    "signal": float(signal[-1])
                 },
                 "MA": {
-                    k: float(v.iloc[-1]) for k, v in mas.items()
+                    k: float(v[-1]) for k, v in mas.items()
                 }
             }
         }
@@ -66,49 +135,124 @@ async def get_stock_data(symbol: str):
         logger.error(f"Error getting stock data for {symbol}: {str(e)}")
         raise HTTPException(status_code=404, detail=f"Error getting data for stock {symbol}")
 
+@router.get("/stocks/{symbol}/history", response_model=HistoryResponse)
+async def get_stock_history(
+    symbol: str,
+    response: Response,
+    start: Optional[str] = Query(None, description="First date, YYYY-MM-DD"),
+    end: Optional[str] = Query(None, description="Last date, YYYY-MM-DD"),
+    indicators: str = Query(",".join(INDICATORS), description="Comma-separated indicators"),
+    points: Optional[int] = Query(None, ge=3, description="Downsample to this many bars with LTTB"),
+    format: str = Query("json", pattern="^(json|arrow)$")
+):
+    """Get OHLCV and indicator series for a date range"""
+    try:
+        names = [name for name in indicators.split(",") if name]
+        history = load_history(default_db_path(), symbol, start, end, names, points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting history for {symbol}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error getting history for stock {symbol}")
+    if history is None:
+        raise HTTPException(status_code=404, detail=f"No data found for stock {symbol}")
+
+    headers = {"Cache-Control": HISTORY_CACHE_CONTROL}
+    if format == "arrow":
+        try:
+            with stage("serialize"):
+                body = to_arrow(history)
+        except ImportError:
+            raise HTTPException(status_code=406, detail="Arrow output requires pyarrow on the server")
+        return Response(content=body, media_type=ARROW_MEDIA_TYPE, headers=headers)
+
+    response.headers.update(headers)
+    return {
+        "symbol": history["symbol"],
+        "total": history["total"],
+        "date": day_strings(history["date"]),
+        **{field: _json_floats(history[field]) for field in ("open", "high", "low", "close", "volume")},
+        "indicators": {
+            name: {k: _json_floats(v) for k, v in value.items()} if isinstance(value, dict) else _json_floats(value)
+            for name, value in history["indicators"].items()
+        }
+    }
+
+@router.post("/stocks/batch", response_model=BatchResponse)
+async def get_stocks_batch(request: BatchRequest):
+    """Get latest price and indicators for many stocks from one panel read"""
+    if len(request.symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SYMBOLS} symbols per batch")
+    unknown = set(request.indicators) - set(INDICATORS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown indicators: {sorted(unknown)}")
+    try:
+        panel, latest = panel_for(default_db_path(), request.symbols)
+        if latest is not None:
+            values = {name: latest[name] for name in ("RSI", "MACD", "MA") if name in request.indicators}
+        else:
+            with stage("compute"):
+                values = latest_indicators(panel, request.indicators)
+        
+        # Keep only symbols that have data, in request order
+        found = np.flatnonzero(panel.lengths > 0)
+        dates = panel.latest_dates()
+        response = {
+            "symbols": [panel.symbols[j] for j in found],
+            "price": _json_floats(panel.latest()[found]),
+            "date": [dates[j] for j in found],
+            "indicators": {},
+            "missing": [panel.symbols[j] for j in np.flatnonzero(panel.lengths == 0)]
+        }
+        for name, value in values.items():
+            if isinstance(value, dict):
+                response["indicators"][name] = {k: _json_floats(v[found]) for k, v in value.items()}
+            else:
+                response["indicators"][name] = _json_floats(value[found])
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error getting batch stock data: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error getting batch stock data")
+
 @router.post("/analyze", response_model=Dict[str, Any])
 async def analyze_stock(request: IndicatorRequest):
     """Analyze a stock with specified indicators"""
     try:
         # Get stock data using yfinance
-        stock = yf.Ticker(request.symbol)
-        df = stock.history(period="1y")
+        df = await _shared_history(request.symbol)
         
         if df.empty:
             logger.warning(f"No data found for stock {request.symbol}")
             raise HTTPException(status_code=404, detail=f"No data found for stock {request.symbol}")
             
-        # Rename columns to lowercase for consistency
-        df.columns = df.columns.str.lower()
-        
-        # Initialize indicators
-        indicators = TechnicalIndicators()
+        # Leave pandas at the boundary; the kernels work on the arrays
+        series = PriceSeries.from_frame(df, request.symbol)
             
         # Calculate requested indicators
         response = {
             "symbol": request.symbol,
-            "price": float(df['close'].iloc[-1]),
-            "date": df.index[-1].strftime('%Y-%m-%d'),
+            "price": float(series.close[-1]),
+            "date": series.last_date(),
             "indicators": {}
         }
         
-        if "RSI" in request.indicators:
-            rsi = indicators.calculate_rsi(df)
-            response["indicators"]["RSI"] = float(rsi.iloc[-1])
-            
-        if "MACD" in request.indicators:
-            macd, signal, hist = indicators.calculate_macd(df)
-            response["indicators"]["MACD"] = {
-                "macd": float(macd.iloc[-1]),
-                "signal": float(signal.iloc[-1]),
-                "histogram": float(hist.iloc[-1])
-            }
-            
-        if "MA" in request.indicators:
-            mas = indicators.calculate_moving_averages(df)
-            response["indicators"]["MA"] = {
-                k: float(v.iloc[-1]) for k, v in mas.items()
-            }
+        with stage("compute"):
+            if "RSI" in request.indicators:
+                response["indicators"]["RSI"] = float(series.rsi()[-1])
+                
+            if "MACD" in request.indicators:
+                macd, signal, hist = series.macd()
+                response["indicators"]["MACD"] = {
+                    "macd": float(macd[-1]),
+                    "signal": float(signal[-1]),
+                    "histogram": float(hist[-1])
+                }
+                
+            if "MA" in request.indicators:
+                response["indicators"]["MA"] = {
+                    k: float(v[-1]) for k, v in series.moving_averages().items()
+                }
             
         return response
         
@@ -121,68 +265,209 @@ async def analyze_stock(request: IndicatorRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/screen")
-async def screen_stocks(criteria: Dict = Body(...)):
-    """Screen stocks based on technical indicators"""
+async def screen_stocks(
+    response: Response,
+    criteria: Dict = Body(...),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_SCREEN_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort_by: Optional[str] = Query(None, description="Column to sort by, prefixed with '-' for descending"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return for each match"),
+    deadline: Optional[float] = Query(None, gt=0, le=MAX_SCREEN_DEADLINE,
+                                      description="Seconds to scan before returning partial results")
+):
+    """Screen stocks based on technical indicators
+
+    A screen that isn't cached and runs past its deadline returns the
+    matches found so far with "complete": false and how many symbols were
+    scanned. Partial results are sent with Cache-Control: no-store.
+    """
+    try:
+        validate_criteria(criteria)
+        parse_sort(sort_by)
+        field_names = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    paged = any(option is not None for option in (limit, cursor, sort_by, fields))
+    
     try:
-        # Initialize indicators
-        indicators = TechnicalIndicators()
+        db_path = default_db_path()
         
-        # If no criteria or show_all is true, return all stocks
-        if not criteria or criteria.get('show_all', False):
-            stocks = indicators.get_all_stocks()
-            return {"stocks": stocks}
+        # Listing every stock needs no indicators
+        if not paged and screens_all(criteria):
+            return {"stocks": all_symbols(db_path)}
             
-        # Get all stocks from database
-        stocks = indicators.get_all_stocks()
+        # Identical criteria against the same data version share one run and one cached result.
+        # A caller that joined a run cut short by someone else's deadline runs again on its own
+        criteria_json = json.dumps(criteria, sort_keys=True)
+        version = current_version(db_path)["version"]
+        until = _deadline(deadline)
+        section = await screens.do((criteria_json, version), cached_cross_section, db_path, criteria_json, version,
+                                   until)
+        while not section.complete and time.perf_counter() < until:
+            section = await screens.do((criteria_json, version), cached_cross_section, db_path, criteria_json,
+                                       version, until)
+        rows, next_cursor = section.page(limit, sort_by, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in screen_stocks: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
         
-        # Screen stocks based on criteria
-        screened_stocks = []
-        for symbol in stocks:
+    result = {"stocks": section.symbols[rows].tolist()}
+    if paged:
+        result["total"] = len(section)
+        result["next_cursor"] = next_cursor
+    if field_names:
+        result["results"] = section.records(rows, field_names)
+    if not section.complete:
+        result["complete"] = False
+        result["scanned"] = section.summary["scanned"]
+        response.headers["Cache-Control"] = "no-store"
+    return result
+
+def _ndjson(record: Dict) -> str:
+    return json.dumps(record) + "\n"
+
+def _sse(event: str, record: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(record)}\n\n"
+
+@router.post("/screen/stream")
+async def stream_screen(
+    criteria: Dict = Body(...),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    deadline: Optional[float] = Query(None, gt=0, le=MAX_SCREEN_DEADLINE,
+                                      description="Seconds to scan before ending the stream early")
+):
+    """Stream screen matches as they are found, ending with a summary record
+
+    The summary's "complete" is false when the deadline cut the scan short.
+    """
+    try:
+        run = ScreenRun(default_db_path(), criteria, deadline=_deadline(deadline))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def records():
+        # One write per evaluated chunk keeps the first match early without a write per row
+        for matches in run.chunks():
+            with stage("serialize"):
+                if format == "sse":
+                    chunk = "".join(_sse("match", record) for record in matches)
+                else:
+                    chunk = "".join(_ndjson({"type": "match", **record}) for record in matches)
+            yield chunk
+        summary = run.summary()
+        yield _sse("summary", summary) if format == "sse" else _ndjson({"type": "summary", **summary})
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(records(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@router.post("/export")
+async def export_prices(
+    request: ExportRequest,
+    format: str = Query("csv", pattern="^(csv|parquet)$")
+):
+    """Stream OHLCV rows for many symbols as one CSV or Parquet download
+
+    Rows are read off a database cursor a batch at a time and sent as they
+    are encoded, so memory stays flat however much is exported. With
+    criteria the screen runs alongside the export and each chunk of
+    matches is exported as soon as it is found.
+    """
+    from datetime import date
+    from scripts.columnar import PARQUET_MEDIA_TYPE, STREAM_BATCH_ROWS, csv_stream, iter_price_rows, parquet_stream
+
+    if request.symbols is not None and request.criteria is not None:
+        raise HTTPException(status_code=400, detail="Give either symbols or criteria, not both")
+    for name in ("start", "end"):
+        value = getattr(request, name)
+        if value is not None:
             try:
-                # Get stock data from database
-                df = indicators.get_stock_data(symbol)
-                
-                if df.empty:
-                    continue
-                    
-                # Check if stock meets all criteria
-                meets_criteria = True
-                
-                # Check RSI criteria
-                if 'RSI' in criteria:
-                    rsi = indicators.calculate_rsi(df)
-                    if 'below' in criteria['RSI']:
-                        meets_criteria = meets_criteria and (rsi.iloc[-1] < criteria['RSI']['below'])
-                    if 'above' in criteria['RSI']:
-                        meets_criteria = meets_criteria and (rsi.iloc[-1] > criteria['RSI']['above'])
-                
-                # Check MACD criteria
-                if 'MACD' in criteria:
-                    macd, signal, hist = indicators.calculate_macd(df)
-                    if criteria['MACD'].get('signal') == 'bullish':
-                        meets_criteria = meets_criteria and (hist.iloc[-1] > 0 and hist.iloc[-2] <= 0)
-                    elif criteria['MACD'].get('signal') == 'bearish':
-                        meets_criteria = meets_criteria and (hist.iloc[-1] < 0 and hist.iloc[-2] >= 0)
-                
-                # Check MA criteria
-                if 'MA' in criteria:
-                    mas = indicators.calculate_moving_averages(df)
-                    for ma_type, ma_criteria in criteria['MA'].items():
-                        if ma_type in mas:
-                            if ma_criteria == 'price_above':
-                                meets_criteria = meets_criteria and (df['close'].iloc[-1] > mas[ma_type].iloc[-1])
-                            elif ma_criteria == 'price_below':
-                                meets_criteria = meets_criteria and (df['close'].iloc[-1] < mas[ma_type].iloc[-1])
-                
-                if meets_criteria:
-                    screened_stocks.append(symbol)
-                    
-            except Exception as e:
-                logger.error(f"Error screening stock {symbol}: {str(e)}")
-                continue
-                
-        return {"stocks": screened_stocks}
-        
+                date.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid {name} date {value!r}, expected YYYY-MM-DD")
+
+    db_path = default_db_path()
+    groups = None
+    if request.symbols is not None:
+        groups = [request.symbols]
+    elif request.criteria is not None:
+        try:
+            validate_criteria(request.criteria)
+            run = None if screens_all(request.criteria) else ScreenRun(db_path, request.criteria)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if run is not None:
+            groups = ([match["symbol"] for match in matches] for matches in run.chunks())
+
+    batches = iter_price_rows(db_path, groups, request.start, request.end, STREAM_BATCH_ROWS)
+    if format == "parquet":
+        body, media_type = parquet_stream(batches), PARQUET_MEDIA_TYPE
+    else:
+        body, media_type = csv_stream(batches), "text/csv"
+    headers = {"Content-Disposition": f'attachment; filename="stock_prices.{format}"', "Cache-Control": "no-store"}
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+def _on_screens(query: Callable, *args):
+    """Run a saved-screen query on its own connection; called through run_in_threadpool"""
+    with sqlite3.connect(default_db_path()) as conn:
+        return query(conn, *args)
+
+def _changes_of(conn: sqlite3.Connection, name: str, since: int, limit: Optional[int]) -> Optional[List[Dict]]:
+    return None if get_screen(conn, name) is None else get_changes(conn, name, since, limit)
+
+def _delete_if_present(conn: sqlite3.Connection, name: str) -> bool:
+    try:
+        return delete_screen(conn, name)
+    except sqlite3.OperationalError:
+        return False
+
+@router.get("/screens")
+async def get_saved_screens():
+    """List saved screens with their member counts"""
+    return await run_in_threadpool(_on_screens, list_screens)
+
+@router.post("/screens")
+async def create_saved_screen(request: SavedScreenRequest):
+    """Save a named screen; its membership is kept up to date by each ingest"""
+    if not request.name.strip() or '/' in request.name:
+        raise HTTPException(status_code=400, detail="Screen name must be non-empty and contain no '/'")
+    try:
+        return await run_in_threadpool(save_screen, default_db_path(), request.name, request.criteria)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error in screen_stocks: {str(e)}")
+        logger.error(f"Error saving screen {request.name}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/screens/{name}")
+async def get_saved_screen(name: str):
+    """Current members of a saved screen, read from storage without re-screening"""
+    screen = await run_in_threadpool(_on_screens, get_screen, name)
+    if screen is None:
+        raise HTTPException(status_code=404, detail=f"No saved screen named {name}")
+    return screen
+
+@router.get("/screens/{name}/changes")
+async def get_saved_screen_changes(
+    name: str,
+    since: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_SCREEN_LIMIT)
+):
+    """Symbols that entered or left a saved screen after data version `since`"""
+    changes = await run_in_threadpool(_on_screens, _changes_of, name, since, limit)
+    if changes is None:
+        raise HTTPException(status_code=404, detail=f"No saved screen named {name}")
+    return {"name": name, "changes": changes}
+
+@router.delete("/screens/{name}")
+async def delete_saved_screen(name: str):
+    """Delete a saved screen and its history"""
+    if not await run_in_threadpool(_on_screens, _delete_if_present, name):
+        raise HTTPException(status_code=404, detail=f"No saved screen named {name}")
+    return {"deleted": name}
+
+@router.websocket("/ws")
+async def live_updates(websocket: WebSocket):
+    """Push changed latest values and screen membership diffs after each data publish"""
+    await hub.serve(websocket)
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import logging
+import sqlite3
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from scripts.shared_panel import panel_for
+from scripts.saved_screens import get_changes, get_screen
+from scripts.screener import INDICATORS, ScreenRun, evaluate, match_record, validate_criteria
+from scripts.versioning import current_version, default_db_path
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the published version; a stat call each time
+POLL_INTERVAL = 0.5
+
+def latest_values(db_path: str, symbols: Iterable[str]) -> Dict[str, Dict]:
+    """Latest price, date and indicators for each symbol that has data"""
+    panel, latest = panel_for(db_path, sorted(set(symbols)))
+    result = evaluate(panel, {}, INDICATORS, latest)
+    dates = panel.latest_dates()
+    return {panel.symbols[j]: match_record(panel, j, result['values'], dates)
+            for j in range(len(panel)) if result['match'][j]}
+
+def screen_members(db_path: str, criteria: Dict, symbols: Optional[Iterable[str]] = None) -> Set[str]:
+    """Symbols matching the criteria, among `symbols` or the whole universe"""
+    return {record['symbol'] for record in ScreenRun(db_path, criteria, symbols)}
+
+def _read_saved_screen(db_path: str, name: str) -> Optional[Dict]:
+    with sqlite3.connect(db_path) as conn:
+        return get_screen(conn, name)
+
+def _version_number(version: Optional[str]) -> Optional[int]:
+    """Publish number of a version, or None for the file-based version of an unpublished database"""
+    return int(version) if version is not None and version.isdigit() else None
+
+def _saved_changes(db_path: str, names: Iterable[str], since: int, version: int) -> Dict[str, tuple]:
+    """Net entries and exits stored for each saved screen after `since`, up to `version`
+
+    A symbol that entered and left again in between is in neither list.
+    """
+    result = {}
+    with sqlite3.connect(db_path) as conn:
+        for name in names:
+            first, last = {}, {}
+            for c in get_changes(conn, name, since):
+                if c['version'] <= version:
+                    first.setdefault(c['symbol'], c['change'])
+                    last[c['symbol']] = c['change']
+            net = {symbol: change for symbol, change in last.items() if first[symbol] == change}
+            result[name] = (sorted(s for s, change in net.items() if change == 'entered'),
+                            sorted(s for s, change in net.items() if change == 'exited'))
+    return result
+
+class Subscriber:
+    """One WebSocket connection and what it is subscribed to"""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.symbols: Set[str] = set()
+        # Screen id chosen by the client -> canonical criteria JSON
+        self.screens: Dict[str, str] = {}
+        # Names of saved screens, whose diffs are read from storage
+        self.saved: Set[str] = set()
+
+    async def send(self, message: Dict):
+        await self.websocket.send_json(message)
+
+class UpdateHub:
+    """Push changed latest values and screen membership diffs after each publish
+
+    While anyone is connected, the hub watches the published data version.
+    When it changes, values are recomputed only for subscribed symbols the
+    publish touched, and each distinct subscribed screen is re-evaluated on
+    those symbols only; the work is shared by all subscribers.
+    """
+
+    def __init__(self, db_path: Callable[[], str] = default_db_path, interval: float = POLL_INTERVAL):
+        self.db_path = db_path
+        self.interval = interval
+        self.subscribers: Set[Subscriber] = set()
+        # Current membership per canonical criteria JSON
+        self.members: Dict[str, Set[str]] = {}
+        self.version: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def serve(self, websocket: WebSocket):
+        """Run one client connection until it disconnects"""
+        await websocket.accept()
+        subscriber = Subscriber(websocket)
+        self.subscribers.add(subscriber)
+        if self._task is None or self._task.done() or self._task.get_loop() is not asyncio.get_running_loop():
+            self.version = current_version(self.db_path())['version']
+            self._task = asyncio.ensure_future(self._watch())
+        try:
+            while True:
+                text = await websocket.receive_text()
+                try:
+                    await self._handle(subscriber, json.loads(text))
+                except ValueError as e:
+                    await subscriber.send({'type': 'error', 'detail': str(e)})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            self._forget_unused_screens()
+
+    async def _handle(self, subscriber: Subscriber, message: Dict):
+        if not isinstance(message, dict):
+            raise ValueError("Messages must be JSON objects")
+        action = message.get('action')
+        if action not in ('subscribe', 'unsubscribe'):
+            raise ValueError(f"Unknown action {action!r}")
+        db_path = self.db_path()
+
+        symbols = message.get('symbols') or []
+        if not isinstance(symbols, list) or not all(isinstance(symbol, str) for symbol in symbols):
+            raise ValueError("symbols must be a list of strings")
+        if action == 'subscribe' and symbols:
+            subscriber.symbols.update(symbols)
+            values = await run_in_threadpool(latest_values, db_path, symbols)
+            await subscriber.send({'type': 'snapshot', 'version': self.version, 'values': values})
+        elif symbols:
+            subscriber.symbols.difference_update(symbols)
+
+        screen = message.get('screen')
+        if screen and not isinstance(screen, (str, dict)):
+            raise ValueError("screen must be an id or an object with an id and criteria")
+        if action == 'subscribe' and screen:
+            if (not isinstance(screen, dict) or not isinstance(screen.get('id'), str)
+                    or not isinstance(screen.get('criteria') or {}, dict)):
+                raise ValueError("A screen subscription needs an id and criteria")
+            key = json.dumps(validate_criteria(screen.get('criteria') or {}), sort_keys=True)
+            subscriber.screens[screen['id']] = key
+            if key not in self.members:
+                self.members[key] = await run_in_threadpool(screen_members, db_path, json.loads(key))
+            await subscriber.send({'type': 'screen', 'id': screen['id'], 'version': self.version,
+                                   'members': sorted(self.members[key])})
+        elif screen:
+            subscriber.screens.pop(screen if isinstance(screen, str) else screen.get('id'), None)
+            self._forget_unused_screens()
+
+        saved = message.get('saved_screen')
+        if saved and not isinstance(saved, str):
+            raise ValueError("saved_screen must be a screen name")
+        if action == 'subscribe' and saved:
+            screen = await run_in_threadpool(_read_saved_screen, db_path, saved)
+            if screen is None:
+                raise ValueError(f"No saved screen named {saved}")
+            subscriber.saved.add(saved)
+            await subscriber.send({'type': 'saved_screen', 'name': saved, 'version': self.version,
+                                   'members': screen['members']})
+        elif saved:
+            subscriber.saved.discard(saved)
+
+    def _forget_unused_screens(self):
+        used = {key for subscriber in self.subscribers for key in subscriber.screens.values()}
+        for key in set(self.members) - used:
+            del self.members[key]
+
+    async def _watch(self):
+        while self.subscribers:
+            await asyncio.sleep(self.interval)
+            version = current_version(self.db_path())
+            if version['version'] == self.version:
+                continue
+            since, self.version = self.version, version['version']
+            try:
+                await self.broadcast(version, since)
+            except Exception as e:
+                logger.error(f"Error pushing updates for version {self.version}: {str(e)}")
+
+    async def broadcast(self, version: Dict, since: Optional[str] = None):
+        """Send each subscriber what changed since version `since` was pushed
+
+        The marker only lists the symbols of the latest publish, so when
+        versions were skipped between polls (or either version is not a
+        publish number) every subscribed symbol and screen is re-evaluated.
+        """
+        db_path = self.db_path()
+        current, previous = _version_number(version['version']), _version_number(since)
+        consecutive = current is not None and previous is not None and current == previous + 1
+        changed = None if version.get('symbols') is None or not consecutive else set(version['symbols'])
+
+        wanted = set().union(*(s.symbols for s in self.subscribers)) if self.subscribers else set()
+        if changed is not None:
+            wanted &= changed
+        values = await run_in_threadpool(latest_values, db_path, wanted) if wanted else {}
+
+        diffs = {}
+        for key, members in list(self.members.items()):
+            matched = await run_in_threadpool(screen_members, db_path, json.loads(key), changed)
+            rescreened = members if changed is None else members & changed
+            entered, exited = matched - members, rescreened - matched
+            self.members[key] = (members - exited) | entered
+            diffs[key] = (sorted(entered), sorted(exited))
+
+        # Saved screens were already re-evaluated by the ingest; just read what it stored
+        # Saved screens only change on a publish; an unpublished database has none to send
+        names = set().union(*(s.saved for s in self.subscribers)) if self.subscribers else set()
+        saved = {}
+        if names and current is not None:
+            start = previous if previous is not None and previous < current else current - 1
+            saved = await run_in_threadpool(_saved_changes, db_path, names, start, current)
+
+        for subscriber in list(self.subscribers):
+            messages: List[Dict] = []
+            mine = {symbol: values[symbol] for symbol in subscriber.symbols if symbol in values}
+            if mine:
+                messages.append({'type': 'update', 'version': self.version, 'values': mine})
+            for screen_id, key in subscriber.screens.items():
+                entered, exited = diffs.get(key, ([], []))
+                if entered or exited:
+                    messages.append({'type': 'screen_diff', 'id': screen_id, 'version': self.version,
+                                     'entered': entered, 'exited': exited})
+            for name in subscriber.saved:
+                entered, exited = saved.get(name, ([], []))
+                if entered or exited:
+                    messages.append({'type': 'saved_screen_diff', 'name': name, 'version': self.version,
+                                     'entered': entered, 'exited': exited})
+            try:
+                for message in messages:
+                    await subscriber.send(message)
+            except Exception:
+                # The connection's own receive loop will notice and clean up
+                logger.debug("Dropping update for a closed connection")
+
+hub = UpdateHub()
@@ -0,0 +1,79 @@
+import time
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Histogram, generate_latest
+from starlette.datastructures import MutableHeaders
+from starlette.routing import BaseRoute, Match
+
+from scripts.metrics import STAGES, IngestCollector, request_timings
+from scripts.versioning import default_db_path
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram('screener_request_duration_seconds', 'HTTP request latency by route',
+                            ['method', 'route', 'status'])
+
+REGISTRY.register(IngestCollector(default_db_path))
+
+router = APIRouter()
+
+def server_timing(timings: dict, total: float) -> str:
+    """Server-Timing header value with each stage's time and the total, in milliseconds"""
+    parts = [f"{name};dur={timings[name] * 1000:.1f}" for name in STAGES if name in timings]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+class MetricsMiddleware:
+    """Record each HTTP request's latency under its route template
+
+    Using the template (/api/stocks/{symbol}) rather than the raw path keeps
+    the label set bounded. Requests answered before routing, such as a 304
+    from the cache middleware, are matched against `routes` afterwards;
+    anything that matches no route is recorded as "unmatched".
+
+    Every response also gets a Server-Timing header breaking the time up to
+    the response start into the stages timed while handling it. Stages that
+    run while a streamed body is being sent aren't included.
+    """
+
+    def __init__(self, app, routes: List[BaseRoute]):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+        timings = {}
+        token = request_timings.set(timings)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                MutableHeaders(scope=message).append(
+                    'Server-Timing', server_timing(timings, time.perf_counter() - start))
+            await send(message)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_timings.reset(token)
+            REQUEST_LATENCY.labels(scope['method'], self._route(scope), str(status)).observe(
+                time.perf_counter() - start)
+
+    def _route(self, scope) -> str:
+        route: Optional[BaseRoute] = scope.get('route')
+        if route is None:
+            for candidate in self.routes:
+                if candidate.matches(scope)[0] == Match.FULL:
+                    route = candidate
+                    break
+        return getattr(route, 'path', None) or 'unmatched'
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of request, stage, cache and ingestion metrics"""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,269 @@
+import hashlib
+import re
+import zlib
+import logging
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+from scripts.metrics import CacheStats, register_cache
+from scripts.versioning import current_version, default_db_path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Routes answered purely from the database; their ETag is the published data version
+VERSIONED_ROUTES = [
+    re.compile(r"^/api/stocks$"),
+    re.compile(r"^/api/stocks/batch$"),
+    re.compile(r"^/api/stocks/[^/]+/history$"),
+    re.compile(r"^/api/screen$"),
+]
+
+# Versioned responses may be stored but must be revalidated, which is a cheap 304
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+# Versioned requests answered with 304 count as hits
+revalidations = CacheStats()
+register_cache('etag', revalidations.counts)
+
+# Responses smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+# Bodies that are compressed already; a second pass only costs CPU
+PRECOMPRESSED_TYPES = ('application/vnd.apache.parquet',)
+
+async def _read_body(receive) -> Tuple[bytes, Callable]:
+    """Read the whole request body and return it with a receive that replays it"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    body = b''.join(chunks)
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        return await receive()
+    return body, replay
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    bare = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == bare for tag in if_none_match.split(','))
+
+def _not_modified_since(if_modified_since: Optional[str], published_at: Optional[str]) -> bool:
+    if not if_modified_since or not published_at:
+        return False
+    try:
+        return datetime.fromisoformat(published_at).replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+class ConditionalCacheMiddleware:
+    """ETag / Last-Modified validation keyed on the published data version
+
+    For database-backed routes the ETag is the data version plus a digest
+    of the request, so If-None-Match is answered with 304 from a stat call
+    without running the endpoint. Other GET responses get an ETag hashed
+    from their body, which saves the transfer but not the work.
+    """
+
+    def __init__(self, app, db_path: Callable[[], str] = default_db_path):
+        self.app = app
+        self.db_path = db_path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD', 'POST'):
+            return await self.app(scope, receive, send)
+        versioned = any(route.match(scope['path']) for route in VERSIONED_ROUTES)
+        if versioned:
+            return await self._versioned(scope, receive, send)
+        if scope['method'] == 'GET':
+            return await self._hashed(scope, receive, send)
+        return await self.app(scope, receive, send)
+
+    async def _versioned(self, scope, receive, send):
+        request_headers = Headers(scope=scope)
+        body = b''
+        if scope['method'] == 'POST':
+            body, receive = await _read_body(receive)
+        version = current_version(self.db_path())
+        digest = hashlib.blake2b(digest_size=8)
+        for part in (scope['method'], scope['path'], scope['query_string'], body):
+            digest.update(part if isinstance(part, bytes) else part.encode())
+            digest.update(b'\0')
+        etag = f'W/"{version["version"]}-{digest.hexdigest()}"'
+        headers = {'ETag': etag, 'Vary': 'Accept-Encoding'}
+        if version['published_at']:
+            headers['Last-Modified'] = format_datetime(datetime.fromisoformat(version['published_at']), usegmt=True)
+
+        if_none_match = request_headers.get('if-none-match')
+        not_modified = _etag_matches(if_none_match, etag) or (
+            if_none_match is None and scope['method'] != 'POST'
+            and _not_modified_since(request_headers.get('if-modified-since'), version['published_at']))
+        revalidations.record(not_modified)
+        if not_modified:
+            headers['Cache-Control'] = DEFAULT_CACHE_CONTROL
+            return await Response(status_code=304, headers=headers)(scope, receive, send)
+
+        async def send_with_validators(message):
+            if message['type'] == 'http.response.start' and message['status'] == 200:
+                response_headers = MutableHeaders(scope=message)
+                # Partial results (a screen cut short by its deadline) must not be revalidated as current
+                if 'no-store' in response_headers.get('cache-control', ''):
+                    return await send(message)
+                for name, value in headers.items():
+                    response_headers[name] = value
+                if 'cache-control' not in response_headers:
+                    response_headers['Cache-Control'] = DEFAULT_CACHE_CONTROL
+            await send(message)
+        await self.app(scope, receive, send_with_validators)
+
+    async def _hashed(self, scope, receive, send):
+        if_none_match = Headers(scope=scope).get('if-none-match')
+        start = None
+        chunks: List[bytes] = []
+
+        async def send_hashed(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                if message['status'] != 200:
+                    start = False
+                    await send(message)
+                else:
+                    start = message
+                return
+            if start is False:
+                return await send(message)
+            chunks.append(message.get('body', b''))
+            if message.get('more_body', False):
+                # Streaming bodies can't be hashed up front; pass them through
+                if start is not None:
+                    await send(start)
+                    start = False
+                for chunk in chunks[:-1]:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                await send(message)
+                chunks.clear()
+                return
+            body = b''.join(chunks)
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            if _etag_matches(if_none_match, etag):
+                await send({'type': 'http.response.start', 'status': 304,
+                            'headers': [(b'etag', etag.encode())]})
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+            MutableHeaders(scope=start)['ETag'] = etag
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+        await self.app(scope, receive, send_hashed)
+
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick brotli or gzip from an Accept-Encoding header, honouring q=0"""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in (['br'] if brotli is not None else []) + ['gzip']:
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+class _Compressor:
+    """Incremental gzip or brotli encoder that can flush between chunks"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._br = brotli.Compressor(quality=4)
+        else:
+            self._gz = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == 'br':
+            out = self._br.process(data)
+            return out + (self._br.finish() if final else self._br.flush())
+        out = self._gz.compress(data)
+        return out + self._gz.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class CompressionMiddleware:
+    """Negotiate brotli or gzip for responses of at least `minimum_size` bytes
+
+    Streamed responses are compressed chunk by chunk with a flush after
+    each one, so clients still see rows as they are produced.
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        encoding = _accepted_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message['type'] == 'http.response.start':
+                start = message
+                headers = Headers(raw=message['headers'])
+                passthrough = ('content-encoding' in headers
+                               or headers.get('content-type', '').startswith(PRECOMPRESSED_TYPES))
+                if passthrough:
+                    await send(message)
+                return
+            if passthrough or message['type'] != 'http.response.body':
+                return await send(message)
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+                compressor = _Compressor(encoding)
+                headers = MutableHeaders(scope=start)
+                headers['Content-Encoding'] = encoding
+                headers.add_vary_header('Accept-Encoding')
+                del headers['Content-Length']
+                if not more_body:
+                    body = compressor.compress(body, final=True)
+                    headers['Content-Length'] = str(len(body))
+                    await send(start)
+                    return await send({'type': 'http.response.body', 'body': body})
+                await send(start)
+            await send({'type': 'http.response.body', 'body': compressor.compress(body, final=not more_body),
+                        'more_body': more_body})
+        await self.app(scope, receive, send_compressed)
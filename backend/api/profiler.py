@@ -0,0 +1,148 @@
+import hmac
+import os
+import random
+import time
+import uuid
+import logging
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from starlette.datastructures import Headers, MutableHeaders
+
+from models.schemas import ProfilerSettings
+from scripts.metrics import request_timings
+from scripts.profiling import Profile, current_profile, sampler
+
+logger = logging.getLogger(__name__)
+
+# Most recent slow-request profiles kept in memory
+MAX_PROFILES = 50
+
+# Requests under these paths are never profiled, so reading profiles doesn't add more
+UNPROFILED_PREFIXES = ('/api/admin', '/metrics')
+
+def admin_token() -> Optional[str]:
+    """Token that unlocks the admin endpoints; they are disabled when ADMIN_TOKEN is unset"""
+    return os.environ.get('ADMIN_TOKEN') or None
+
+def is_admin(token: Optional[str]) -> bool:
+    expected = admin_token()
+    return expected is not None and token is not None and hmac.compare_digest(token, expected)
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if admin_token() is None:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+class Profiler:
+    """Which requests get profiled, and the profiles worth keeping"""
+
+    def __init__(self):
+        self.settings = ProfilerSettings()
+        self.profiles: Deque[Dict] = deque(maxlen=MAX_PROFILES)
+
+    def keep(self, record: Dict):
+        self.profiles.append(record)
+        logger.info("Kept profile %s for %s %s (%.0f ms)", record['id'], record['method'], record['path'],
+                    record['duration_ms'], extra={'event': 'profile', 'profile_id': record['id']})
+
+    def find(self, profile_id: str) -> Optional[Dict]:
+        return next((record for record in self.profiles if record['id'] == profile_id), None)
+
+profiler = Profiler()
+
+class ProfilerMiddleware:
+    """Profile a sampled share of requests, or one request on demand
+
+    A request is profiled when an admin sends it with `X-Profile: 1` and a
+    valid `X-Admin-Token`, or at random with the configured sample rate.
+    Profiles of requests slower than the threshold (and every on-demand
+    one) keep their top stacks; on-demand responses get an X-Profile-Id
+    header to fetch it with. Requests that aren't profiled pay one random()
+    call when sampling is on and nothing when it is off.
+    """
+
+    def __init__(self, app, profiler: Profiler = profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'].startswith(UNPROFILED_PREFIXES):
+            return await self.app(scope, receive, send)
+        settings = self.profiler.settings
+        forced = False
+        if any(name == b'x-profile' for name, _ in scope['headers']):
+            headers = Headers(scope=scope)
+            forced = headers.get('x-profile') == '1' and is_admin(headers.get('x-admin-token'))
+        if not forced and not (settings.sample_rate and random.random() < settings.sample_rate):
+            return await self.app(scope, receive, send)
+
+        profile = Profile()
+        profile_id = uuid.uuid4().hex[:12]
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if forced:
+                    MutableHeaders(scope=message)['X-Profile-Id'] = profile_id
+            await send(message)
+
+        token = current_profile.set(profile)
+        sampler.start(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            duration = time.perf_counter() - start
+            sampler.stop(profile)
+            current_profile.reset(token)
+            if forced or duration * 1000 >= settings.threshold_ms:
+                timings = request_timings.get() or {}
+                self.profiler.keep({
+                    'id': profile_id,
+                    'method': scope['method'],
+                    'path': scope['path'],
+                    'status': status,
+                    'forced': forced,
+                    'duration_ms': round(duration * 1000, 1),
+                    'stages_ms': {name: round(value * 1000, 1) for name, value in timings.items()},
+                    'interval_ms': sampler.interval * 1000,
+                    'samples': sum(profile.samples.values()),
+                    'stacks': profile.top(settings.top),
+                })
+
+router = APIRouter(prefix="/admin/profiler", dependencies=[Depends(require_admin)])
+
+@router.get("")
+async def get_profiler():
+    """Current profiler settings and a summary of the kept profiles, newest first"""
+    return {
+        "settings": profiler.settings.model_dump(),
+        "profiles": [{key: record[key] for key in ('id', 'method', 'path', 'status', 'duration_ms', 'samples')}
+                     for record in reversed(profiler.profiles)]
+    }
+
+@router.put("")
+async def update_profiler(settings: ProfilerSettings):
+    """Change the sample rate, latency threshold or number of stacks kept"""
+    profiler.settings = settings
+    logger.info("Profiler settings changed to %s", settings.model_dump())
+    return {"settings": settings.model_dump()}
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str):
+    """One kept profile with its stage times and top stacks"""
+    record = profiler.find(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id}")
+    return record
+
+@router.delete("")
+async def clear_profiles():
+    """Drop every kept profile"""
+    profiler.profiles.clear()
+    return {"cleared": True}
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Hashable
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers with the same key
+
+    The first caller for a key starts `fn` in the threadpool; callers that
+    arrive while it runs await the same task and get the same result or
+    exception. The work runs as its own task, so a caller that disconnects
+    doesn't cancel it for the others. Results are not cached: once the call
+    finishes, the next caller starts a new one.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.shared = 0
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(run_in_threadpool(fn, *args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.shared += 1
+            logger.debug(f"{self.name}: joined in-flight call for {key!r}")
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
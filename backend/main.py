@@ -1,8 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.endpoints import router
+from api.admission import AdmissionMiddleware
+from api.middleware import ConditionalCacheMiddleware, CompressionMiddleware
+from api.metrics import MetricsMiddleware, router as metrics_router
+from api.profiler import ProfilerMiddleware, router as profiler_router
+from scripts.logs import configure_logging
 
-app = FastAPI(title="Stock Screener API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Logging is set up when the server starts, not when this module is imported
+    configure_logging()
+    yield
+
+app = FastAPI(title="Stock Screener API", lifespan=lifespan)
+
+# Middleware added later wraps earlier ones, so CORS (added last) sees every response
+# Admission is innermost: 304 revalidations never wait for a heavy slot
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(ConditionalCacheMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ProfilerMiddleware)
+# Times everything inside it, including cache checks and compression
+app.add_middleware(MetricsMiddleware, routes=app.routes)
 
 # Configure CORS
 app.add_middleware(
@@ -11,7 +32,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "Server-Timing", "X-Profile-Id"],
 )
 
 # Include routers
 app.include_router(router, prefix="/api")
+app.include_router(profiler_router, prefix="/api")
+app.include_router(metrics_router)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
@@ -25,3 +25,44 @@ class IndicatorRequest(BaseModel):
 class ScreenerRequest(BaseModel):
     show_all: Optional[bool] = False
     criteria: Optional[Dict[str, Any]] = None
+
+class BatchRequest(BaseModel):
+    symbols: List[str]
+    indicators: List[str] = ["RSI", "MACD", "MA"]
+
+class BatchResponse(BaseModel):
+    """Latest values for many symbols as parallel arrays, one entry per found symbol"""
+    symbols: List[str]
+    price: List[Optional[float]]
+    date: List[Optional[str]]
+    indicators: Dict[str, Any]
+    missing: List[str]
+
+class HistoryResponse(BaseModel):
+    """OHLCV and indicator series for one symbol as parallel arrays"""
+    symbol: str
+    total: int
+    date: List[str]
+    open: List[Optional[float]]
+    high: List[Optional[float]]
+    low: List[Optional[float]]
+    close: List[Optional[float]]
+    volume: List[Optional[float]]
+    indicators: Dict[str, Any]
+
+class ExportRequest(BaseModel):
+    """Rows to export: listed symbols, a screen's matches, or every symbol when both are left out"""
+    symbols: Optional[List[str]] = None
+    criteria: Optional[Dict[str, Any]] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+
+class SavedScreenRequest(BaseModel):
+    name: str
+    criteria: Dict[str, Any]
+
+class ProfilerSettings(BaseModel):
+    """How requests are picked for profiling and which profiles are kept"""
+    sample_rate: float = Field(0.0, ge=0.0, le=1.0)
+    threshold_ms: float = Field(500.0, ge=0.0)
+    top: int = Field(20, ge=1, le=200)
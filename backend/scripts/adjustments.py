@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import sqlite3
+import numpy as np
+import logging
+from typing import TYPE_CHECKING, List, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+
+def create_corporate_actions_table(conn: sqlite3.Connection):
+    """Create the corporate actions table if it doesn't exist
+
+    Each row is a single split or dividend with the factor it applies to
+    every bar before its ex-date. Cumulative factors are derived at read
+    time, so a new action is one insert and stored bars are never rewritten.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS corporate_actions (
+            symbol TEXT,
+            ex_date TEXT,
+            action TEXT,
+            value REAL,
+            price_factor REAL,
+            volume_factor REAL,
+            PRIMARY KEY (symbol, ex_date, action)
+        )
+    ''')
+
+def split_row(symbol: str, ex_date: str, ratio: float) -> Tuple:
+    """Build a corporate action row for a split (ratio = new shares per old share)"""
+    return (symbol, ex_date, 'split', ratio, 1.0 / ratio, ratio)
+
+def dividend_row(symbol: str, ex_date: str, amount: float, prev_close: float) -> Tuple:
+    """Build a corporate action row for a cash dividend"""
+    return (symbol, ex_date, 'dividend', amount, 1.0 - amount / prev_close, 1.0)
+
+def store_actions(conn: sqlite3.Connection, rows: List[Tuple]):
+    """Insert or replace corporate action rows"""
+    if not rows:
+        return
+    conn.executemany('''
+        INSERT OR REPLACE INTO corporate_actions
+        (symbol, ex_date, action, value, price_factor, volume_factor)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', rows)
+
+def record_split(conn: sqlite3.Connection, symbol: str, ex_date: str, ratio: float):
+    """Record a stock split"""
+    store_actions(conn, [split_row(symbol, ex_date, ratio)])
+
+def record_dividend(conn: sqlite3.Connection, symbol: str, ex_date: str, amount: float, prev_close: float):
+    """Record a cash dividend"""
+    store_actions(conn, [dividend_row(symbol, ex_date, amount, prev_close)])
+
+def split_multipliers(hist: pd.DataFrame) -> np.ndarray:
+    """Cumulative product of the splits after each bar in a yfinance frame"""
+    splits = hist['Stock Splits'].fillna(0).to_numpy(dtype=float)
+    ratios = np.where(splits > 0, splits, 1.0)
+    # Bar i is affected by every split strictly after it
+    after = np.cumprod(ratios[::-1])[::-1]
+    return np.append(after[1:], 1.0)
+
+def unadjust_history(hist: pd.DataFrame) -> pd.DataFrame:
+    """Convert a yfinance frame fetched with auto_adjust=False to as-traded prices
+
+    Yahoo reports Open/High/Low/Close (and dividends) already adjusted for
+    every split up to the download date. Undoing that here makes stored bars
+    independent of when they were downloaded.
+    """
+    if 'Stock Splits' not in hist.columns:
+        return hist
+    hist = hist.copy()
+    multipliers = split_multipliers(hist)
+    for col in ['Open', 'High', 'Low', 'Close']:
+        hist[col] = hist[col].to_numpy() * multipliers
+    hist['Volume'] = np.rint(hist['Volume'].to_numpy() / multipliers).astype(np.int64)
+    if 'Dividends' in hist.columns:
+        hist['Dividends'] = hist['Dividends'].to_numpy() * multipliers
+    return hist
+
+def actions_from_history(symbol: str, hist: pd.DataFrame) -> List[Tuple]:
+    """Extract split and dividend rows from an as-traded yfinance frame"""
+    import pandas as pd
+
+    if 'Stock Splits' not in hist.columns or 'Dividends' not in hist.columns:
+        return []
+    dates = pd.DatetimeIndex(hist['Date'] if 'Date' in hist.columns else hist.index)
+    dates = dates.strftime('%Y-%m-%d')
+    splits = hist['Stock Splits'].fillna(0).to_numpy(dtype=float)
+    dividends = hist['Dividends'].fillna(0).to_numpy(dtype=float)
+    prev_close = hist['Close'].shift(1).to_numpy(dtype=float)
+
+    rows = []
+    for i in np.flatnonzero(splits > 0):
+        rows.append(split_row(symbol, dates[i], splits[i]))
+    for i in np.flatnonzero(dividends > 0):
+        if np.isnan(prev_close[i]) or prev_close[i] <= 0:
+            logger.warning(f"Skipping dividend for {symbol} on {dates[i]}: no previous close")
+            continue
+        # The previous close is in pre-split terms if a split shares the ex-date
+        ratio = splits[i] if splits[i] > 0 else 1.0
+        rows.append(dividend_row(symbol, dates[i], dividends[i], prev_close[i] / ratio))
+    return rows
+
+def get_adjustment_factors(conn: sqlite3.Connection, symbol: str) -> pd.DataFrame:
+    """Get the per-action adjustment factors for a symbol, ordered by ex-date"""
+    import pandas as pd
+
+    try:
+        return pd.read_sql_query('''
+            SELECT ex_date, price_factor, volume_factor
+            FROM corporate_actions
+            WHERE symbol = ?
+            ORDER BY ex_date
+        ''', conn, params=(symbol,))
+    except pd.errors.DatabaseError:
+        # Databases created before corporate actions were tracked
+        return pd.DataFrame(columns=['ex_date', 'price_factor', 'volume_factor'])
+
+def cumulative_factors(dates: np.ndarray, ex_dates: np.ndarray, factors: np.ndarray) -> np.ndarray:
+    """Product of the factors of every action after each date
+
+    `ex_dates` must be sorted. Bars on or after an ex-date are already in
+    post-action terms, so only strictly later actions apply.
+    """
+    cumulative = np.append(np.cumprod(factors[::-1])[::-1], 1.0)
+    return cumulative[np.searchsorted(ex_dates, dates, side='right')]
+
+def apply_adjustments(df: pd.DataFrame, factors: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of an as-traded price frame adjusted for splits and dividends"""
+    import pandas as pd
+
+    if factors.empty or df.empty:
+        return df
+    dates = pd.to_datetime(df['date']).to_numpy()
+    ex_dates = pd.to_datetime(factors['ex_date']).to_numpy()
+    price = cumulative_factors(dates, ex_dates, factors['price_factor'].to_numpy(dtype=float))
+    volume = cumulative_factors(dates, ex_dates, factors['volume_factor'].to_numpy(dtype=float))
+
+    df = df.copy()
+    for col in PRICE_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].to_numpy(dtype=float) * price
+    if 'volume' in df.columns:
+        df['volume'] = np.rint(df['volume'].to_numpy(dtype=float) * volume).astype(np.int64)
+    return df
@@ -0,0 +1,261 @@
+import json
+import os
+import zlib
+import socket
+import sqlite3
+import time
+import argparse
+import logging
+import multiprocessing
+import pandas as pd
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from scripts.adjustments import unadjust_history, actions_from_history, store_actions
+from scripts.validation import quarantine, QualityReport
+from scripts.ticker_status import classify_error, record_failure, record_success
+from scripts.work_queue import (connect, transaction, create_job, job_range, claim, complete,
+                                fail, fetched, unrecorded_failures, mark, progress, outstanding)
+from scripts.metrics import stage, record_ingest_run
+from scripts.bulk_insert import bulk_load, insert_frame, rate
+
+logger = logging.getLogger(__name__)
+
+# Fetch processes started by run(); fetching is network-bound, so more than the core count is fine
+DEFAULT_WORKERS = 4
+
+# Symbols a worker leases at a time
+CLAIM_BATCH = 5
+
+# Fetched symbols the writer commits per transaction
+WRITE_BATCH = 50
+
+# Seconds to wait when there is nothing to claim or write yet
+POLL_SECONDS = 1.0
+
+BAR_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+def fetch_history(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Download one symbol's bars from Yahoo with splits and dividends left in"""
+    # Only fetch workers pay for importing yfinance; the writer never does
+    import yfinance as yf
+
+    with stage('upstream_fetch'):
+        return yf.Ticker(symbol).history(start=start_date, end=end_date, auto_adjust=False)
+
+def encode_history(symbol: str, hist: pd.DataFrame) -> bytes:
+    """Compress a yfinance frame into the as-traded bars and actions the writer stores
+
+    The CPU-side preparation happens in the worker, so the writer only
+    validates and inserts.
+    """
+    hist = unadjust_history(hist)
+    dates = pd.DatetimeIndex(hist['Date'] if 'Date' in hist.columns else hist.index).strftime('%Y-%m-%d')
+    bars = {'date': dates.tolist()}
+    for column in BAR_COLUMNS[1:]:
+        bars[column] = hist[column.capitalize()].tolist()
+    return zlib.compress(json.dumps({'bars': bars, 'actions': actions_from_history(symbol, hist)}).encode())
+
+def decode_history(symbol: str, payload: bytes) -> Tuple[pd.DataFrame, List[Tuple]]:
+    """Bars in the stock_prices layout and corporate action rows from a worker payload"""
+    data = json.loads(zlib.decompress(payload))
+    bars = pd.DataFrame(data['bars'], columns=BAR_COLUMNS)
+    bars.insert(0, 'symbol', symbol)
+    return bars, [tuple(row) for row in data['actions']]
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def run_worker(db_path, job: str, owner: Optional[str] = None,
+               fetch: Callable[[str, str, str], Optional[pd.DataFrame]] = fetch_history,
+               batch: int = CLAIM_BATCH, poll: float = POLL_SECONDS) -> int:
+    """Claim and fetch the job's symbols until none are left to fetch; returns how many were fetched
+
+    Downloads are staged in the queue rather than written to stock_prices,
+    so any number of workers can run without contending for the writer's
+    transactions. Items still in retry backoff keep the worker waiting.
+    """
+    owner = owner or worker_name()
+    conn = connect(db_path)
+    start_date, end_date = job_range(conn, job)
+    done = 0
+    try:
+        while True:
+            symbols = claim(conn, job, owner, batch)
+            if not symbols:
+                if not outstanding(progress(conn, job), 'pending', 'leased'):
+                    break
+                time.sleep(poll)
+                continue
+            for symbol in symbols:
+                try:
+                    hist = fetch(symbol, start_date, end_date)
+                    if hist is None or hist.empty:
+                        fail(conn, job, symbol, owner, 'no_data')
+                        logger.warning(f"[FAILED] No data available for {symbol}")
+                        continue
+                    payload = encode_history(symbol, hist)
+                except Exception as e:
+                    retry = fail(conn, job, symbol, owner, classify_error(e), str(e))
+                    logger.warning(f"[ERROR] Failed fetching {symbol}{' (will retry)' if retry else ''}: {str(e)}")
+                    continue
+                if complete(conn, job, symbol, owner, payload):
+                    done += 1
+                else:
+                    logger.warning(f"Lease on {symbol} expired before it was fetched; another worker has it")
+    finally:
+        conn.close()
+    logger.info(f"Worker {owner} fetched {done} symbols for {job}")
+    return done
+
+def write_batch(conn: sqlite3.Connection, job: str, items: Sequence[Tuple[str, bytes]],
+                quality: QualityReport) -> Tuple[List[str], int]:
+    """Store fetched items in one transaction and mark them done; returns (symbols, rows)
+
+    The batch's bars go in with a single executemany.
+    """
+    symbols = []
+    frames = []
+    with transaction(conn):
+        for symbol, payload in items:
+            bars, actions = decode_history(symbol, payload)
+            bars, rejected = quality.check(bars)
+            quarantine(conn, rejected)
+            if len(rejected):
+                logger.warning(f"[QUARANTINE] {len(rejected)} bad rows for {symbol}")
+            store_actions(conn, actions)
+            record_success(conn, symbol)
+            frames.append(bars)
+            symbols.append(symbol)
+        rows = insert_frame(conn, 'stock_prices', pd.concat(frames, ignore_index=True))
+        mark(conn, job, symbols, 'done')
+    return symbols, rows
+
+def run_writer(db_path, job: str, batch: int = WRITE_BATCH, poll: float = POLL_SECONDS,
+               workers_alive: Optional[Callable[[], bool]] = None, ingest_job: str = 'backfill') -> Dict:
+    """Commit fetched items in batches until the job has nothing left, then publish
+
+    This is the only process writing price data, so inserts never wait on
+    each other. A batch is marked done in the same transaction that stores
+    it: after a crash, restarting the writer picks up exactly the items
+    that weren't committed. When `workers_alive` reports that every worker
+    has exited, the writer stops instead of waiting for their leases.
+
+    Secondary indexes on stock_prices are rebuilt once at the end. The
+    rows/s reported only counts time spent writing, not waiting on workers.
+    """
+    started = time.perf_counter()
+    conn = connect(db_path)
+    quality = QualityReport()
+    written: List[str] = []
+    rows = 0
+    failures = 0
+    writing = 0.0
+    try:
+        with bulk_load(conn, ['stock_prices']):
+            while True:
+                items = fetched(conn, job, batch)
+                if items:
+                    start = time.perf_counter()
+                    symbols, n = write_batch(conn, job, items, quality)
+                    writing += time.perf_counter() - start
+                    written.extend(symbols)
+                    rows += n
+                    counts = progress(conn, job)
+                    logger.info(f"Wrote {len(symbols)} symbols ({n} rows, {rate(rows, writing)}); "
+                                f"{counts.get('done', 0)}/{sum(counts.values())} done for {job}")
+                    continue
+                failed = unrecorded_failures(conn, job)
+                if failed:
+                    with transaction(conn):
+                        for symbol, failure, error in failed:
+                            record_failure(conn, symbol, failure, error)
+                        mark(conn, job, [symbol for symbol, _, _ in failed], 'abandoned')
+                    failures += len(failed)
+                    continue
+                counts = progress(conn, job)
+                if not outstanding(counts, 'pending', 'leased', 'fetched', 'failed'):
+                    break
+                if workers_alive is not None and not workers_alive():
+                    logger.warning(f"All workers exited with {outstanding(counts, 'pending', 'leased')} items "
+                                   f"left in {job}; run the job again to resume it")
+                    break
+                time.sleep(poll)
+    finally:
+        conn.close()
+    quality.log(logger)
+
+    if written:
+        # Let the API know the data changed
+        from scripts.saved_screens import refresh_and_publish
+        refresh_and_publish(db_path, written)
+    elapsed = time.perf_counter() - started
+    record_ingest_run(db_path, ingest_job, len(written) + failures, rows, failures, elapsed)
+    return {'symbols': written, 'rows': rows, 'failures': failures, 'seconds': elapsed,
+            'rows_per_second': rows / writing if writing else 0.0}
+
+def enqueue(db_path, job: str, symbols: Sequence[str], start_date: str, end_date: str) -> int:
+    """Create the tables and queue `symbols` under `job`; returns the number newly queued"""
+    from scripts.init_db import create_tables
+
+    conn = connect(db_path)
+    try:
+        create_tables(conn)
+        return create_job(conn, job, start_date, end_date, symbols)
+    finally:
+        conn.close()
+
+def run(db_path, job: str, symbols: Sequence[str], start_date: str, end_date: str,
+        workers: int = DEFAULT_WORKERS, fetch: Callable = fetch_history, ingest_job: str = 'backfill') -> Dict:
+    """Backfill `symbols` with `workers` fetch processes and this process as the writer
+
+    Workers on other machines can join the same job with `backfill worker`
+    while it runs.
+    """
+    queued = enqueue(db_path, job, symbols, start_date, end_date)
+    logger.info(f"Queued {queued} new symbols for {job}; starting {workers} workers")
+    processes = [multiprocessing.Process(target=run_worker, args=(str(db_path), job),
+                                         kwargs={'fetch': fetch}, name=f'backfill-worker-{i}')
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        return run_writer(db_path, job, workers_alive=lambda: any(p.is_alive() for p in processes),
+                          ingest_job=ingest_job)
+    finally:
+        for process in processes:
+            process.join()
+
+def read_tickers(path) -> List[str]:
+    """Symbols from a tickers.csv, with the .ST suffix added where missing"""
+    return [symbol if symbol.endswith('.ST') else f"{symbol}.ST" for symbol in pd.read_csv(path)['Symbol']]
+
+def main():
+    """Run, join or drive a backfill job from the command line"""
+    from scripts.logs import configure_logging
+
+    data = Path(__file__).parent.parent / 'data'
+    end = datetime.now()
+    parser = argparse.ArgumentParser(description="Backfill price history through a shared work queue")
+    parser.add_argument('command', choices=['enqueue', 'worker', 'writer', 'run'])
+    parser.add_argument('--db', default=str(data / 'stock_data.db'))
+    parser.add_argument('--job', default=f"backfill-{end:%Y%m%d}")
+    parser.add_argument('--tickers', default=str(data / 'tickers.csv'))
+    parser.add_argument('--start', default=(end - timedelta(days=365)).strftime('%Y-%m-%d'))
+    parser.add_argument('--end', default=end.strftime('%Y-%m-%d'))
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.command == 'enqueue':
+        enqueue(args.db, args.job, read_tickers(args.tickers), args.start, args.end)
+    elif args.command == 'worker':
+        run_worker(args.db, args.job)
+    elif args.command == 'writer':
+        run_writer(args.db, args.job)
+    else:
+        run(args.db, args.job, read_tickers(args.tickers), args.start, args.end, args.workers)
+
+if __name__ == "__main__":
+    main()
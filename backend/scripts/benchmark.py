@@ -0,0 +1,396 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from scripts.synthetic import build_database, symbol_names
+
+logger = logging.getLogger(__name__)
+
+# Modules an entry point should only load on the code paths that use them
+HEAVY_MODULES = ('pandas', 'yfinance', 'ta', 'pyarrow')
+
+# Entry points imported on a cold start: the API app and an ingestion worker
+STARTUP_MODULES = ('main', 'api.endpoints', 'scripts.backfill', 'scripts.screener')
+
+def summarize(name: str, latencies: List[float], items: int = None, unit: str = 'calls') -> Dict:
+    """Summarize a list of per-call latencies (in seconds) into a result row"""
+    latencies = np.asarray(latencies, dtype=float)
+    total = float(latencies.sum())
+    items = len(latencies) if items is None else items
+    return {
+        'name': name,
+        'calls': len(latencies),
+        'total_s': round(total, 4),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 3),
+        'max_ms': round(float(latencies.max()) * 1000, 3),
+        'throughput': round(items / total, 1) if total else float('inf'),
+        'unit': f"{unit}/s"
+    }
+
+def timed(fn: Callable, repeat: int) -> List[float]:
+    """Call `fn` `repeat` times and return the latencies"""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def bench_ingest(ctx: Dict) -> List[Dict]:
+    """Write a fresh synthetic panel into every store"""
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = build_database(Path(tmp) / 'ingest.db', ctx['symbols'], ctx['years'], ctx['seed'])
+    return [summarize('ingest.all_stores', [stats['seconds']], stats['rows'], 'rows')]
+
+def bench_bulk_insert(ctx: Dict) -> List[Dict]:
+    """Insert the panel row by row with iterrows and a commit per symbol, then with BulkWriter"""
+    from scripts.bulk_insert import BulkWriter
+    from scripts.database import create_tables
+    from scripts.synthetic import generate_panel
+    frame = generate_panel(ctx['symbols'], ctx['years'], ctx['seed'])
+    groups = [group for _, group in frame.groupby('symbol', sort=False)]
+
+    def iterrows(conn):
+        for group in groups:
+            conn.executemany('''
+                INSERT OR REPLACE INTO daily_prices (symbol, date, open, high, low, close, volume)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(row['symbol'], row['date'], row['open'], row['high'], row['low'], row['close'], row['volume'])
+                  for _, row in group.iterrows()])
+            conn.commit()
+
+    def bulk(conn):
+        with BulkWriter(conn, 'daily_prices') as writer:
+            for group in groups:
+                writer.add(group)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, write in (('iterrows', iterrows), ('bulk', bulk)):
+            with sqlite3.connect(Path(tmp) / f'{name}.db') as conn:
+                create_tables(conn)
+                latencies = timed(lambda: write(conn), 1)
+            results.append(summarize(f"insert.{name}", latencies, len(frame), 'rows'))
+    return results
+
+def bench_panel_load(ctx: Dict) -> List[Dict]:
+    """Load per-symbol frames and scan the whole price table"""
+    from scripts.indicators import TechnicalIndicators
+    indicators = TechnicalIndicators(ctx['db_path'])
+    sample = ctx['sample_symbols']
+    per_symbol = [timed(lambda s=s: indicators.get_stock_data(s), 1)[0] for s in sample]
+
+    def full_scan():
+        with sqlite3.connect(ctx['db_path']) as conn:
+            return conn.execute("SELECT symbol, date, open, high, low, close, volume FROM stock_prices").fetchall()
+    scan = timed(full_scan, 1)
+    return [
+        summarize('panel.get_stock_data', per_symbol, unit='symbols'),
+        summarize('panel.full_scan', scan, ctx['rows'], 'rows')
+    ]
+
+def bench_indicators(ctx: Dict) -> List[Dict]:
+    """Compute each indicator for a sample of symbols from pandas frames and from PriceSeries"""
+    from scripts.indicators import TechnicalIndicators
+    from scripts.panel import FIELDS, load_panel
+    indicators = TechnicalIndicators(ctx['db_path'])
+    frames = [indicators.get_stock_data(s) for s in ctx['sample_symbols']]
+    panel = load_panel(ctx['db_path'], ctx['sample_symbols'], FIELDS)
+    series = [panel.series(s) for s in ctx['sample_symbols']]
+    results = []
+    for name, fn in [('rsi', indicators.calculate_rsi),
+                     ('macd', indicators.calculate_macd),
+                     ('moving_averages', indicators.calculate_moving_averages)]:
+        latencies = [timed(lambda df=df: fn(df), 1)[0] for df in frames]
+        results.append(summarize(f"indicators.{name}", latencies, unit='symbols'))
+    for name in ('rsi', 'macd', 'moving_averages'):
+        latencies = [timed(getattr(s, name), 1)[0] for s in series]
+        results.append(summarize(f"series.{name}", latencies, unit='symbols'))
+    frame_bytes = np.mean([df.memory_usage(index=True, deep=True).sum() for df in frames])
+    series_bytes = np.mean([s.dates.nbytes + sum(v.nbytes for v in s.fields.values()) for s in series])
+    logger.info(f"Bytes per symbol: {frame_bytes:,.0f} as a DataFrame, {series_bytes:,.0f} as a PriceSeries")
+    return results
+
+def bench_precision(ctx: Dict) -> List[Dict]:
+    """Load the whole panel and compute latest indicators in float64 and compact mode"""
+    from scripts.panel import FIELDS, latest_indicators, load_panel
+    symbols = symbol_names(ctx['symbols'])
+    results = []
+    for mode in ('float64', 'compact'):
+        panels = []
+        load = timed(lambda: panels.append(load_panel(ctx['db_path'], symbols, FIELDS, mode=mode)), 1)
+        panel = panels[0]
+        compute = timed(lambda: latest_indicators(panel), 1)
+        size = panel.dates.nbytes + sum(values.nbytes for values in panel.fields.values())
+        logger.info(f"{mode} panel: {size / 1e6:.1f} MB for {len(panel)} symbols x {len(panel.dates)} bars")
+        results.append(summarize(f"precision.{mode}_load", load, ctx['symbols'], 'symbols'))
+        results.append(summarize(f"precision.{mode}_indicators", compute, ctx['symbols'], 'symbols'))
+    return results
+
+def bench_columnar(ctx: Dict) -> List[Dict]:
+    """Export the price history to Parquet, then import it into a fresh database and re-export unchanged"""
+    from scripts.columnar import export_history, import_history
+    with tempfile.TemporaryDirectory() as tmp:
+        export = timed(lambda: export_history(ctx['db_path'], Path(tmp) / 'export'), 1)
+        size = sum(path.stat().st_size for path in (Path(tmp) / 'export').rglob('*.parquet'))
+        logger.info(f"Parquet export: {size / 1e6:.1f} MB for {ctx['rows']} rows")
+        load = timed(lambda: import_history(Path(tmp) / 'export', Path(tmp) / 'import.db', publish=False), 1)
+        noop = timed(lambda: export_history(ctx['db_path'], Path(tmp) / 'export'), 1)
+    return [
+        summarize('columnar.export', export, ctx['rows'], 'rows'),
+        summarize('columnar.import', load, ctx['rows'], 'rows'),
+        summarize('columnar.export_unchanged', noop, ctx['rows'], 'rows'),
+    ]
+
+def bench_export(ctx: Dict) -> List[Dict]:
+    """Pull every symbol's history one request at a time, then as one streamed CSV and Parquet export
+
+    Peak memory is traced while the export streams are consumed and
+    discarded, as a server sending them would; it should not grow with
+    the number of rows.
+    """
+    import tracemalloc
+    from fastapi.testclient import TestClient
+    from main import app
+    from scripts.columnar import csv_stream, iter_price_rows, parquet_stream
+    client = TestClient(app)
+    symbols = symbol_names(ctx['symbols'])
+    per_symbol = timed(lambda: [client.get(f'/api/stocks/{symbol}/history?indicators=') for symbol in symbols], 1)
+    results = [summarize('export.per_symbol_history', per_symbol, ctx['rows'], 'rows')]
+    for name, stream in (('csv', csv_stream), ('parquet', parquet_stream)):
+        latencies = timed(lambda: client.post(f'/api/export?format={name}', json={}), 1)
+        tracemalloc.start()
+        size = sum(len(chunk) for chunk in stream(iter_price_rows(ctx['db_path'])))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        logger.info(f"{name} export: {size / 1e6:.1f} MB for {ctx['rows']} rows, peak {peak / 1e6:.1f} MB traced")
+        results.append(summarize(f'export.stream_{name}', latencies, ctx['rows'], 'rows'))
+    return results
+
+def bench_screen(ctx: Dict) -> List[Dict]:
+    """Screen the whole universe per symbol and with the chunked panel screen"""
+    from scripts.indicators import TechnicalIndicators
+    from scripts.screener import ScreenRun
+    indicators = TechnicalIndicators(ctx['db_path'])
+    criteria = {'RSI': {'below': 50}}
+    latencies = timed(lambda: indicators.screen_stocks(criteria), 1)
+
+    first, total = [], []
+    for _ in range(3):
+        start = time.perf_counter()
+        chunks = ScreenRun(ctx['db_path'], criteria).chunks()
+        next(chunks, None)
+        first.append(time.perf_counter() - start)
+        for _ in chunks:
+            pass
+        total.append(time.perf_counter() - start)
+    return [
+        summarize('screen.rsi_below_50', latencies, ctx['symbols'], 'symbols'),
+        summarize('screen.stream_first_match', first, unit='runs'),
+        summarize('screen.stream_all', total, 3 * ctx['symbols'], 'symbols'),
+    ]
+
+def bench_logging(ctx: Dict) -> List[Dict]:
+    """Screen per symbol with INFO logging going to a handler, and with logging off
+
+    The gap between the two is what log formatting and writing cost the
+    screen; the records themselves go to os.devnull.
+    """
+    from scripts.indicators import TechnicalIndicators
+    indicators = TechnicalIndicators(ctx['db_path'])
+    criteria = {'RSI': {'below': 50}, 'MACD': {'signal': 'bullish'}}
+    root = logging.getLogger()
+    previous = root.level
+    results = []
+    with open(os.devnull, 'w') as devnull:
+        handler = logging.StreamHandler(devnull)
+        root.addHandler(handler)
+        try:
+            for name, level in (('info', logging.INFO), ('quiet', logging.CRITICAL)):
+                root.setLevel(level)
+                latencies = timed(lambda: indicators.screen_stocks(criteria), 1)
+                results.append(summarize(f"logging.screen_{name}", latencies, ctx['symbols'], 'symbols'))
+        finally:
+            root.removeHandler(handler)
+            root.setLevel(previous)
+    return results
+
+def import_cost(module: str) -> Dict:
+    """Import `module` in a fresh interpreter and report what that cost
+
+    Returns the import time in seconds, which HEAVY_MODULES it pulled in,
+    and how many handlers the root logger had afterwards (any is an
+    import-time side effect).
+    """
+    code = (f"import json, logging, sys, time\n"
+            f"start = time.perf_counter()\n"
+            f"import {module}\n"
+            f"seconds = time.perf_counter() - start\n"
+            f"print(json.dumps({{'seconds': seconds, 'heavy': sorted(set(sys.modules) & set({HEAVY_MODULES!r})), "
+            f"'handlers': len(logging.getLogger().handlers)}}))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=Path(__file__).parent.parent,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+def bench_startup(ctx: Dict) -> List[Dict]:
+    """Cold-import each entry point in a fresh interpreter, as a new worker or app instance would"""
+    results = []
+    for module in STARTUP_MODULES:
+        costs = [import_cost(module) for _ in range(3)]
+        logger.info(f"{module} loads {', '.join(costs[0]['heavy']) or 'no heavy modules'}")
+        results.append(summarize(f"startup.{module}", [cost['seconds'] for cost in costs], unit='imports'))
+    return results
+
+def bench_api(ctx: Dict) -> List[Dict]:
+    """Hit the database-backed API endpoints in-process
+
+    /api/stocks/{symbol} and /api/analyze download from Yahoo, so they are
+    left out to keep the suite offline.
+    """
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    repeat = ctx['repeat']
+    batch = {'symbols': ctx['sample_symbols']}
+    return [
+        summarize('api.get_stocks', timed(lambda: client.get('/api/stocks'), repeat), unit='requests'),
+        summarize('api.stocks_batch', timed(lambda: client.post('/api/stocks/batch', json=batch), repeat),
+                  repeat * len(ctx['sample_symbols']), 'symbols'),
+        summarize('api.screen', timed(lambda: client.post('/api/screen', json={'RSI': {'below': 50}}), 1),
+                  ctx['symbols'], 'symbols'),
+    ]
+
+def bench_admission(ctx: Dict) -> List[Dict]:
+    """Time /api/stocks while a burst of distinct screens runs, with admission control on and off"""
+    import asyncio
+    import httpx
+    from main import app
+    from api.admission import admission
+    from scripts.versioning import publish
+    burst = 4 * admission.slots + admission.queue
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+            # Distinct thresholds so no two screens share a run or a cached result
+            heavy = [asyncio.ensure_future(client.post('/api/screen', json={'RSI': {'below': 30 + i / 1000}}))
+                     for i in range(burst)]
+            cheap = []
+            while not all(task.done() for task in heavy):
+                start = time.perf_counter()
+                await client.get('/api/stocks')
+                cheap.append(time.perf_counter() - start)
+            return cheap, [task.result().status_code for task in heavy]
+
+    results = []
+    slots, queue = admission.slots, admission.queue
+    with tempfile.TemporaryDirectory() as tmp:
+        # A copy published without a shared panel makes every screen scan SQLite, as after a cold start
+        db_path = str(Path(tmp) / 'admission.db')
+        shutil.copy(ctx['db_path'], db_path)
+        publish(db_path)
+        os.environ['STOCK_DB_PATH'] = db_path
+        try:
+            for name, limits in (('on', (slots, queue)), ('off', (burst, burst))):
+                admission.slots, admission.queue = limits
+                cheap, statuses = asyncio.run(scenario())
+                logger.info(f"admission {name}: {statuses.count(429)} of {burst} screens shed")
+                results.append(summarize(f"admission.{name}_get_stocks", cheap, unit='requests'))
+        finally:
+            admission.slots, admission.queue = slots, queue
+            os.environ['STOCK_DB_PATH'] = ctx['db_path']
+    return results
+
+BENCHMARKS = {
+    'ingest': bench_ingest,
+    'bulk_insert': bench_bulk_insert,
+    'panel': bench_panel_load,
+    'indicators': bench_indicators,
+    'screen': bench_screen,
+    'precision': bench_precision,
+    'columnar': bench_columnar,
+    'export': bench_export,
+    'logging': bench_logging,
+    'api': bench_api,
+    'startup': bench_startup,
+    'admission': bench_admission,
+}
+
+def run(names: List[str], symbols: int, years: float, seed: int = 42,
+        sample: int = 50, repeat: int = 20, db_path: str = None) -> List[Dict]:
+    """Build (or reuse) a synthetic database and run the named benchmarks against it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        if db_path is None or not Path(db_path).exists():
+            db_path = db_path or str(Path(tmp) / 'bench.db')
+            build_database(db_path, symbols, years, seed, stores=('stock_prices',))
+        with sqlite3.connect(db_path) as conn:
+            rows = conn.execute("SELECT COUNT(*) FROM stock_prices").fetchone()[0]
+
+        ctx = {
+            'db_path': db_path,
+            'symbols': symbols,
+            'years': years,
+            'seed': seed,
+            'rows': rows,
+            'repeat': repeat,
+            'sample_symbols': symbol_names(symbols)[:sample],
+        }
+        # The API builds its own TechnicalIndicators per request
+        previous = os.environ.get('STOCK_DB_PATH')
+        os.environ['STOCK_DB_PATH'] = db_path
+        try:
+            results = []
+            for name in names:
+                logger.info(f"Running benchmark {name}")
+                results.extend(BENCHMARKS[name](ctx))
+            return results
+        finally:
+            if previous is None:
+                os.environ.pop('STOCK_DB_PATH', None)
+            else:
+                os.environ['STOCK_DB_PATH'] = previous
+
+def format_results(results: List[Dict]) -> str:
+    """Format benchmark results as a text table"""
+    header = f"{'benchmark':<28} {'calls':>6} {'total_s':>9} {'p50_ms':>9} {'p95_ms':>9} {'max_ms':>9} {'throughput':>16}"
+    lines = [header, '-' * len(header)]
+    for r in results:
+        lines.append(f"{r['name']:<28} {r['calls']:>6} {r['total_s']:>9} {r['p50_ms']:>9} "
+                     f"{r['p95_ms']:>9} {r['max_ms']:>9} {r['throughput']:>10} {r['unit']}")
+    return '\n'.join(lines)
+
+def main():
+    """Run the benchmark suite from the command line"""
+    parser = argparse.ArgumentParser(description="Offline scale benchmarks on synthetic data")
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help="Comma-separated benchmarks to run")
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--years', type=float, default=2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sample', type=int, default=50, help="Symbols used for per-symbol latencies")
+    parser.add_argument('--repeat', type=int, default=20, help="Requests per cheap API benchmark")
+    parser.add_argument('--db', help="Reuse (or create) a synthetic database at this path")
+    parser.add_argument('--json', help="Also write results to this JSON file")
+    parser.add_argument('--log-level', default='ERROR')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s %(levelname)s:%(message)s')
+    logging.getLogger().setLevel(args.log_level)
+
+    results = run(args.only.split(','), args.symbols, args.years, args.seed,
+                  args.sample, args.repeat, args.db)
+    print(format_results(results))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import sqlite3
+import time
+import logging
+import pandas as pd
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ('symbol', 'date', 'open', 'high', 'low', 'close', 'volume')
+
+# Rows per executemany and per transaction; large enough that commits are a rounding error
+BATCH_ROWS = 50_000
+
+# Deferred side-table writes that force a flush even before BATCH_ROWS price rows are buffered
+MAX_DEFERRED = 1000
+
+# Page cache for a bulk load, in KiB (negative means KiB to SQLite)
+BULK_CACHE_KIB = 256 * 1024
+
+def frame_rows(frame: pd.DataFrame, columns: Sequence[str]) -> Iterator[Tuple]:
+    """Turn frame columns into executemany rows without iterrows
+
+    Each column is converted to Python scalars in one call, so the cost
+    per row is a tuple, not a Series.
+    """
+    return zip(*(frame[column].tolist() for column in columns))
+
+@lru_cache(maxsize=None)
+def insert_sql(table: str, columns: Tuple[str, ...], conflict: str = 'REPLACE') -> str:
+    return (f"INSERT OR {conflict} INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})")
+
+def insert_frame(conn: sqlite3.Connection, table: str, frame: pd.DataFrame,
+                 columns: Sequence[str] = PRICE_COLUMNS, conflict: str = 'REPLACE') -> int:
+    """Insert a whole frame with one prepared statement; the caller owns the transaction"""
+    if frame.empty:
+        return 0
+    conn.executemany(insert_sql(table, tuple(columns), conflict), frame_rows(frame, columns))
+    return len(frame)
+
+class BulkWriter:
+    """Buffer frames and write them in BATCH_ROWS-sized batches, committing once per batch
+
+    Writes to other tables that belong with the buffered rows go through
+    `defer()` and run in the same transaction at flush time, so no
+    transaction is held open (and no other writer locked out) between
+    flushes.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, table: str, columns: Sequence[str] = PRICE_COLUMNS,
+                 batch_rows: int = BATCH_ROWS, conflict: str = 'REPLACE'):
+        self.conn = conn
+        self.table = table
+        self.columns = tuple(columns)
+        self.batch_rows = batch_rows
+        self.conflict = conflict
+        self.frames: List[pd.DataFrame] = []
+        self.deferred: List[Tuple[Callable, tuple]] = []
+        self.pending = 0
+        self.rows = 0
+        self.seconds = 0.0
+
+    def add(self, frame: pd.DataFrame):
+        self.frames.append(frame)
+        self.pending += len(frame)
+        if self.pending >= self.batch_rows:
+            self.flush()
+
+    def defer(self, write: Callable, *args):
+        """Call `write(conn, *args)` inside the next flush's transaction"""
+        self.deferred.append((write, args))
+        if len(self.deferred) >= MAX_DEFERRED:
+            self.flush()
+
+    def flush(self):
+        start = time.perf_counter()
+        if self.frames:
+            frame = pd.concat(self.frames, ignore_index=True) if len(self.frames) > 1 else self.frames[0]
+            self.rows += insert_frame(self.conn, self.table, frame, self.columns, self.conflict)
+            self.frames = []
+            self.pending = 0
+        for write, args in self.deferred:
+            write(self.conn, *args)
+        self.deferred = []
+        self.conn.commit()
+        self.seconds += time.perf_counter() - start
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+@contextmanager
+def bulk_load(conn: sqlite3.Connection, tables: Iterable[str], cache_kib: int = BULK_CACHE_KIB):
+    """Defer index maintenance on `tables` while a backfill writes them
+
+    Secondary indexes are dropped and rebuilt in one pass at the end, which
+    is much cheaper than updating them row by row. The primary key stays,
+    since INSERT OR REPLACE needs it. The page cache is enlarged for the
+    load and restored afterwards. Must not be used while the connection
+    has an open transaction.
+    """
+    tables = list(tables)
+    indexes = conn.execute(f'''
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({', '.join('?' * len(tables))})
+    ''', tables).fetchall()
+    previous_cache = conn.execute('PRAGMA cache_size').fetchone()[0]
+    conn.execute(f'PRAGMA cache_size = {-abs(cache_kib)}')
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+    try:
+        yield
+    finally:
+        start = time.perf_counter()
+        for _, sql in indexes:
+            conn.execute(sql)
+        conn.commit()
+        conn.execute(f'PRAGMA cache_size = {previous_cache}')
+        if indexes:
+            logger.info(f"Rebuilt {len(indexes)} indexes on {', '.join(tables)} in {time.perf_counter() - start:.1f}s")
+
+def rate(rows: int, seconds: float) -> str:
+    """Rows per second for log lines"""
+    return f"{rows / seconds:,.0f} rows/s" if seconds else "n/a rows/s"
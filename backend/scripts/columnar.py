@@ -0,0 +1,347 @@
+import io
+import os
+import csv
+import json
+import time
+import sqlite3
+import argparse
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from scripts.bulk_insert import BulkWriter, bulk_load, rate
+from scripts.versioning import current_version
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+COMPRESSION = 'zstd'
+
+# Price history is partitioned Hive-style (stock_prices/symbol=X/year=Y), so
+# pyarrow.dataset, DuckDB or Spark can read the export directory directly.
+# The partition columns live in the path, not in the files.
+PRICE_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('volume', pa.int64()),
+])
+
+# Streamed exports carry the symbol as a column
+EXPORT_SCHEMA = pa.schema([('symbol', pa.string())] + list(PRICE_SCHEMA))
+
+PARQUET_MEDIA_TYPE = 'application/vnd.apache.parquet'
+
+# Rows per cursor fetch, and so per CSV chunk and per Parquet row group, on streamed exports
+STREAM_BATCH_ROWS = 20_000
+
+# Symbols per query on streamed exports; keeps the IN list well under SQLite's variable limit
+STREAM_SYMBOLS = 500
+
+# Small tables exported whole on every run: 'replace' tables are snapshots
+# that overwrite the local copy, 'merge' tables are upserted by primary key
+SNAPSHOTS = {
+    'latest_close': 'replace',
+    'corporate_actions': 'merge',
+}
+
+def partition_path(symbol: str, year: str) -> str:
+    """Path of a price partition relative to the export directory"""
+    return f"stock_prices/symbol={quote(symbol, safe='')}/year={year}/part-0.parquet"
+
+def read_manifest(directory) -> Optional[Dict]:
+    path = Path(directory) / MANIFEST
+    if not path.exists():
+        return None
+    manifest = json.loads(path.read_text())
+    if manifest.get('format') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported export format {manifest.get('format')!r} in {path}")
+    return manifest
+
+def _write_atomic(path: Path, write):
+    """Write through a temporary file renamed into place, so readers never see a partial file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+    write(tmp)
+    os.replace(tmp, path)
+
+def partition_stats(conn: sqlite3.Connection) -> Dict[str, Dict]:
+    """Row count, last date and a value checksum for every (symbol, year) in stock_prices
+
+    One grouped scan tells which partitions changed since the last export
+    without reading the bars themselves.
+    """
+    cursor = conn.execute('''
+        SELECT symbol, substr(date, 1, 4) AS year, COUNT(*), MAX(date),
+               TOTAL(open + high + low + close), TOTAL(volume)
+        FROM stock_prices
+        GROUP BY symbol, year
+    ''')
+    return {
+        partition_path(symbol, year): {'symbol': symbol, 'year': year, 'rows': rows, 'max_date': max_date[:10],
+                                       'checksum': [prices, volume]}
+        for symbol, year, rows, max_date, prices, volume in cursor
+    }
+
+def rows_table(rows: Sequence[Tuple], schema: pa.Schema) -> pa.Table:
+    """Arrow table from SQLite rows; 'YYYY-MM-DD' strings are cast to date32"""
+    columns = list(zip(*rows)) or [()] * len(schema)
+    return pa.table([pa.array(column, type=pa.string() if field.type == pa.date32() else None).cast(field.type)
+                     for column, field in zip(columns, schema)], schema=schema)
+
+def read_partition(conn: sqlite3.Connection, symbol: str, year: str) -> pa.Table:
+    rows = conn.execute('''
+        SELECT substr(date, 1, 10), open, high, low, close, volume FROM stock_prices
+        WHERE symbol = ? AND date >= ? AND date < ?
+        ORDER BY date
+    ''', (symbol, f'{year}-01-01', f'{int(year) + 1}-01-01')).fetchall()
+    return rows_table(rows, PRICE_SCHEMA)
+
+def export_history(db_path, directory, full: bool = False) -> Dict:
+    """Export stock_prices as zstd Parquet partitioned by symbol and year, plus the snapshot tables
+
+    Partitions whose row count, last date and checksum match the previous
+    export's manifest are left alone, so a daily export only rewrites the
+    current year of each updated symbol. `full` rewrites everything.
+    Partitions no longer in the database are removed, with or without
+    `full`, along with their emptied directories. The manifest is written
+    last and is what importers trust.
+    """
+    start = time.perf_counter()
+    directory = Path(directory)
+    try:
+        previous = read_manifest(directory)
+    except ValueError:
+        # A full export replaces an export in an older format
+        if not full:
+            raise
+        previous = None
+    previous_partitions = previous['partitions'] if previous else {}
+
+    with sqlite3.connect(db_path) as conn:
+        partitions = partition_stats(conn)
+        changed = [path for path, stats in partitions.items() if full or previous_partitions.get(path) != stats]
+        rows = 0
+        for path in changed:
+            stats = partitions[path]
+            table = read_partition(conn, stats['symbol'], stats['year'])
+            _write_atomic(directory / path, lambda tmp: pq.write_table(table, tmp, compression=COMPRESSION))
+            rows += table.num_rows
+
+        tables = {}
+        existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for name in SNAPSHOTS:
+            if name not in existing:
+                continue
+            table = pa.Table.from_pandas(pd.read_sql_query(f'SELECT * FROM {name}', conn), preserve_index=False)
+            _write_atomic(directory / f'{name}.parquet', lambda tmp: pq.write_table(table, tmp, compression=COMPRESSION))
+            tables[name] = {'file': f'{name}.parquet', 'rows': table.num_rows}
+
+    for path in set(previous_partitions) - set(partitions):
+        (directory / path).unlink(missing_ok=True)
+        # Drop year=/ and then symbol=/ once empty, so dataset readers don't list them
+        for parent in ((directory / path).parent, (directory / path).parent.parent):
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+
+    manifest = {
+        'format': FORMAT_VERSION,
+        'exported_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'source_version': current_version(db_path)['version'],
+        'high_water_mark': max((stats['max_date'] for stats in partitions.values()), default=None),
+        'partitions': partitions,
+        'tables': tables,
+    }
+    _write_atomic(directory / MANIFEST, lambda tmp: tmp.write_text(json.dumps(manifest, indent=1)))
+    elapsed = time.perf_counter() - start
+    logger.info(f"Exported {len(changed)} of {len(partitions)} partitions ({rows} rows, {rate(rows, elapsed)}) "
+                f"and {len(tables)} tables to {directory}")
+    return {'partitions': len(changed), 'skipped': len(partitions) - len(changed), 'rows': rows,
+            'tables': sorted(tables), 'seconds': elapsed}
+
+def high_water_marks(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Last stored date per symbol"""
+    return {symbol: last[:10] for symbol, last in conn.execute('SELECT symbol, MAX(date) FROM stock_prices GROUP BY symbol')}
+
+def import_partition(directory: Path, stats: Dict, after: Optional[str]) -> pd.DataFrame:
+    """Read one partition as stock_prices rows, keeping only bars after `after`"""
+    table = pq.ParquetFile(directory / stats['path']).read(columns=PRICE_SCHEMA.names)
+    if after is not None:
+        table = table.filter(pc.greater(table['date'], pa.scalar(after).cast(pa.date32())))
+    columns = {'symbol': stats['symbol'], 'date': table['date'].cast(pa.string()).to_numpy(zero_copy_only=False)}
+    columns.update((name, table[name].to_numpy()) for name in PRICE_SCHEMA.names[1:])
+    return pd.DataFrame(columns)
+
+def import_history(directory, db_path, publish: bool = True) -> Dict:
+    """Load an export into a database, reading only partitions newer than the local data
+
+    Each symbol's high-water mark is its last stored date. Partitions that
+    end on or before it are skipped without being opened, and older bars
+    inside the partitions that are read are dropped, so importing the same
+    export twice writes nothing the second time. Bars already stored are
+    never rewritten; use a fresh database to pick up corrections to them.
+    """
+    from scripts.init_db import create_tables
+
+    start = time.perf_counter()
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No {MANIFEST} in {directory}")
+
+    with sqlite3.connect(db_path) as conn:
+        create_tables(conn)
+        marks = high_water_marks(conn)
+        wanted = [dict(stats, path=path) for path, stats in sorted(manifest['partitions'].items())
+                  if marks.get(stats['symbol']) is None or stats['max_date'] > marks[stats['symbol']]]
+        symbols = set()
+        with bulk_load(conn, ['stock_prices']):
+            with BulkWriter(conn, 'stock_prices') as writer:
+                for stats in wanted:
+                    frame = import_partition(directory, stats, marks.get(stats['symbol']))
+                    if not frame.empty:
+                        writer.add(frame)
+                        symbols.add(stats['symbol'])
+
+        for name, info in manifest['tables'].items():
+            frame = pq.read_table(directory / info['file']).to_pandas()
+            if SNAPSHOTS.get(name) == 'merge':
+                with BulkWriter(conn, name, columns=frame.columns) as merge:
+                    merge.add(frame)
+            else:
+                frame.to_sql(name, conn, if_exists='replace', index=False)
+        conn.commit()
+
+    if symbols and publish:
+        from scripts.saved_screens import refresh_and_publish
+        refresh_and_publish(db_path, symbols)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Imported {writer.rows} rows for {len(symbols)} symbols from {len(wanted)} of "
+                f"{len(manifest['partitions'])} partitions in {elapsed:.1f}s ({rate(writer.rows, elapsed)})")
+    return {'symbols': sorted(symbols), 'rows': writer.rows, 'partitions': len(wanted),
+            'skipped': len(manifest['partitions']) - len(wanted), 'tables': sorted(manifest['tables']),
+            'seconds': elapsed, 'rows_per_second': writer.rows / elapsed if elapsed else 0.0}
+
+def iter_price_rows(db_path, symbol_groups: Optional[Iterable[Sequence[str]]] = None,
+                    start: Optional[str] = None, end: Optional[str] = None,
+                    batch_rows: int = STREAM_BATCH_ROWS) -> Iterator[List[Tuple]]:
+    """Stream stock_prices rows in batches straight off a cursor
+
+    Rows are (symbol, date, open, high, low, close, volume) as stored,
+    ordered by symbol and date within each group of symbols. Groups are
+    consumed lazily, so they can come from a screen still running. With no
+    groups every symbol is exported in one pass over the primary key. At
+    most one batch is in memory at a time.
+    """
+    where, params = [], []
+    if start:
+        where.append('date >= ?')
+        params.append(start)
+    if end:
+        # Bars stored with a time still belong to their day
+        where.append('date < ?')
+        params.append(end + '~')
+
+    def queries() -> Iterator[Tuple[str, List]]:
+        select = 'SELECT symbol, substr(date, 1, 10), open, high, low, close, volume FROM stock_prices'
+        if symbol_groups is None:
+            yield f"{select} {'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY symbol, date", params
+            return
+        for group in symbol_groups:
+            group = list(dict.fromkeys(group))
+            for offset in range(0, len(group), STREAM_SYMBOLS):
+                symbols = group[offset:offset + STREAM_SYMBOLS]
+                clauses = [f"symbol IN ({', '.join('?' * len(symbols))})"] + where
+                yield f"{select} WHERE {' AND '.join(clauses)} ORDER BY symbol, date", symbols + params
+
+    # StreamingResponse advances sync generators from whichever threadpool worker is free;
+    # the generator is only ever advanced by one thread at a time
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    try:
+        for sql, args in queries():
+            cursor = conn.execute(sql, args)
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    break
+                yield rows
+    finally:
+        conn.close()
+
+def csv_stream(batches: Iterable[List[Tuple]]) -> Iterator[bytes]:
+    """CSV with a header row, one chunk per batch"""
+    yield (','.join(EXPORT_SCHEMA.names) + '\r\n').encode()
+    for rows in batches:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        yield buffer.getvalue().encode()
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last take()"""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def parquet_stream(batches: Iterable[List[Tuple]]) -> Iterator[bytes]:
+    """zstd Parquet with one row group per batch, sent as each row group is written
+
+    Only the footer waits for the end, so memory stays at one batch however
+    many rows are exported.
+    """
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, EXPORT_SCHEMA, compression=COMPRESSION) as writer:
+        for rows in batches:
+            writer.write_table(rows_table(rows, EXPORT_SCHEMA))
+            yield sink.take()
+    yield sink.take()
+
+def main():
+    """Export or import a columnar copy of the price database from the command line"""
+    from scripts.logs import configure_logging
+
+    data = Path(__file__).parent.parent / 'data'
+    parser = argparse.ArgumentParser(description="Columnar (Parquet) export and import of the price history")
+    parser.add_argument('command', choices=['export', 'import'])
+    parser.add_argument('--db', default=str(data / 'stock_data.db'))
+    parser.add_argument('--dir', default=str(data / 'export'))
+    parser.add_argument('--full', action='store_true', help="Rewrite every partition on export")
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.command == 'export':
+        export_history(args.db, args.dir, args.full)
+    else:
+        import_history(args.dir, args.db)
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,44 @@
 import sqlite3
 import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
 import logging
 from pathlib import Path
 import os
-
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
+import time
+from scripts.adjustments import create_corporate_actions_table, unadjust_history, actions_from_history, store_actions
+from scripts.validation import create_quarantine_table, quarantine, QualityReport
+from scripts.ticker_status import create_ticker_status_table, classify_error, filter_tickers, record_failure, record_success
+from scripts.saved_screens import create_saved_screen_tables, refresh_and_publish
+from scripts.metrics import record_ingest_run
+from scripts.logs import configure_logging
+from scripts.bulk_insert import BulkWriter, rate
 
 # Project paths
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / 'data'
 DB_FILE = DATA_DIR / 'stock_data.db'
 
-def create_database():
-    """Create SQLite database and tables"""
-    # Remove existing database if it exists
-    if DB_FILE.exists():
-        DB_FILE.unlink()
-    
+# Tables rebuilt from Yahoo on every fetch; the side tables (ticker status, quarantine,
+# corporate actions, saved screens) are kept
+PRICE_TABLES = ('daily_prices', 'stocks')
+
+def create_database(rebuild: bool = False):
+    """Create the SQLite database and any missing tables
+
+    With `rebuild` the price tables are dropped first, but the database
+    file and its side tables are kept.
+    """
     conn = sqlite3.connect(DB_FILE)
+    if rebuild:
+        for table in PRICE_TABLES:
+            conn.execute(f'DROP TABLE IF EXISTS {table}')
+    create_tables(conn)
+    conn.commit()
+    conn.close()
+    logging.info(f"Database created at {DB_FILE}")
+
+def create_tables(conn):
+    """Create the stocks and daily_prices tables and their side tables"""
     c = conn.cursor()
     
     # Create stocks table with status column
@@ -49,22 +67,32 @@ def create_database():
         )
     ''')
     
-    conn.commit()
-    conn.close()
-    logging.info(f"Database created at {DB_FILE}")
+    # Splits and dividends, applied to prices at read time
+    create_corporate_actions_table(conn)
+    
+    # Bars rejected by validation
+    create_quarantine_table(conn)
+    
+    # Failure registry, kept across runs so dead tickers aren't re-requested
+    create_ticker_status_table(conn)
+    
+    # Saved screens with their current members and entry/exit history
+    create_saved_screen_tables(conn)
 
 def fetch_stock_data(symbol, start_date, end_date):
     """Fetch historical data for a single stock"""
+    import yfinance as yf
+
     try:
         ticker = yf.Ticker(symbol)
-        df = ticker.history(start=start_date, end=end_date)
+        df = ticker.history(start=start_date, end=end_date, auto_adjust=False)
         if not df.empty:
-            df = df.reset_index()
+            df = unadjust_history(df).reset_index()
             df['Date'] = pd.to_datetime(df['Date']).dt.date
             return df, 'active'
         return None, 'no_data'
     except Exception as e:
-        if 'No timezone found' in str(e):
+        if classify_error(e) == 'delisted':
             return None, 'delisted'
         logging.error(f"Error fetching data for {symbol}: {str(e)}")
         return None, 'error'
@@ -92,12 +120,22 @@ def clean_database():
     conn.close()
     logging.info("Database cleaned")
 
+def set_status(conn, symbol, status, updated):
+    """Record a symbol's fetch status in the stocks table"""
+    conn.execute('''
+        INSERT OR REPLACE INTO stocks (symbol, status, last_updated)
+        VALUES (?, ?, ?)
+    ''', (symbol, status, updated))
+
 def update_stock_data():
     """Update database with latest stock data"""
+    started = time.perf_counter()
     conn = sqlite3.connect(DB_FILE)
     
-    # Read tickers from CSV
+    # Read tickers from CSV, leaving out those still in failure backoff
     tickers_df = pd.read_csv(DATA_DIR / 'tickers.csv')
+    create_ticker_status_table(conn)
+    symbols, skipped = filter_tickers(conn, tickers_df['Symbol'])
     
     # Calculate date range (3 years back from today)
     end_date = datetime.now()
@@ -106,66 +144,65 @@ def update_stock_data():
     active_stocks = 0
     delisted_stocks = 0
     error_stocks = 0
+    quality = QualityReport()
+    updated = []
+    writer = BulkWriter(conn, 'daily_prices')
     
-    total_stocks = len(tickers_df)
-    for idx, row in tickers_df.iterrows():
-        symbol = row['Symbol']
+    total_stocks = len(symbols)
+    for idx, symbol in enumerate(symbols):
         logging.info(f"Processing {symbol} ({idx+1}/{total_stocks})")
         
         # Fetch data
         df, status = fetch_stock_data(symbol, start_date, end_date)
         
-        # Update stocks table with status
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO stocks (symbol, status, last_updated)
-            VALUES (?, ?, ?)
-        ''', (symbol, status, datetime.now()))
+        # Every write waits for the price batch, so no transaction is open while downloading
+        writer.defer(set_status, symbol, status, datetime.now())
         
         if status == 'active' and df is not None:
             active_stocks += 1
-            # Prepare daily prices data
-            price_data = []
-            for _, price_row in df.iterrows():
-                price_data.append((
-                    symbol,
-                    price_row['Date'],
-                    price_row['Open'],
-                    price_row['High'],
-                    price_row['Low'],
-                    price_row['Close'],
-                    price_row['Volume'],
-                    price_row['Close']  # Using Close as Adjusted Close if not available
-                ))
+            # Validate before insert; bad bars go to the quarantine table
+            prices = df.rename(columns=str.lower)[['date', 'open', 'high', 'low', 'close', 'volume']]
+            prices, rejected = quality.check(prices)
+            writer.defer(quarantine, rejected, symbol)
             
-            # Batch insert daily prices
-            cursor.executemany('''
-                INSERT OR REPLACE INTO daily_prices 
-                (symbol, date, open, high, low, close, volume, adjusted_close)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', price_data)
-        elif status == 'delisted':
-            delisted_stocks += 1
+            # adjusted_close stays NULL; it is derived at read time from corporate_actions
+            writer.add(prices.assign(symbol=symbol, date=pd.to_datetime(prices['date']).dt.strftime('%Y-%m-%d')))
+            writer.defer(store_actions, actions_from_history(symbol, df))
+            writer.defer(record_success, symbol)
+            updated.append(symbol)
         else:
-            error_stocks += 1
-            
-        conn.commit()
-    
+            writer.defer(record_failure, symbol, status)
+            if status == 'delisted':
+                delisted_stocks += 1
+            else:
+                error_stocks += 1
+    
+    # Status, quarantine and action rows commit with the price batch they belong to
+    writer.flush()
     conn.close()
+    rows_written = writer.rows
     
     # Clean up the database
     clean_database()
+    refresh_and_publish(DB_FILE, updated)
+    record_ingest_run(DB_FILE, 'update', total_stocks, rows_written, delisted_stocks + error_stocks,
+                      time.perf_counter() - started)
     
     logging.info(f"\nDatabase update completed:")
     logging.info(f"Active stocks: {active_stocks}")
     logging.info(f"Delisted stocks: {delisted_stocks}")
     logging.info(f"Error stocks: {error_stocks}")
+    logging.info(f"Wrote {rows_written} price rows at {rate(rows_written, writer.seconds)}")
+    logging.info(f"Skipped (failure backoff): {len(skipped)}")
+    quality.log(logging.getLogger())
 
 if __name__ == "__main__":
+    configure_logging()
+    
     # Ensure data directory exists
     os.makedirs(DATA_DIR, exist_ok=True)
     
-    # Create database if it doesn't exist
+    # Create the database or any tables it is missing
     create_database()
     
     # Update stock data
@@ -19,30 +19,28 @@ LOG_FILE = Path(PROJECT_ROOT) / 'backend' / 'logs' / 'fetch_data.log'
 DB_PATH = Path(PROJECT_ROOT) / 'database' / 'stock_data.db'
 DATE_FORMAT = '%Y-%m-%d'
 
-# Ensure directories exist
-os.makedirs(TICKERS_FILE.parent, exist_ok=True)
-os.makedirs(LOG_FILE.parent, exist_ok=True)
-os.makedirs(DB_PATH.parent, exist_ok=True)
-
-# Setup Logging
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s:%(message)s',
-    datefmt=DATE_FORMAT
-)
-
-# Add console handler for immediate feedback
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s %(levelname)s:%(message)s')
-console_handler.setFormatter(formatter)
-logging.getLogger().addHandler(console_handler)
+def setup_logging():
+    """Log to fetch_data.log and the console; called by main, never at import"""
+    os.makedirs(LOG_FILE.parent, exist_ok=True)
+    logging.basicConfig(
+        filename=LOG_FILE,
+        level=logging.INFO,
+        format='%(asctime)s %(levelname)s:%(message)s',
+        datefmt=DATE_FORMAT
+    )
+
+    # Add console handler for immediate feedback
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s %(levelname)s:%(message)s')
+    console_handler.setFormatter(formatter)
+    logging.getLogger().addHandler(console_handler)
 
 def initialize_database():
     """Initialize the SQLite database and create tables if they don't exist."""
     try:
         logging.info("Initializing database...")
+        os.makedirs(DB_PATH.parent, exist_ok=True)
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         cursor.execute('''
@@ -203,6 +201,7 @@ def job():
 
 def main():
     """Run the data fetching process immediately"""
+    setup_logging()
     try:
         initialize_database()
         logging.info("Starting data fetch process...")
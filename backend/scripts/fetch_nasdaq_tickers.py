@@ -12,24 +12,26 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
-# Setup logging
 PROJECT_ROOT = Path(__file__).parent.parent.parent.absolute()
 LOG_FILE = PROJECT_ROOT / 'backend' / 'logs' / 'fetch_tickers.log'
 TICKERS_FILE = PROJECT_ROOT / 'backend' / 'data' / 'tickers.csv'
 
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s:%(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+def setup_logging():
+    """Log to fetch_tickers.log and the console; called by main, never at import"""
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        filename=LOG_FILE,
+        level=logging.INFO,
+        format='%(asctime)s %(levelname)s:%(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
 
-# Add console handler
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s %(levelname)s:%(message)s')
-console_handler.setFormatter(formatter)
-logging.getLogger().addHandler(console_handler)
+    # Add console handler
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s %(levelname)s:%(message)s')
+    console_handler.setFormatter(formatter)
+    logging.getLogger().addHandler(console_handler)
 
 def fetch_stockholm_tickers():
     url = "https://stockanalysis.com/list/nasdaq-stockholm/"
@@ -106,6 +108,7 @@ def save_tickers(symbols):
 
 def main():
     """Main function to fetch and save Nasdaq Stockholm tickers"""
+    setup_logging()
     logging.info("Starting Nasdaq Stockholm ticker fetch process...")
     
     # Fetch tickers
@@ -4,21 +4,23 @@ import logging
 from pathlib import Path
 import time
 
-# Setup logging
 PROJECT_ROOT = Path(__file__).parent.parent.parent.absolute()
 LOG_FILE = PROJECT_ROOT / 'backend' / 'logs' / 'fetch_tickers.log'
 TICKERS_FILE = PROJECT_ROOT / 'backend' / 'data' / 'tickers.csv'
 
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s:%(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+def setup_logging():
+    """Log to fetch_tickers.log and the console; called by main, never at import"""
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        filename=LOG_FILE,
+        level=logging.INFO,
+        format='%(asctime)s %(levelname)s:%(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
 
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-logging.getLogger().addHandler(console_handler)
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    logging.getLogger().addHandler(console_handler)
 
 def fetch_swedish_stocks():
     """
@@ -130,6 +132,7 @@ def save_tickers(df):
 
 def main():
     """Main function to fetch and save Swedish stock tickers"""
+    setup_logging()
     logging.info("Starting ticker fetch process...")
     
     # Fetch tickers
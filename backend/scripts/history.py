@@ -0,0 +1,119 @@
+import logging
+import numpy as np
+from typing import Dict, Optional, Sequence
+
+from scripts.panel import FIELDS, PriceSeries
+from scripts.shared_panel import panel_for
+from scripts.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+INDICATORS = ('RSI', 'MACD', 'MA')
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Indices of `points` bars picked by largest-triangle-three-buckets
+
+    The first and last bars are always kept. Every bucket in between
+    contributes the bar forming the largest triangle with the previously
+    kept bar and the average of the next bucket, which preserves peaks and
+    troughs that plain striding would drop.
+    """
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Bucket b covers [edges[b], edges[b + 1]) of the bars between the end points
+    edges = (np.arange(points - 1) * (n - 2) / (points - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    sums_x = np.r_[0.0, np.cumsum(x)]
+    sums_y = np.r_[0.0, np.nancumsum(y)]
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b in range(points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Average of the next bucket; the last bucket is followed by the final bar
+        nlo, nhi = (hi, edges[b + 2]) if b + 2 < len(edges) else (n - 1, n)
+        avg_x = (sums_x[nhi] - sums_x[nlo]) / (nhi - nlo)
+        avg_y = (sums_y[nhi] - sums_y[nlo]) / (nhi - nlo)
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        selected[b + 1] = a
+    return selected
+
+def indicator_series(series: PriceSeries, indicators: Sequence[str] = INDICATORS) -> Dict[str, object]:
+    """Full indicator series for one symbol, as in TechnicalIndicators.calculate_*"""
+    result: Dict[str, object] = {}
+    if 'RSI' in indicators:
+        result['RSI'] = series.rsi()
+    if 'MACD' in indicators:
+        line, signal, hist = series.macd()
+        result['MACD'] = {'macd': line, 'signal': signal, 'histogram': hist}
+    if 'MA' in indicators:
+        result['MA'] = series.moving_averages()
+    return result
+
+def _take(value, rows):
+    """Apply a row selection to an array or a dict of arrays"""
+    if isinstance(value, dict):
+        return {k: v[rows] for k, v in value.items()}
+    return value[rows]
+
+def load_history(db_path: str, symbol: str, start: Optional[str] = None, end: Optional[str] = None,
+                 indicators: Sequence[str] = INDICATORS, points: Optional[int] = None) -> Optional[Dict]:
+    """OHLCV and indicator series for one symbol between `start` and `end` (inclusive)
+
+    Indicators are computed over the whole stored history so that the
+    first bars of the range are warmed up, then cut to the range and,
+    if `points` is given, downsampled with LTTB on the close. Returns
+    None if the symbol has no bars.
+    """
+    unknown = set(indicators) - set(INDICATORS)
+    if unknown:
+        raise ValueError(f"Unknown indicators: {sorted(unknown)}")
+    panel, _ = panel_for(db_path, [symbol], FIELDS)
+    if not panel.lengths[0]:
+        return None
+
+    series = panel.series(symbol)
+    span = series.span(start, end)
+    rows = np.arange(len(series))[span]
+    total = len(rows)
+    with stage('compute'):
+        if points is not None:
+            window = series[span]
+            rows = rows[lttb(window.dates.astype(np.int64), window.close, points)]
+        values = indicator_series(series, indicators)
+    logger.debug(f"History for {symbol}: {len(rows)} of {total} bars")
+    return {
+        'symbol': symbol,
+        'total': total,
+        'date': series.dates[rows],
+        **{field: series.fields[field][rows] for field in FIELDS},
+        'indicators': {name: _take(value, rows) for name, value in values.items()},
+    }
+
+def to_arrow(history: Dict) -> bytes:
+    """Encode a history as an Arrow IPC stream, flattening indicators to 'MACD.signal' style columns"""
+    import pyarrow as pa
+
+    columns = {'date': pa.array(history['date'], type=pa.date32())}
+    for field in FIELDS:
+        columns[field] = pa.array(history[field])
+    for name, value in history['indicators'].items():
+        if isinstance(value, dict):
+            for key, values in value.items():
+                columns[f"{name}.{key}"] = pa.array(values)
+        else:
+            columns[name] = pa.array(value)
+    table = pa.table(columns).replace_schema_metadata({
+        'symbol': history['symbol'],
+        'total': str(history['total'])
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
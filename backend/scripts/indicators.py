@@ -1,28 +1,37 @@
 import pandas as pd
 import ta
 import sqlite3
-from typing import Dict, Any, List
-from pathlib import Path
+from typing import Dict, Any, List, Optional
 import logging
+import time
 import numpy as np
+from scripts.adjustments import get_adjustment_factors, apply_adjustments
+from scripts.metrics import stage
+from scripts.logs import Sampler, sampled
+from scripts.versioning import default_db_path
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Series tails are only logged at DEBUG, and then for a sample of calls
+_rsi_sample = Sampler()
+_macd_sample = Sampler()
+
 class TechnicalIndicators:
-    def __init__(self):
-        self.db_path = str(Path(__file__).parent.parent / 'data' / 'stock_data.db')
-        logger.info(f"Database path: {self.db_path}")
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = str(db_path or default_db_path())
+        logger.debug("Database path: %s", self.db_path)
 
-    def get_stock_data(self, symbol: str) -> pd.DataFrame:
-        """Get stock data from database"""
+    def get_stock_data(self, symbol: str, adjusted: bool = True) -> pd.DataFrame:
+        """Get stock data from database, adjusted for splits and dividends by default"""
         try:
             query = "SELECT date, open, high, low, close, volume FROM stock_prices WHERE symbol = ? ORDER BY date"
-            with sqlite3.connect(self.db_path) as conn:
+            with stage('db_read'), sqlite3.connect(self.db_path) as conn:
                 df = pd.read_sql_query(query, conn, params=(symbol,))
                 df['date'] = pd.to_datetime(df['date'])
-                logger.info(f"Retrieved {len(df)} rows for {symbol}")
+                if adjusted:
+                    df = apply_adjustments(df, get_adjustment_factors(conn, symbol))
+                logger.debug("Retrieved %d rows for %s", len(df), symbol)
                 return df
         except Exception as e:
             logger.error(f"Error getting stock data for {symbol}: {str(e)}")
@@ -32,10 +41,10 @@ class TechnicalIndicators:
         """Get list of all available stocks"""
         try:
             query = "SELECT DISTINCT symbol FROM stock_prices"
-            with sqlite3.connect(self.db_path) as conn:
+            with stage('db_read'), sqlite3.connect(self.db_path) as conn:
                 df = pd.read_sql_query(query, conn)
                 stocks = df['symbol'].tolist()
-                logger.info(f"Found {len(stocks)} stocks")
+                logger.debug("Found %d stocks", len(stocks))
                 return stocks
         except Exception as e:
             logger.error(f"Error getting stock list: {str(e)}")
@@ -46,33 +55,23 @@ class TechnicalIndicators:
         try:
             # Check if we have enough data points
             if len(df) < period * 2:
-                logger.warning(f"Not enough data points for RSI calculation. Need at least {period * 2}, got {len(df)}")
+                logger.debug("Not enough data points for RSI calculation. Need at least %d, got %d", period * 2, len(df))
                 return pd.Series([50] * len(df))  # Return neutral RSI for insufficient data
             
-            # Log input data
-            logger.info(f"Calculating RSI with {len(df)} data points")
-            logger.info(f"Last 5 closing prices:\n{df['close'].tail()}")
-            
-            # Calculate price changes
-            delta = df['close'].diff()
-            logger.info(f"Last 5 price changes:\n{delta.tail()}")
-            
             # Calculate RSI using ta library
             rsi = ta.momentum.RSIIndicator(df['close'], window=period).rsi()
             
             # Handle NaN values
             nan_count = rsi.isna().sum()
             if nan_count > 0:
-                logger.warning(f"Found {nan_count} NaN values in RSI calculation")
+                logger.debug("Found %d NaN values in RSI calculation", nan_count)
                 # Fill NaN values with previous valid values, then fill remaining with 50
                 rsi = rsi.ffill(limit=1).fillna(50)
             
-            # Log RSI values
-            logger.info(f"RSI calculation:")
-            logger.info(f"Min RSI: {rsi.min()}")
-            logger.info(f"Max RSI: {rsi.max()}")
-            logger.info(f"Mean RSI: {rsi.mean()}")
-            logger.info(f"Last 5 RSI values:\n{rsi.tail()}")
+            if sampled(logger, _rsi_sample):
+                logger.debug("RSI over %d closes: min %.2f, max %.2f, mean %.2f, last closes %s, last RSI %s",
+                             len(df), rsi.min(), rsi.max(), rsi.mean(),
+                             df['close'].tail().tolist(), rsi.tail().tolist())
             
             # Ensure RSI values are within valid range
             rsi = rsi.clip(0, 100)
@@ -87,7 +86,7 @@ class TechnicalIndicators:
         try:
             # We need enough data points for both MACD and signal line
             if len(df) < 35:  # 26 (slow MA) + 9 (signal) = 35 minimum points
-                logger.warning(f"Not enough data points for MACD calculation. Need at least 35, got {len(df)}")
+                logger.debug("Not enough data points for MACD calculation. Need at least 35, got %d", len(df))
                 return pd.Series([0] * len(df)), pd.Series([0] * len(df)), pd.Series([0] * len(df))
             
             # Calculate MACD using ta library
@@ -102,10 +101,9 @@ class TechnicalIndicators:
             # Calculate histogram as the difference between MACD and signal
             hist = macd - signal
             
-            logger.info(f"MACD calculation:")
-            logger.info(f"Last 5 MACD values:\n{macd.tail()}")
-            logger.info(f"Last 5 Signal values:\n{signal.tail()}")
-            logger.info(f"Last 5 Histogram values:\n{hist.tail()}")
+            if sampled(logger, _macd_sample):
+                logger.debug("MACD last values %s, signal %s, histogram %s",
+                             macd.tail().tolist(), signal.tail().tolist(), hist.tail().tolist())
             
             return macd, signal, hist
         except Exception as e:
@@ -165,16 +163,8 @@ class TechnicalIndicators:
             
             # Get the last few values to check for crossover
             last_values = 10  # Look at more recent values
-            recent_macd = macd.tail(last_values)
-            recent_signal = signal.tail(last_values)
             recent_hist = hist.tail(last_values)
             
-            # Log values for debugging
-            logger.info(f"Checking MACD crossover:")
-            logger.info(f"Recent MACD: {recent_macd.values}")
-            logger.info(f"Recent Signal: {recent_signal.values}")
-            logger.info(f"Recent Histogram: {recent_hist.values}")
-            
             if criteria['signal'] == 'bullish':
                 # Look for bullish crossover in recent values
                 # MACD line crosses above signal line
@@ -183,7 +173,7 @@ class TechnicalIndicators:
                     was_negative = recent_hist.iloc[i-1] < 0
                     is_positive = recent_hist.iloc[i] > 0
                     if was_negative and is_positive:
-                        logger.info(f"Found bullish crossover at index {i}")
+                        logger.debug("Found bullish crossover at index %d", i)
                         return True
                         
             elif criteria['signal'] == 'bearish':
@@ -194,7 +184,7 @@ class TechnicalIndicators:
                     was_positive = recent_hist.iloc[i-1] > 0
                     is_negative = recent_hist.iloc[i] < 0
                     if was_positive and is_negative:
-                        logger.info(f"Found bearish crossover at index {i}")
+                        logger.debug("Found bearish crossover at index %d", i)
                         return True
                 
             return False
@@ -221,15 +211,17 @@ class TechnicalIndicators:
     def screen_stocks(self, criteria: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Screen stocks based on technical indicator criteria"""
         matching_stocks = []
+        skipped = errors = 0
+        start = time.perf_counter()
         try:
             stocks = self.get_all_stocks()
-            logger.info(f"Screening {len(stocks)} stocks with criteria: {criteria}")
 
             for symbol in stocks:
                 try:
                     df = self.get_stock_data(symbol)
                     if len(df) < 200:  # Need enough data for indicators
-                        logger.warning(f"Not enough data for {symbol}, skipping")
+                        logger.debug("Not enough data for %s, skipping", symbol)
+                        skipped += 1
                         continue
 
                     meets_criteria = True
@@ -268,12 +260,17 @@ class TechnicalIndicators:
                             }
                         
                         matching_stocks.append(latest_values)
-                        logger.info(f"Stock {symbol} matches criteria")
+                        logger.debug("Stock %s matches criteria", symbol)
                 except Exception as e:
                     logger.error(f"Error processing {symbol}: {str(e)}")
+                    errors += 1
                     continue
 
-            logger.info(f"Found {len(matching_stocks)} matching stocks")
+            # One record per screen instead of one per symbol
+            logger.info("Screened %d stocks: %d matched, %d skipped, %d errors in %.2fs",
+                        len(stocks), len(matching_stocks), skipped, errors, time.perf_counter() - start,
+                        extra={'event': 'screen', 'criteria': criteria, 'scanned': len(stocks),
+                               'matched': len(matching_stocks), 'skipped': skipped, 'errors': errors})
             return matching_stocks
         except Exception as e:
             logger.error(f"Error in screen_stocks: {str(e)}")
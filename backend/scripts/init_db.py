@@ -1,11 +1,15 @@
 import sqlite3
 from pathlib import Path
-import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
 import sys
 import logging
 from logging.handlers import RotatingFileHandler
+from scripts.adjustments import create_corporate_actions_table
+from scripts.validation import create_quarantine_table
+from scripts.ticker_status import create_ticker_status_table, blocked_symbols
+from scripts.saved_screens import create_saved_screen_tables
+from scripts.work_queue import create_work_queue_tables
+from scripts.backfill import DEFAULT_WORKERS, read_tickers, run as run_backfill
 
 def setup_logging():
     log_path = Path(__file__).parent.parent / 'logs'
@@ -23,11 +27,12 @@ def setup_logging():
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
     
-    # Setup logger
-    logger = logging.getLogger('stock_data')
-    logger.setLevel(logging.INFO)
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # Setup logger; the backfill workers and writer log to the same handlers
+    for name in ('scripts.backfill', 'stock_data'):
+        logger = logging.getLogger(name)
+        logger.setLevel(logging.INFO)
+        logger.addHandler(file_handler)
+        logger.addHandler(console_handler)
     
     return logger
 
@@ -36,7 +41,27 @@ def get_existing_stocks(conn):
     cursor = conn.execute("SELECT DISTINCT symbol FROM stock_prices")
     return {row[0] for row in cursor.fetchall()}
 
-def init_database():
+def create_tables(conn):
+    """Create the stock_prices table and its side tables if they don't exist"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS stock_prices (
+        symbol TEXT,
+        date TEXT,
+        open REAL,
+        high REAL,
+        low REAL,
+        close REAL,
+        volume INTEGER,
+        PRIMARY KEY (symbol, date)
+    )
+    """)
+    create_corporate_actions_table(conn)
+    create_quarantine_table(conn)
+    create_ticker_status_table(conn)
+    create_saved_screen_tables(conn)
+    create_work_queue_tables(conn)
+
+def init_database(workers: int = DEFAULT_WORKERS):
     logger = setup_logging()
     logger.info("Starting database initialization...")
     db_path = Path(__file__).parent.parent / 'data' / 'stock_data.db'
@@ -45,104 +70,45 @@ def init_database():
     # Create tables
     logger.info("Setting up database tables...")
     with sqlite3.connect(db_path) as conn:
-        conn.execute("""
-        CREATE TABLE IF NOT EXISTS stock_prices (
-            symbol TEXT,
-            date TEXT,
-            open REAL,
-            high REAL,
-            low REAL,
-            close REAL,
-            volume INTEGER,
-            PRIMARY KEY (symbol, date)
-        )
-        """)
+        create_tables(conn)
         
         # Read tickers from CSV
         tickers_path = Path(__file__).parent.parent / 'data' / 'tickers.csv'
         logger.info(f"Reading tickers from: {tickers_path}")
-        df_tickers = pd.read_csv(tickers_path)
-        total_tickers = len(df_tickers)
+        tickers = read_tickers(tickers_path)
+        total_tickers = len(tickers)
         logger.info(f"Found {total_tickers} tickers")
         
         # Get existing stocks
         existing_stocks = get_existing_stocks(conn)
         logger.info(f"Found {len(existing_stocks)} stocks already in database")
         
-        # Get stock data for each ticker
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=365)  # Get 1 year of data
-        
-        success_count = 0
-        error_count = 0
-        skip_count = 0
-        
-        for i, symbol in enumerate(df_tickers['Symbol'].values, 1):
-            try:
-                # Add .ST suffix for Swedish stocks if not present
-                if not symbol.endswith('.ST'):
-                    symbol = f"{symbol}.ST"
-                
-                # Skip if already in database
-                if symbol in existing_stocks:
-                    logger.info(f"[SKIP] [{i}/{total_tickers}] {symbol} - already in database")
-                    skip_count += 1
-                    continue
-                
-                logger.info(f"Processing [{i}/{total_tickers}] {symbol}")
-                
-                stock = yf.Ticker(symbol)
-                hist = stock.history(start=start_date, end=end_date)
-                
-                if not hist.empty:
-                    # Prepare data for SQL - select only the columns we want
-                    hist.reset_index(inplace=True)
-                    selected_columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-                    hist = hist[selected_columns]
-                    
-                    # Rename columns to match our schema
-                    hist.columns = ['date', 'open', 'high', 'low', 'close', 'volume']
-                    hist['date'] = hist['date'].dt.strftime('%Y-%m-%d')
-                    hist['symbol'] = symbol
-                    
-                    # Insert data
-                    hist.to_sql('stock_prices', conn, if_exists='append', index=False,
-                              dtype={
-                                  'symbol': 'TEXT',
-                                  'date': 'TEXT',
-                                  'open': 'REAL',
-                                  'high': 'REAL',
-                                  'low': 'REAL',
-                                  'close': 'REAL',
-                                  'volume': 'INTEGER'
-                              })
-                    logger.info(f"[SUCCESS] Added {len(hist)} rows for {symbol}")
-                    success_count += 1
-                else:
-                    logger.warning(f"[FAILED] No data available for {symbol}")
-                    error_count += 1
-            except Exception as e:
-                logger.error(f"[ERROR] Failed processing {symbol}: {str(e)}")
-                error_count += 1
-                continue
-            
-            # Print progress every 10 stocks
-            if i % 10 == 0:
-                logger.info("\n=== Progress Report ===")
-                logger.info(f"Processed: {i}/{total_tickers} stocks")
-                logger.info(f"Success rate: {(success_count/(i-skip_count))*100:.1f}%")
-                logger.info(f"Successful: {success_count}")
-                logger.info(f"Failed: {error_count}")
-                logger.info(f"Skipped: {skip_count}")
-                logger.info("=====================\n")
-        
-        logger.info("\n=== Final Report ===")
-        logger.info(f"Successfully processed: {success_count} stocks")
-        logger.info(f"Failed to process: {error_count} stocks")
-        logger.info(f"Skipped (already in DB): {skip_count} stocks")
-        logger.info(f"Total completion rate: {(success_count/(total_tickers-skip_count))*100:.1f}%")
-        
-        # Print some sample data
+        # Tickers that failed recently and are still in backoff
+        blocked = blocked_symbols(conn)
+        logger.info(f"Found {len(blocked)} tickers in failure backoff")
+    
+    symbols = [symbol for symbol in dict.fromkeys(tickers) if symbol not in existing_stocks and symbol not in blocked]
+    skip_count = total_tickers - len(symbols)
+    
+    # Get 1 year of data; the job is named by day so a rerun after a crash resumes it
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=365)
+    job = f"init_db-{end_date:%Y%m%d}"
+    stats = run_backfill(db_path, job, symbols, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'),
+                         workers=workers, ingest_job='init_db')
+    success_count = len(stats['symbols'])
+    error_count = stats['failures']
+    
+    logger.info("\n=== Final Report ===")
+    logger.info(f"Successfully processed: {success_count} stocks ({stats['rows']} rows in {stats['seconds']:.1f}s)")
+    logger.info(f"Writer throughput: {stats['rows_per_second']:,.0f} rows/s")
+    logger.info(f"Failed to process: {error_count} stocks")
+    logger.info(f"Skipped (already in DB or in backoff): {skip_count} stocks")
+    if symbols:
+        logger.info(f"Total completion rate: {(success_count/len(symbols))*100:.1f}%")
+    
+    # Print some sample data
+    with sqlite3.connect(db_path) as conn:
         logger.info("\nSample of data in database:")
         cursor = conn.execute("""
             SELECT symbol, COUNT(*) as days, MIN(date) as first_date, MAX(date) as last_date 
@@ -4,6 +4,7 @@ import pandas as pd
 import yfinance as yf
 from datetime import datetime, timedelta
 import sys
+from scripts.adjustments import create_corporate_actions_table, unadjust_history, actions_from_history, store_actions
 
 def init_database_test():
     print("Starting database initialization (TEST MODE)...")
@@ -15,6 +16,7 @@ def init_database_test():
     with sqlite3.connect(db_path) as conn:
         # Drop existing table if it exists
         conn.execute("DROP TABLE IF EXISTS stock_prices")
+        conn.execute("DROP TABLE IF EXISTS corporate_actions")
         
         conn.execute("""
         CREATE TABLE IF NOT EXISTS stock_prices (
@@ -28,6 +30,7 @@ def init_database_test():
             PRIMARY KEY (symbol, date)
         )
         """)
+        create_corporate_actions_table(conn)
         
         # Test with just 5 stocks
         test_stocks = ['ERIC-B.ST', 'VOLV-B.ST', 'SEB-A.ST', 'SAND.ST', 'ABB.ST']
@@ -47,11 +50,15 @@ def init_database_test():
                 sys.stdout.flush()  # Force print to show immediately
                 
                 stock = yf.Ticker(symbol)
-                hist = stock.history(start=start_date, end=end_date)
+                hist = stock.history(start=start_date, end=end_date, auto_adjust=False)
                 
                 if not hist.empty:
-                    # Prepare data for SQL - select only the columns we want
+                    # Store as-traded prices; splits and dividends go to corporate_actions
+                    hist = unadjust_history(hist)
                     hist.reset_index(inplace=True)
+                    store_actions(conn, actions_from_history(symbol, hist))
+                    
+                    # Prepare data for SQL - select only the columns we want
                     selected_columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
                     hist = hist[selected_columns]
                     
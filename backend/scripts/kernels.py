@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import numpy as np
+from itertools import accumulate
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Below this many columns a scalar loop per column beats the blocked scan
+BLOCKED_COLUMNS = 4
+
+# Below this many gapped columns a scalar loop per column beats a vectorized time loop
+VECTOR_COLUMNS = 48
+
+MA_WINDOWS = {'MA20': 20, 'MA50': 50, 'MA200': 200}
+
+def _as_float(values) -> np.ndarray:
+    """float32 input stays float32 (compact panels); anything else becomes float64"""
+    x = np.asarray(values)
+    return x if x.dtype == np.float32 else x.astype(np.float64, copy=False)
+
+def _ema_column(values: list, alpha: float, min_periods: int) -> list:
+    """EMA of one column, following pandas' ewm(adjust=False, ignore_na=False)"""
+    decay = 1.0 - alpha
+    out = [np.nan] * len(values)
+    weighted = np.nan
+    old_wt = 1.0
+    nobs = 0
+    for i, cur in enumerate(values):
+        is_obs = cur == cur
+        nobs += is_obs
+        if weighted == weighted:
+            # Missing values still decay the old weight
+            old_wt *= decay
+            if is_obs:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif is_obs:
+            weighted = cur
+        if nobs >= min_periods:
+            out[i] = weighted
+    return out
+
+def _ema_dense_column(x: np.ndarray, alpha: float, min_periods: int) -> np.ndarray:
+    """EMA of one column with no gaps after its first value, or None if it has gaps
+
+    Without gaps _ema_column's update is the same expression at every step,
+    so accumulate can run it without the per-bar branching.
+    """
+    missing = np.isnan(x)
+    first = int(missing.argmin()) if len(x) and not missing.all() else len(x)
+    if missing[first:].any():
+        return None
+    decay = 1.0 - alpha
+    total = decay + alpha
+    out = np.full(len(x), np.nan, dtype=x.dtype)
+    if first < len(x):
+        out[first:] = list(accumulate(x[first:].tolist(), lambda weighted, cur: (decay * weighted + alpha * cur) / total))
+        out[:first + min_periods - 1] = np.nan
+    return out
+
+def _ema_columns(x: np.ndarray, alpha: float, min_periods: int) -> np.ndarray:
+    """EMA over axis 0 of a (time, symbols) array, vectorized across symbols"""
+    decay = 1.0 - alpha
+    out = np.full(x.shape, np.nan, dtype=x.dtype)
+    weighted = np.full(x.shape[1], np.nan, dtype=x.dtype)
+    old_wt = np.ones(x.shape[1], dtype=x.dtype)
+    nobs = np.zeros(x.shape[1], dtype=np.int64)
+    for i in range(x.shape[0]):
+        cur = x[i]
+        is_obs = ~np.isnan(cur)
+        nobs += is_obs
+        started = ~np.isnan(weighted)
+        old_wt = np.where(started, old_wt * decay, old_wt)
+        update = started & is_obs
+        with np.errstate(invalid='ignore'):
+            blended = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+        weighted = np.where(update, blended, np.where(~started & is_obs, cur, weighted))
+        old_wt = np.where(update, 1.0, old_wt)
+        out[i] = np.where(nobs >= min_periods, weighted, np.nan)
+    return out
+
+# Rows per step of the blocked EMA scan; small enough that decay ** -EMA_BLOCK stays well conditioned
+EMA_BLOCK = 32
+
+def _ema_blocked(x: np.ndarray, alpha: float, min_periods: int, first: np.ndarray) -> np.ndarray:
+    """EMA of (time, symbols) columns that have no gaps after their first value
+
+    Within a block of rows the recursion has the closed form
+    y[i] = decay^(i+1) * carry + alpha * decay^i * cumsum(decay^-k * x[k]),
+    so only one Python step is needed per EMA_BLOCK rows. Values are taken
+    relative to each column's first observation, which keeps flat series
+    exactly flat as in pandas.
+    """
+    n_bars, n_cols = x.shape
+    decay = 1.0 - alpha
+    rows = np.arange(n_bars)[:, None]
+    seed = x[np.minimum(first, n_bars - 1), np.arange(n_cols)]
+    # Relative to the seed, the bars before the first observation are zero and
+    # leave the EMA at zero until the series starts
+    rel = np.where(rows < first, 0.0, x - seed)
+
+    powers = decay ** np.arange(1, EMA_BLOCK + 1)
+    inverse = decay ** -np.arange(EMA_BLOCK)
+    # Blocks are computed in float64 and only stored in the input dtype
+    out = np.empty((n_bars, n_cols), dtype=x.dtype)
+    carry = np.zeros(n_cols)
+    for start in range(0, n_bars, EMA_BLOCK):
+        block = rel[start:start + EMA_BLOCK]
+        n = len(block)
+        acc = np.cumsum(block * inverse[:n, None], axis=0)
+        values = powers[:n, None] * carry + (alpha / decay) * powers[:n, None] * acc
+        out[start:start + n] = values + seed
+        carry = values[-1]
+    out[rows < first + min_periods - 1] = np.nan
+    return out
+
+def ema(values: np.ndarray, alpha: float, min_periods: int = 0) -> np.ndarray:
+    """Exponential moving average along axis 0 of a 1D or (time, symbols) array
+
+    Matches pandas' ewm(alpha, min_periods, adjust=False).mean() column by
+    column. Single series run a scalar loop; across many columns, those
+    without gaps after their first value use a blocked closed-form scan and
+    those with gaps follow pandas' weighting step by step.
+    """
+    x = _as_float(values)
+    min_periods = max(min_periods, 1)
+    squeeze = x.ndim == 1
+    if squeeze:
+        x = x[:, None]
+    out = np.empty_like(x)
+    if x.shape[1] < BLOCKED_COLUMNS:
+        for j in range(x.shape[1]):
+            dense = _ema_dense_column(x[:, j], alpha, min_periods)
+            out[:, j] = _ema_column(x[:, j].tolist(), alpha, min_periods) if dense is None else dense
+    elif len(x):
+        missing = np.isnan(x)
+        first = np.where(missing.all(axis=0), len(x), missing.argmin(axis=0))
+        gaps = (missing & (np.arange(len(x))[:, None] > first)).any(axis=0)
+        dense = np.flatnonzero(~gaps)
+        if len(dense):
+            out[:, dense] = _ema_blocked(x[:, dense], alpha, min_periods, first[dense])
+        sparse = np.flatnonzero(gaps)
+        if len(sparse) >= VECTOR_COLUMNS:
+            out[:, sparse] = _ema_columns(x[:, sparse], alpha, min_periods)
+        else:
+            for j in sparse:
+                out[:, j] = _ema_column(x[:, j].tolist(), alpha, min_periods)
+    return out[:, 0] if squeeze else out
+
+def diff(x: np.ndarray) -> np.ndarray:
+    """First difference along axis 0 with a leading NaN, like Series.diff()"""
+    out = np.empty_like(x)
+    out[:1] = np.nan
+    np.subtract(x[1:], x[:-1], out=out[1:])
+    return out
+
+def padding_mask(n_bars: int, lengths: np.ndarray) -> np.ndarray:
+    """True for the padding rows above each column of a right-aligned panel"""
+    return np.arange(n_bars)[:, None] < (n_bars - np.asarray(lengths))[None, :]
+
+def rsi(close: np.ndarray, period: int = 14, lengths: Optional[np.ndarray] = None) -> np.ndarray:
+    """Raw RSI as computed by ta.momentum.RSIIndicator(fillna=False)
+
+    For a right-aligned panel pass the per-column `lengths`, so padding
+    isn't mistaken for zero price changes.
+    """
+    close = _as_float(close)
+    delta = diff(close)
+    with np.errstate(invalid='ignore'):
+        up = np.where(delta > 0, delta, 0.0).astype(close.dtype)
+        down = np.where(delta < 0, -delta, 0.0).astype(close.dtype)
+    if lengths is not None and close.ndim == 2:
+        pad = padding_mask(len(close), lengths)
+        up[pad] = np.nan
+        down[pad] = np.nan
+    emaup = ema(up, 1.0 / period, period)
+    emadn = ema(down, 1.0 / period, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(emadn == 0, 100.0, 100.0 - 100.0 / (1.0 + emaup / emadn)).astype(close.dtype)
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray]:
+    """Raw MACD line and signal line as computed by ta.trend.MACD(fillna=False)"""
+    close = _as_float(close)
+    line = ema(close, 2.0 / (fast + 1), fast) - ema(close, 2.0 / (slow + 1), slow)
+    return line, ema(line, 2.0 / (signal + 1), signal)
+
+def sma(close: np.ndarray, window: int) -> np.ndarray:
+    """Rolling mean with min_periods=window, NaN if the window holds a missing value"""
+    close = _as_float(close)
+    out = np.full(close.shape, np.nan, dtype=close.dtype)
+    if len(close) < window:
+        return out
+    missing = np.isnan(close)
+    # Accumulate in float64 so float32 inputs don't drift over long histories
+    sums = np.cumsum(np.where(missing, 0.0, close), axis=0, dtype=np.float64)
+    counts = np.cumsum(missing, axis=0)
+    window_sums = sums[window - 1:].copy()
+    window_sums[1:] -= sums[:-window]
+    window_missing = counts[window - 1:].copy()
+    window_missing[1:] -= counts[:-window]
+    out[window - 1:] = np.where(window_missing == 0, window_sums / window, np.nan)
+    return out
+
+def _lengths(close: np.ndarray, lengths: Optional[np.ndarray]):
+    """Number of bars per column; a 1D series is one column of full length"""
+    if lengths is not None:
+        return lengths
+    return len(close) if close.ndim == 1 else np.full(close.shape[1], len(close))
+
+def rsi_filled(close: np.ndarray, period: int = 14, lengths: Optional[np.ndarray] = None) -> np.ndarray:
+    """RSI with TechnicalIndicators.calculate_rsi's fill rules
+
+    Series shorter than 2 * period are neutral (50). Otherwise the only
+    NaNs are the warm-up bars, which become 50; RSI never has gaps after
+    warm-up, so calculate_rsi's ffill(limit=1) has nothing to fill.
+    """
+    values = rsi(close, period, lengths)
+    values = np.where(np.isnan(values), 50.0, np.clip(values, 0, 100)).astype(values.dtype)
+    short = _lengths(values, lengths) < period * 2
+    if np.ndim(short) == 0:
+        return np.full_like(values, 50.0) if short else values
+    values[:, short] = 50.0
+    return values
+
+def macd_filled(close: np.ndarray, lengths: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD, signal and histogram with TechnicalIndicators.calculate_macd's fill rules"""
+    line, signal = macd(close)
+    # EMAs only produce NaN during warm-up, so ffill().fillna(0) is a fill with 0
+    line = np.nan_to_num(line, nan=0.0)
+    signal = np.nan_to_num(signal, nan=0.0)
+    short = _lengths(line, lengths) < 35
+    if np.ndim(short) == 0:
+        if short:
+            line, signal = np.zeros_like(line), np.zeros_like(signal)
+    else:
+        line[:, short] = 0.0
+        signal[:, short] = 0.0
+    return line, signal, line - signal
+
+def moving_averages(close: np.ndarray) -> Dict[str, np.ndarray]:
+    """MA20, MA50 and MA200 as in TechnicalIndicators.calculate_moving_averages"""
+    return {name: sma(close, window) for name, window in MA_WINDOWS.items()}
+
+class NumpyIndicators:
+    """NumPy engine with the same calculate_* interface as TechnicalIndicators
+
+    pandas is only imported here, at the frame boundary, so the API's array
+    paths never load it.
+    """
+
+    def calculate_rsi(self, df: pd.DataFrame, period: int = 14) -> pd.Series:
+        """Calculate RSI"""
+        import pandas as pd
+        return pd.Series(rsi_filled(df['close'].to_numpy(dtype=float), period), index=df.index)
+
+    def calculate_macd(self, df: pd.DataFrame) -> tuple:
+        """Calculate MACD"""
+        import pandas as pd
+        line, signal, hist = macd_filled(df['close'].to_numpy(dtype=float))
+        return (pd.Series(line, index=df.index), pd.Series(signal, index=df.index),
+                pd.Series(hist, index=df.index))
+
+    def calculate_moving_averages(self, df: pd.DataFrame) -> Dict[str, pd.Series]:
+        """Calculate moving averages"""
+        import pandas as pd
+        mas = moving_averages(df['close'].to_numpy(dtype=float))
+        return {name: pd.Series(values, index=df.index) for name, values in mas.items()}
@@ -0,0 +1,55 @@
+import itertools
+import json
+import logging
+import os
+from typing import Optional
+
+# Expensive per-symbol diagnostics are logged for one call in this many
+DIAGNOSTIC_SAMPLE = int(os.environ.get('LOG_SAMPLE_EVERY', 100))
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with `extra` fields as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level: Optional[str] = None, structured: Optional[bool] = None):
+    """Set up the root logger for an entry point
+
+    Library modules never call this; the API app and command-line scripts
+    do. LOG_LEVEL and LOG_FORMAT=json override the defaults.
+    """
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    if structured is None:
+        structured = os.environ.get('LOG_FORMAT', '').lower() == 'json'
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if structured else
+                         logging.Formatter('%(asctime)s %(levelname)s:%(name)s:%(message)s'))
+    logging.basicConfig(level=level, handlers=[handler])
+
+class Sampler:
+    """True for one call in `every`, to thin out diagnostics on hot paths"""
+
+    def __init__(self, every: int = DIAGNOSTIC_SAMPLE):
+        self.every = max(1, every)
+        self._calls = itertools.count()
+
+    def __call__(self) -> bool:
+        return next(self._calls) % self.every == 0
+
+def sampled(logger: logging.Logger, sampler: Sampler, level: int = logging.DEBUG) -> bool:
+    """Whether to emit a sampled diagnostic: the level check comes first, so a
+    disabled logger costs one call and leaves the sampler untouched"""
+    return logger.isEnabledFor(level) and sampler()
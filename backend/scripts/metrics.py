@@ -0,0 +1,176 @@
+import json
+import os
+import time
+import logging
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from prometheus_client import Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from scripts.profiling import current_profile
+
+logger = logging.getLogger(__name__)
+
+# Where request time goes; every stage timer is one of these
+STAGES = ('db_read', 'compute', 'serialize', 'upstream_fetch')
+
+# Stages range from sub-millisecond panel kernels to multi-second downloads
+STAGE_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+
+STAGE_LATENCY = Histogram('screener_stage_duration_seconds', 'Time spent per processing stage',
+                          ['stage'], buckets=STAGE_BUCKETS)
+
+# Label lookups take a lock, so each stage's child is resolved once
+_STAGE_TIMERS = {name: STAGE_LATENCY.labels(name) for name in STAGES}
+
+# Seconds per stage for the request the current context belongs to, if any
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('request_timings', default=None)
+
+class _Stage:
+    __slots__ = ('name', 'start', 'timings', 'profile')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = request_timings.get()
+        self.profile = current_profile.get()
+        if self.profile is not None:
+            self.profile.enter()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _STAGE_TIMERS[self.name].observe(elapsed)
+        if self.timings is not None:
+            self.timings[self.name] = self.timings.get(self.name, 0.0) + elapsed
+        if self.profile is not None:
+            self.profile.exit()
+        return False
+
+def stage(name: str) -> _Stage:
+    """Time a block as one of STAGES: `with stage('db_read'):`
+
+    The time goes to the stage histogram and, inside a request, to that
+    request's Server-Timing breakdown. If the request is being profiled,
+    the block's thread is sampled while it runs.
+    """
+    if name not in _STAGE_TIMERS:
+        raise KeyError(name)
+    return _Stage(name)
+
+class CacheStats:
+    """Hit and miss counts for a cache that doesn't keep its own"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def counts(self) -> Tuple[int, int]:
+        return self.hits, self.misses
+
+class CacheCollector:
+    """Expose hit/miss counters and hit ratios of registered caches at scrape time
+
+    Each source is a callable returning (hits, misses), so caches that
+    already count (lru_cache, single-flight groups) cost nothing extra
+    until scraped.
+    """
+
+    def __init__(self):
+        self.sources: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+    def collect(self) -> Iterator:
+        requests = CounterMetricFamily('screener_cache_requests', 'Cache lookups by result',
+                                       labels=['cache', 'result'])
+        ratio = GaugeMetricFamily('screener_cache_hit_ratio', 'Cache hits over lookups since start',
+                                  labels=['cache'])
+        for name, source in sorted(self.sources.items()):
+            hits, misses = source()
+            requests.add_metric([name, 'hit'], hits)
+            requests.add_metric([name, 'miss'], misses)
+            ratio.add_metric([name], hits / (hits + misses) if hits + misses else 0.0)
+        yield requests
+        yield ratio
+
+caches = CacheCollector()
+REGISTRY.register(caches)
+
+def register_cache(name: str, source: Callable[[], Tuple[int, int]]):
+    """Report a cache under `name`; `source` returns its (hits, misses)"""
+    caches.sources[name] = source
+
+def ingest_path(db_path) -> Path:
+    """Sidecar file holding ingestion run stats for a database"""
+    return Path(str(db_path) + '.ingest')
+
+def _read_ingest(db_path) -> Dict:
+    try:
+        return json.loads(ingest_path(db_path).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def record_ingest_run(db_path, job: str, symbols: int, rows: int, failures: int, duration: float) -> Dict:
+    """Add one ingestion run to the totals kept next to the database
+
+    Ingestion runs in its own process, so its stats are written where the
+    API can read them at scrape time. The file is replaced atomically.
+    """
+    stats = _read_ingest(db_path)
+    job_stats = stats.get(job, {'runs': 0, 'symbols': 0, 'rows': 0, 'failures': 0, 'seconds': 0.0})
+    job_stats.update({
+        'runs': job_stats['runs'] + 1,
+        'symbols': job_stats['symbols'] + symbols,
+        'rows': job_stats['rows'] + rows,
+        'failures': job_stats['failures'] + failures,
+        'seconds': job_stats['seconds'] + duration,
+        'last': {'symbols': symbols, 'rows': rows, 'failures': failures, 'duration': duration,
+                 'finished_at': datetime.now().timestamp()}
+    })
+    stats[job] = job_stats
+    path = ingest_path(db_path)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(stats))
+    os.replace(tmp, path)
+    logger.info(f"Ingest {job}: {symbols} symbols, {rows} rows, {failures} failures in {duration:.1f}s")
+    return job_stats
+
+class IngestCollector:
+    """Expose the ingestion run stats recorded for the API's database"""
+
+    def __init__(self, db_path: Callable[[], str]):
+        self.db_path = db_path
+
+    def collect(self) -> Iterator:
+        stats = _read_ingest(self.db_path())
+        totals = {name: CounterMetricFamily(f'screener_ingest_{name}', help, labels=['job'])
+                  for name, help in (('runs', 'Ingestion runs'),
+                                     ('symbols_fetched', 'Symbols fetched from upstream'),
+                                     ('rows_written', 'Price rows written'),
+                                     ('failures', 'Symbols that failed to fetch or store'),
+                                     ('duration_seconds', 'Total ingestion run time'))}
+        last = GaugeMetricFamily('screener_ingest_last_duration_seconds', 'Duration of the latest run',
+                                 labels=['job'])
+        finished = GaugeMetricFamily('screener_ingest_last_finished_timestamp_seconds',
+                                     'When the latest run finished', labels=['job'])
+        for job, job_stats in sorted(stats.items()):
+            totals['runs'].add_metric([job], job_stats['runs'])
+            totals['symbols_fetched'].add_metric([job], job_stats['symbols'])
+            totals['rows_written'].add_metric([job], job_stats['rows'])
+            totals['failures'].add_metric([job], job_stats['failures'])
+            totals['duration_seconds'].add_metric([job], job_stats['seconds'])
+            last.add_metric([job], job_stats['last']['duration'])
+            finished.add_metric([job], job_stats['last']['finished_at'])
+        yield from totals.values()
+        yield last
+        yield finished
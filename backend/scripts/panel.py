@@ -0,0 +1,262 @@
+import sqlite3
+import logging
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from scripts import kernels
+from scripts.adjustments import cumulative_factors
+from scripts.metrics import stage
+from scripts.precision import DEFAULT_MODE, cast_field, current_mode, empty_value, field_dtype
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# Stay under SQLite's bound-parameter limit on older builds
+QUERY_CHUNK = 900
+
+# Dates are int32 days since 1970-01-01, half the size of datetime64; padding rows hold NO_DATE
+NO_DATE = np.iinfo(np.int32).min
+
+def to_days(dates) -> np.ndarray:
+    """int32 day numbers for dates, 'YYYY-MM-DD' strings or datetime64 values; NaT becomes NO_DATE"""
+    days = np.asarray(dates, dtype='datetime64[D]').view(np.int64)
+    return np.where(days == np.iinfo(np.int64).min, NO_DATE, days).astype(np.int32)
+
+def day_strings(days: np.ndarray) -> List[Optional[str]]:
+    """'YYYY-MM-DD' for each day number, None for NO_DATE"""
+    days = np.asarray(days)
+    strings = days.astype(np.int64).astype('datetime64[D]').astype(str).tolist()
+    if (days == NO_DATE).any():
+        strings = [None if missing else s for s, missing in zip(strings, (days == NO_DATE).tolist())]
+    return strings
+
+class PricePanel:
+    """Price history for many symbols as (bars, symbols) arrays
+
+    Column j holds symbol j's own bars, right-aligned so that every
+    symbol's latest bar is on the last row; shorter histories are padded
+    with NaN (NO_DATE for dates) at the top. Indicators computed down a
+    column therefore match the single-symbol calculation exactly.
+    """
+    __slots__ = ('symbols', 'dates', 'fields', 'lengths', 'index')
+
+    def __init__(self, symbols: List[str], dates: np.ndarray, fields: Dict[str, np.ndarray], lengths: np.ndarray):
+        self.symbols = symbols
+        self.dates = dates
+        self.fields = fields
+        self.lengths = lengths
+        self.index = {symbol: j for j, symbol in enumerate(symbols)}
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.fields['close']
+
+    def latest(self, field: str = 'close') -> np.ndarray:
+        """Latest value of a field for every symbol"""
+        return self.fields[field][-1] if len(self.dates) else np.full(len(self.symbols), np.nan)
+
+    def latest_dates(self) -> List[Optional[str]]:
+        """Latest bar date for every symbol as 'YYYY-MM-DD' (None if it has no bars)"""
+        if not len(self.dates):
+            return [None] * len(self.symbols)
+        return day_strings(self.dates[-1])
+
+    def series(self, symbol: str) -> 'PriceSeries':
+        """One symbol's bars as views of the panel's columns"""
+        j = self.index[symbol]
+        rows = slice(len(self.dates) - int(self.lengths[j]), None)
+        return PriceSeries(symbol, self.dates[rows, j], {name: values[rows, j] for name, values in self.fields.items()})
+
+class PriceSeries:
+    """One symbol's bars: int32 day numbers plus one array per field
+
+    Slicing returns views, so cutting a date range or a trailing window
+    copies nothing. The indicator methods run the NumPy kernels directly
+    and give the same values as TechnicalIndicators.calculate_*; pandas is
+    only needed to build a series from a frame at the API boundary.
+    """
+    __slots__ = ('symbol', 'dates', 'fields')
+
+    def __init__(self, symbol: str, dates: np.ndarray, fields: Dict[str, np.ndarray]):
+        self.symbol = symbol
+        self.dates = dates
+        self.fields = fields
+
+    @classmethod
+    def from_frame(cls, df, symbol: str, mode: Optional[str] = None) -> 'PriceSeries':
+        """Build from a stock_prices or yfinance frame; dates come from a 'date' column or the index"""
+        columns = {str(column).lower(): column for column in df.columns}
+        dates = df[columns['date']] if 'date' in columns else df.index
+        if getattr(dates.dtype, 'tz', None) is not None:
+            dates = dates.tz_localize(None)
+        fields = {field: np.ascontiguousarray(cast_field(df[columns[field]].to_numpy(dtype=float),
+                                                         field_dtype(field, mode)))
+                  for field in FIELDS if field in columns}
+        return cls(symbol, to_days(np.asarray(dates, dtype='datetime64[D]')), fields)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, rows: slice) -> 'PriceSeries':
+        if not isinstance(rows, slice):
+            raise TypeError("PriceSeries only supports slicing")
+        return PriceSeries(self.symbol, self.dates[rows], {name: values[rows] for name, values in self.fields.items()})
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.fields['close']
+
+    def span(self, start: Optional[str] = None, end: Optional[str] = None) -> slice:
+        """Rows from `start` to `end` inclusive"""
+        lo = int(np.searchsorted(self.dates, to_days(start), side='left')) if start else 0
+        hi = int(np.searchsorted(self.dates, to_days(end), side='right')) if end else len(self.dates)
+        return slice(lo, max(lo, hi))
+
+    def between(self, start: Optional[str] = None, end: Optional[str] = None) -> 'PriceSeries':
+        """Bars from `start` to `end` inclusive, as views"""
+        return self[self.span(start, end)]
+
+    def last_date(self) -> Optional[str]:
+        return day_strings(self.dates[-1:])[0] if len(self.dates) else None
+
+    def rsi(self, period: int = 14) -> np.ndarray:
+        return kernels.rsi_filled(self.close, period)
+
+    def macd(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return kernels.macd_filled(self.close)
+
+    def moving_averages(self) -> Dict[str, np.ndarray]:
+        return kernels.moving_averages(self.close)
+
+def _placeholders(n: int) -> str:
+    return ','.join('?' * n)
+
+def _fetch_rows(conn: sqlite3.Connection, table: str, columns: str, symbols: Sequence[str],
+                order: str) -> List[tuple]:
+    """Fetch rows for many symbols in a few IN queries"""
+    rows = []
+    for start in range(0, len(symbols), QUERY_CHUNK):
+        chunk = symbols[start:start + QUERY_CHUNK]
+        rows.extend(conn.execute(
+            f"SELECT {columns} FROM {table} WHERE symbol IN ({_placeholders(len(chunk))}) ORDER BY {order}",
+            chunk
+        ).fetchall())
+    return rows
+
+def _adjust(panel: PricePanel, conn: sqlite3.Connection):
+    """Apply corporate action factors in place to the symbols that have any"""
+    try:
+        actions = _fetch_rows(conn, 'corporate_actions', 'symbol, ex_date, price_factor, volume_factor',
+                              panel.symbols, 'symbol, ex_date')
+    except sqlite3.OperationalError:
+        # Databases created before corporate actions were tracked
+        return
+    by_symbol: Dict[str, list] = {}
+    for symbol, ex_date, price_factor, volume_factor in actions:
+        by_symbol.setdefault(symbol, []).append((ex_date, price_factor, volume_factor))
+
+    for symbol, rows in by_symbol.items():
+        j = panel.index[symbol]
+        n = panel.lengths[j]
+        if not n:
+            continue
+        bars = slice(len(panel.dates) - n, None)
+        ex_dates = to_days([r[0] for r in rows])
+        dates = panel.dates[bars, j]
+        price = cumulative_factors(dates, ex_dates, np.array([r[1] for r in rows]))
+        volume = cumulative_factors(dates, ex_dates, np.array([r[2] for r in rows]))
+        for field in ('open', 'high', 'low', 'close'):
+            if field in panel.fields:
+                panel.fields[field][bars, j] *= price
+        if 'volume' in panel.fields:
+            column = panel.fields['volume']
+            column[bars, j] = cast_field(column[bars, j] * volume, column.dtype)
+
+def load_panel(db_path: str, symbols: Iterable[str], fields: Sequence[str] = ('close',),
+               adjusted: bool = True, mode: Optional[str] = None) -> PricePanel:
+    """Load many symbols' history from stock_prices with one ordered scan
+
+    `mode` picks the array dtypes (see scripts.precision); by default the
+    PANEL_PRECISION setting.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {sorted(unknown)}")
+
+    with stage('db_read'), sqlite3.connect(db_path) as conn:
+        rows = _fetch_rows(conn, 'stock_prices', 'symbol, date, ' + ', '.join(fields), symbols, 'symbol, date')
+        panel = _build(symbols, rows, fields, mode or current_mode())
+        if adjusted:
+            _adjust(panel, conn)
+    logger.debug(f"Loaded panel of {len(rows)} rows for {len(symbols)} symbols")
+    return panel
+
+def _build(symbols: List[str], rows: List[tuple], fields: Sequence[str], mode: str = DEFAULT_MODE) -> PricePanel:
+    """Scatter rows ordered by (symbol, date) into a right-aligned panel"""
+    n_symbols = len(symbols)
+    if not rows:
+        empty = {field: np.empty((0, n_symbols), dtype=field_dtype(field, mode)) for field in fields}
+        return PricePanel(symbols, np.empty((0, n_symbols), dtype=np.int32), empty,
+                          np.zeros(n_symbols, dtype=np.int64))
+
+    columns = list(zip(*rows))
+    row_symbols = np.array(columns[0], dtype=object)
+    # Rows arrive grouped by symbol; find each group's start and size
+    starts = np.flatnonzero(np.r_[True, row_symbols[1:] != row_symbols[:-1]])
+    counts = np.diff(np.r_[starts, len(rows)])
+    lookup = {s: j for j, s in enumerate(symbols)}
+    group_columns = np.array([lookup[s] for s in row_symbols[starts]])
+
+    lengths = np.zeros(n_symbols, dtype=np.int64)
+    lengths[group_columns] = counts
+    n_bars = int(counts.max())
+
+    # Row r of group g lands at n_bars - count_g + (r - start_g)
+    group_of_row = np.repeat(np.arange(len(starts)), counts)
+    target_rows = n_bars - counts[group_of_row] + (np.arange(len(rows)) - starts[group_of_row])
+    target_cols = group_columns[group_of_row]
+
+    dates = np.full((n_bars, n_symbols), NO_DATE, dtype=np.int32)
+    dates[target_rows, target_cols] = to_days(columns[1])
+    values = {}
+    for k, field in enumerate(fields):
+        dtype = field_dtype(field, mode)
+        matrix = np.full((n_bars, n_symbols), empty_value(dtype), dtype=dtype)
+        matrix[target_rows, target_cols] = cast_field(columns[2 + k], dtype)
+        values[field] = matrix
+    return PricePanel(symbols, dates, values, lengths)
+
+def latest_indicators(panel: PricePanel, indicators: Sequence[str] = ('RSI', 'MACD', 'MA')) -> Dict[str, object]:
+    """Latest value of each requested indicator for every symbol in one vectorized pass
+
+    Results match TechnicalIndicators.calculate_* on each symbol's history.
+    """
+    close = panel.close
+    result: Dict[str, object] = {}
+    if not len(close):
+        nan = np.full(len(panel), np.nan)
+        if 'RSI' in indicators:
+            result['RSI'] = nan
+        if 'MACD' in indicators:
+            result['MACD'] = {'macd': nan, 'signal': nan, 'histogram': nan}
+        if 'MA' in indicators:
+            result['MA'] = {name: nan for name in kernels.MA_WINDOWS}
+        return result
+
+    if 'RSI' in indicators:
+        result['RSI'] = kernels.rsi_filled(close, lengths=panel.lengths)[-1]
+    if 'MACD' in indicators:
+        line, signal, hist = kernels.macd_filled(close, lengths=panel.lengths)
+        result['MACD'] = {'macd': line[-1], 'signal': signal[-1], 'histogram': hist[-1]}
+    if 'MA' in indicators:
+        # Only the trailing window matters for the latest simple average
+        result['MA'] = {
+            name: kernels.sma(close[-window:], window)[-1] if len(close) >= window else np.full(len(panel), np.nan)
+            for name, window in kernels.MA_WINDOWS.items()
+        }
+    return result
@@ -0,0 +1,174 @@
+import argparse
+import json
+import logging
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from scripts.indicators import TechnicalIndicators
+from scripts.kernels import NumpyIndicators
+from scripts.synthetic import generate_symbol
+
+logger = logging.getLogger(__name__)
+
+BASELINE_FILE = Path(__file__).parent.parent / 'data' / 'indicator_baselines.json'
+
+# Absolute and relative tolerance for engine output versus the reference
+RTOL = 1e-8
+ATOL = 1e-8
+
+# Fail if an engine gets this much slower, relative to the reference, than its baseline
+MAX_SLOWDOWN = 0.25
+
+ENGINES: Dict[str, Callable] = {
+    'reference': lambda: TechnicalIndicators(),
+    'numpy': NumpyIndicators,
+}
+
+def _frame(close) -> pd.DataFrame:
+    """Wrap a close series in the frame layout the engines expect"""
+    close = np.asarray(close, dtype=float)
+    return pd.DataFrame({
+        'date': pd.bdate_range('2020-01-01', periods=len(close)),
+        'close': close
+    })
+
+def parity_cases(seed: int = 11) -> Dict[str, pd.DataFrame]:
+    """Generated series plus edge cases: short histories, flat prices and gaps"""
+    cases = {}
+    for i, bars in enumerate([60, 252, 1260, 2520]):
+        cases[f"synthetic_{bars}"] = _frame(generate_symbol(i, bars, seed)['close'])
+    for bars in [1, 5, 14, 27, 28, 34, 35, 36, 199, 200]:
+        cases[f"short_{bars}"] = _frame(generate_symbol(bars, bars, seed)['close'])
+    cases['flat'] = _frame(np.full(300, 42.0))
+    cases['flat_then_move'] = _frame(np.r_[np.full(100, 10.0), np.linspace(10, 20, 200)])
+    cases['monotonic_up'] = _frame(np.linspace(10, 100, 300))
+    cases['monotonic_down'] = _frame(np.linspace(100, 10, 300))
+    gaps = generate_symbol(99, 400, seed)['close']
+    gaps[[50, 51, 52, 120, 300, 399]] = np.nan
+    cases['gaps'] = _frame(gaps)
+    leading = generate_symbol(98, 300, seed)['close']
+    leading[:40] = np.nan
+    cases['leading_nan'] = _frame(leading)
+    return cases
+
+def _outputs(engine, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Run every indicator of an engine and flatten its outputs to arrays"""
+    macd, signal, hist = engine.calculate_macd(df)
+    outputs = {
+        'RSI': engine.calculate_rsi(df),
+        'MACD.macd': macd,
+        'MACD.signal': signal,
+        'MACD.histogram': hist,
+    }
+    for name, values in engine.calculate_moving_averages(df).items():
+        outputs[f"MA.{name}"] = values
+    return {name: np.asarray(values, dtype=float) for name, values in outputs.items()}
+
+def check_parity(engine, cases: Dict[str, pd.DataFrame], rtol: float = RTOL, atol: float = ATOL) -> List[Dict]:
+    """Compare an engine to the reference and return every mismatch"""
+    reference = ENGINES['reference']()
+    failures = []
+    for case, df in cases.items():
+        expected = _outputs(reference, df)
+        actual = _outputs(engine, df)
+        for name, want in expected.items():
+            got = actual.get(name)
+            if got is None or got.shape != want.shape:
+                failures.append({'case': case, 'indicator': name, 'error': 'shape mismatch'})
+                continue
+            if not np.allclose(got, want, rtol=rtol, atol=atol, equal_nan=True):
+                with np.errstate(invalid='ignore'):
+                    err = np.nanmax(np.abs(got - want)) if np.isfinite(got - want).any() else np.nan
+                nan_mismatch = int((np.isnan(got) != np.isnan(want)).sum())
+                failures.append({'case': case, 'indicator': name,
+                                 'error': f"max abs diff {err}, {nan_mismatch} NaN mismatches"})
+    return failures
+
+def time_engine(engine, cases: Dict[str, pd.DataFrame], repeat: int = 5) -> Dict[str, float]:
+    """Best-of-`repeat` seconds per indicator over all cases"""
+    calls = {
+        'RSI': engine.calculate_rsi,
+        'MACD': engine.calculate_macd,
+        'MA': engine.calculate_moving_averages,
+    }
+    timings = {}
+    for name, fn in calls.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for df in cases.values():
+                fn(df)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    return timings
+
+def relative_timings(cases: Dict[str, pd.DataFrame], repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    """Time every engine as a ratio to the reference so baselines survive hardware changes"""
+    reference = time_engine(ENGINES['reference'](), cases, repeat)
+    result = {}
+    for name, factory in ENGINES.items():
+        timings = reference if name == 'reference' else time_engine(factory(), cases, repeat)
+        result[name] = {
+            indicator: {'seconds': seconds, 'ratio': seconds / reference[indicator]}
+            for indicator, seconds in timings.items()
+        }
+    return result
+
+def find_regressions(current: Dict, baseline: Dict, max_slowdown: float = MAX_SLOWDOWN) -> List[str]:
+    """List engine/indicator pairs whose relative time grew more than `max_slowdown`"""
+    regressions = []
+    for engine, indicators in current.items():
+        for indicator, timing in indicators.items():
+            base = baseline.get(engine, {}).get(indicator)
+            if engine == 'reference' or base is None:
+                continue
+            if timing['ratio'] > base['ratio'] * (1 + max_slowdown):
+                regressions.append(f"{engine}.{indicator}: {timing['ratio']:.3f}x reference "
+                                   f"vs baseline {base['ratio']:.3f}x")
+    return regressions
+
+def main():
+    """Check parity and timing regressions from the command line"""
+    parser = argparse.ArgumentParser(description="Indicator parity and performance regression harness")
+    parser.add_argument('--baseline', default=str(BASELINE_FILE))
+    parser.add_argument('--update-baseline', action='store_true', help="Record current timings as the baseline")
+    parser.add_argument('--max-slowdown', type=float, default=MAX_SLOWDOWN)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(levelname)s:%(message)s')
+    logging.getLogger().setLevel(logging.ERROR)
+
+    cases = parity_cases()
+    ok = True
+    for name, factory in ENGINES.items():
+        if name == 'reference':
+            continue
+        failures = check_parity(factory(), cases)
+        print(f"{name}: {'OK' if not failures else f'{len(failures)} parity failures'}")
+        for failure in failures:
+            print(f"  {failure['case']} {failure['indicator']}: {failure['error']}")
+        ok &= not failures
+
+    current = relative_timings(cases, args.repeat)
+    for engine, indicators in current.items():
+        print(engine + ': ' + ', '.join(f"{i} {t['seconds'] * 1000:.1f}ms ({t['ratio']:.2f}x)"
+                                         for i, t in indicators.items()))
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(current, indent=2))
+        print(f"Baseline written to {baseline_path}")
+    elif baseline_path.exists():
+        regressions = find_regressions(current, json.loads(baseline_path.read_text()), args.max_slowdown)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        ok &= not regressions
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
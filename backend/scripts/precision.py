@@ -0,0 +1,35 @@
+import os
+import numpy as np
+from typing import Optional
+
+# Array dtypes per precision mode; dates are int32 day numbers in every mode.
+# Compact halves the panel: float32 prices carry ~7 significant digits, and
+# volume saturates at 2**32 - 1 shares per bar with 0 (not NaN) as padding.
+MODES = {
+    'float64': {'price': np.dtype(np.float64), 'volume': np.dtype(np.float64)},
+    'compact': {'price': np.dtype(np.float32), 'volume': np.dtype(np.uint32)},
+}
+
+DEFAULT_MODE = 'float64'
+
+def current_mode() -> str:
+    """Precision mode for loaded and published panels, from PANEL_PRECISION"""
+    mode = os.environ.get('PANEL_PRECISION', DEFAULT_MODE)
+    if mode not in MODES:
+        raise ValueError(f"Unknown PANEL_PRECISION {mode!r}, expected one of {sorted(MODES)}")
+    return mode
+
+def field_dtype(field: str, mode: Optional[str] = None) -> np.dtype:
+    return MODES[mode or current_mode()]['volume' if field == 'volume' else 'price']
+
+def empty_value(dtype: np.dtype):
+    """Padding for a field: NaN for floats, 0 for integer volume"""
+    return np.nan if dtype.kind == 'f' else 0
+
+def cast_field(values, dtype: np.dtype) -> np.ndarray:
+    """Convert values to a field dtype; integer volume is rounded and saturated instead of wrapping"""
+    values = np.asarray(values, dtype=np.float64)
+    if dtype.kind in 'iu':
+        info = np.iinfo(dtype)
+        return np.clip(np.rint(np.nan_to_num(values, nan=0.0)), info.min, info.max).astype(dtype)
+    return values.astype(dtype, copy=False)
@@ -0,0 +1,99 @@
+import os
+import sys
+import threading
+import time
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Seconds between stack samples while any profile is running
+SAMPLE_INTERVAL = 0.005
+
+# Deeper frames than this are cut from the root end of a stack
+MAX_STACK_DEPTH = 64
+
+class Profile:
+    """Stack samples for one request
+
+    Only threads doing staged work for the request are sampled: stage()
+    marks the current thread while its block runs. This keeps samples from
+    concurrent requests out of the profile, at the cost of not seeing time
+    spent outside any stage.
+    """
+
+    def __init__(self):
+        self.samples: Counter = Counter()
+        self.threads: Dict[int, int] = {}
+        self.started = time.perf_counter()
+
+    def enter(self):
+        ident = threading.get_ident()
+        self.threads[ident] = self.threads.get(ident, 0) + 1
+
+    def exit(self):
+        ident = threading.get_ident()
+        depth = self.threads.get(ident, 1) - 1
+        if depth:
+            self.threads[ident] = depth
+        else:
+            self.threads.pop(ident, None)
+
+    def top(self, n: int) -> List[Dict]:
+        """Most sampled stacks, root first in collapsed 'module:function;...' form"""
+        return [{'stack': stack, 'samples': count} for stack, count in self.samples.most_common(n)]
+
+# The profile of the request the current context belongs to, if it is being profiled
+current_profile: ContextVar[Optional[Profile]] = ContextVar('current_profile', default=None)
+
+def collapse(frame) -> str:
+    """Render a frame and its callers as 'module:function;...' from the root down"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class StackSampler:
+    """Background thread that samples the marked threads of every running profile
+
+    The thread only runs while at least one profile is active, so an idle
+    profiler costs nothing.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.active: Set[Profile] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: Profile):
+        with self._lock:
+            self.active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: Profile):
+        with self._lock:
+            self.active.discard(profile)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self.active:
+                    self._thread = None
+                    return
+                profiles = list(self.active)
+            frames = sys._current_frames()
+            for profile in profiles:
+                for ident in list(profile.threads):
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        profile.samples[collapse(frame)] += 1
+
+sampler = StackSampler()
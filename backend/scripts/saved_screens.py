@@ -0,0 +1,170 @@
+import json
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from scripts.screener import ScreenRun, validate_criteria
+from scripts.versioning import next_version, publish
+from scripts.shared_panel import publish_panel
+
+logger = logging.getLogger(__name__)
+
+def create_saved_screen_tables(conn: sqlite3.Connection):
+    """Create the saved screen, membership and change history tables if they don't exist
+
+    The primary keys double as the indexes for the read paths: members by
+    screen, and changes by screen and version.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS saved_screens (
+            name TEXT PRIMARY KEY,
+            criteria TEXT NOT NULL,
+            created_at TEXT,
+            version INTEGER
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS screen_members (
+            screen TEXT,
+            symbol TEXT,
+            since_version INTEGER,
+            PRIMARY KEY (screen, symbol)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS screen_changes (
+            screen TEXT,
+            version INTEGER,
+            symbol TEXT,
+            change TEXT,
+            changed_at TEXT,
+            PRIMARY KEY (screen, version, symbol)
+        )
+    ''')
+
+def _published(db_path: str) -> int:
+    """Latest published version as a number (0 if never published)"""
+    return next_version(db_path) - 1
+
+def save_screen(db_path: str, name: str, criteria: Dict[str, Any]) -> Dict[str, Any]:
+    """Create or replace a saved screen and evaluate it once over the whole universe"""
+    criteria = validate_criteria(criteria)
+    members = sorted(record['symbol'] for record in ScreenRun(db_path, criteria))
+    version = _published(db_path)
+    with sqlite3.connect(db_path) as conn:
+        create_saved_screen_tables(conn)
+        delete_screen(conn, name)
+        conn.execute('INSERT INTO saved_screens (name, criteria, created_at, version) VALUES (?, ?, ?, ?)',
+                     (name, json.dumps(criteria, sort_keys=True), datetime.now().isoformat(sep=' '), version))
+        conn.executemany('INSERT INTO screen_members (screen, symbol, since_version) VALUES (?, ?, ?)',
+                         [(name, symbol, version) for symbol in members])
+    logger.info(f"Saved screen {name} with {len(members)} members")
+    return {'name': name, 'criteria': criteria, 'version': version, 'members': members}
+
+def delete_screen(conn: sqlite3.Connection, name: str) -> bool:
+    """Remove a saved screen with its membership and history"""
+    deleted = conn.execute('DELETE FROM saved_screens WHERE name = ?', (name,)).rowcount
+    conn.execute('DELETE FROM screen_members WHERE screen = ?', (name,))
+    conn.execute('DELETE FROM screen_changes WHERE screen = ?', (name,))
+    return deleted > 0
+
+def list_screens(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """Every saved screen with its member count"""
+    try:
+        rows = conn.execute('''
+            SELECT s.name, s.criteria, s.version,
+                   (SELECT COUNT(*) FROM screen_members m WHERE m.screen = s.name)
+            FROM saved_screens s ORDER BY s.name
+        ''').fetchall()
+    except sqlite3.OperationalError:
+        return []
+    return [{'name': name, 'criteria': json.loads(criteria), 'version': version, 'count': count}
+            for name, criteria, version, count in rows]
+
+def get_screen(conn: sqlite3.Connection, name: str) -> Optional[Dict[str, Any]]:
+    """A saved screen's criteria and current members, or None if it doesn't exist"""
+    try:
+        row = conn.execute('SELECT criteria, version FROM saved_screens WHERE name = ?', (name,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    if row is None:
+        return None
+    members = conn.execute('SELECT symbol, since_version FROM screen_members WHERE screen = ? ORDER BY symbol',
+                           (name,)).fetchall()
+    return {
+        'name': name,
+        'criteria': json.loads(row[0]),
+        'version': row[1],
+        'members': [symbol for symbol, _ in members],
+        'since': {symbol: since for symbol, since in members}
+    }
+
+def get_changes(conn: sqlite3.Connection, name: str, since: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Entries and exits of a saved screen after version `since`, oldest first"""
+    query = '''
+        SELECT version, symbol, change, changed_at FROM screen_changes
+        WHERE screen = ? AND version > ? ORDER BY version, symbol
+    '''
+    params: Tuple = (name, since)
+    if limit is not None:
+        query += ' LIMIT ?'
+        params += (limit,)
+    return [{'version': version, 'symbol': symbol, 'change': change, 'changed_at': changed_at}
+            for version, symbol, change, changed_at in conn.execute(query, params)]
+
+def refresh_saved_screens(db_path: str, symbols: Optional[Iterable[str]], version: int) -> Dict[str, Dict[str, List[str]]]:
+    """Re-evaluate every saved screen on the changed symbols and record entries and exits
+
+    `symbols` are the symbols whose bars changed (None means all). Other
+    symbols keep their membership, since their latest values can't have
+    moved. Returns the entered and exited symbols per screen.
+    """
+    changed = None if symbols is None else sorted(set(symbols))
+    with sqlite3.connect(db_path) as conn:
+        create_saved_screen_tables(conn)
+        screens = conn.execute('SELECT name, criteria FROM saved_screens').fetchall()
+    if not screens or changed == []:
+        return {}
+
+    now = datetime.now().isoformat(sep=' ')
+    diffs = {}
+    for name, criteria in screens:
+        matched = {record['symbol'] for record in ScreenRun(db_path, json.loads(criteria), changed)}
+        with sqlite3.connect(db_path) as conn:
+            if changed is None:
+                members = {row[0] for row in conn.execute(
+                    'SELECT symbol FROM screen_members WHERE screen = ?', (name,))}
+            else:
+                members = set()
+                for start in range(0, len(changed), 900):
+                    chunk = changed[start:start + 900]
+                    members.update(row[0] for row in conn.execute(
+                        f"SELECT symbol FROM screen_members WHERE screen = ? AND symbol IN ({','.join('?' * len(chunk))})",
+                        (name, *chunk)))
+            entered, exited = sorted(matched - members), sorted(members - matched)
+            conn.executemany('INSERT INTO screen_members (screen, symbol, since_version) VALUES (?, ?, ?)',
+                             [(name, symbol, version) for symbol in entered])
+            conn.executemany('DELETE FROM screen_members WHERE screen = ? AND symbol = ?',
+                             [(name, symbol) for symbol in exited])
+            conn.executemany('INSERT OR REPLACE INTO screen_changes VALUES (?, ?, ?, ?, ?)',
+                             [(name, version, symbol, 'entered', now) for symbol in entered] +
+                             [(name, version, symbol, 'exited', now) for symbol in exited])
+            conn.execute('UPDATE saved_screens SET version = ? WHERE name = ?', (version, name))
+        diffs[name] = {'entered': entered, 'exited': exited}
+        if entered or exited:
+            logger.info(f"Screen {name}: {len(entered)} entered, {len(exited)} exited at version {version}")
+    return diffs
+
+def refresh_and_publish(db_path, symbols: Optional[Iterable[str]] = None) -> Dict:
+    """Publish the shared panel and bring saved screens up to date with committed ingest
+    writes, then publish the new version
+
+    Both are done first so that anyone reacting to the publish finds the
+    panel and the screen changes already stored under the new version.
+    """
+    symbols = None if symbols is None else list(symbols)
+    version = next_version(db_path)
+    publish_panel(db_path, version)
+    refresh_saved_screens(str(db_path), symbols, version)
+    return publish(db_path, symbols)
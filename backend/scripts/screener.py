@@ -0,0 +1,379 @@
+import base64
+import json
+import sqlite3
+import time
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from scripts import kernels
+from scripts.panel import PricePanel, latest_indicators, load_panel
+from scripts.metrics import CacheStats, stage
+from scripts.shared_panel import current_panel
+
+logger = logging.getLogger(__name__)
+
+# Symbols loaded and evaluated per panel; bounds memory and time to the first match
+SCREEN_CHUNK = 250
+
+# Complete cross-sections kept per (database, criteria, data version)
+SECTION_CACHE_SIZE = 32
+
+MA_CONDITIONS = ('price_above', 'price_below')
+MACD_SIGNALS = ('bullish', 'bearish')
+
+INDICATORS = ('RSI', 'MACD', 'MA')
+
+# Cross-sectional values available for sorting and projection; MA*_distance is close / MA - 1
+COLUMNS = ('price', 'RSI', 'MACD', 'MACD.signal', 'MACD.histogram', 'MA20', 'MA50', 'MA200',
+           'MA20_distance', 'MA50_distance', 'MA200_distance')
+SORT_KEYS = ('symbol',) + COLUMNS
+FIELDS = ('date',) + COLUMNS
+
+def validate_criteria(criteria: Dict) -> Dict:
+    """Check screen criteria up front and return them with numeric thresholds
+
+    Raises ValueError for malformed criteria instead of letting every
+    symbol fail the same way during the scan.
+    """
+    criteria = dict(criteria or {})
+    for name in ('RSI', 'MACD', 'MA'):
+        if not isinstance(criteria.get(name) or {}, dict):
+            raise ValueError(f"{name} criteria must be an object")
+    if 'RSI' in criteria:
+        rsi = dict(criteria['RSI'] or {})
+        for bound in ('below', 'above'):
+            if bound in rsi:
+                try:
+                    rsi[bound] = float(rsi[bound])
+                except (TypeError, ValueError):
+                    raise ValueError(f"RSI {bound} must be a number, got {rsi[bound]!r}")
+        criteria['RSI'] = rsi
+    if 'MACD' in criteria:
+        signal = (criteria['MACD'] or {}).get('signal')
+        if signal is not None and signal not in MACD_SIGNALS:
+            raise ValueError(f"MACD signal must be one of {MACD_SIGNALS}, got {signal!r}")
+    if 'MA' in criteria:
+        for ma_type, condition in (criteria['MA'] or {}).items():
+            if ma_type in kernels.MA_WINDOWS and condition not in MA_CONDITIONS:
+                raise ValueError(f"{ma_type} condition must be one of {MA_CONDITIONS}, got {condition!r}")
+    return criteria
+
+def screens_all(criteria: Dict) -> bool:
+    """True if the criteria select every symbol"""
+    return not criteria or bool(criteria.get('show_all', False))
+
+def evaluate(panel: PricePanel, criteria: Dict, indicators: Sequence[str] = (),
+             latest: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Evaluate screen criteria for every symbol of a panel at its latest bar
+
+    Returns the boolean `match` array together with the latest arrays of
+    the indicators the criteria use, plus any listed in `indicators`.
+    Matches the per-symbol screen: RSI compares the filled latest value,
+    MACD looks for a histogram sign change on the last bar, MA compares
+    the latest close to the average. `latest` takes precomputed values
+    (as SharedPanel.take returns them) in place of running the kernels.
+    """
+    close = panel.close
+    has_data = panel.lengths > 0
+    match = has_data.copy()
+    everything = screens_all(criteria)
+    needed = [name for name in INDICATORS if name in indicators or (name in criteria and not everything)]
+    values: Dict[str, Any] = {}
+    if not needed or not len(close):
+        return {'match': match, 'values': values}
+
+    if latest is None:
+        latest = latest_indicators(panel, [name for name in ('RSI', 'MA') if name in needed])
+        if 'MACD' in needed:
+            line, signal, hist = kernels.macd_filled(close, lengths=panel.lengths)
+            latest['MACD'] = {'macd': line[-1], 'signal': signal[-1], 'histogram': hist[-1]}
+            previous = hist[-2] if len(hist) > 1 else np.full(len(panel), np.nan)
+            # A single bar has no previous histogram value to cross from
+            latest['MACD_previous'] = np.where(panel.lengths > 1, previous, np.nan)
+    for name in needed:
+        values[name] = latest[name]
+    if everything:
+        return {'match': match, 'values': values}
+
+    if 'RSI' in criteria:
+        rsi = values['RSI']
+        if 'below' in criteria['RSI']:
+            match &= rsi < criteria['RSI']['below']
+        if 'above' in criteria['RSI']:
+            match &= rsi > criteria['RSI']['above']
+
+    if 'MACD' in criteria:
+        current, previous = values['MACD']['histogram'], latest['MACD_previous']
+        direction = criteria['MACD'].get('signal')
+        if direction == 'bullish':
+            match &= (current > 0) & (previous <= 0)
+        elif direction == 'bearish':
+            match &= (current < 0) & (previous >= 0)
+
+    if 'MA' in criteria:
+        price = panel.latest()
+        mas = values['MA']
+        for ma_type, condition in criteria['MA'].items():
+            if ma_type not in mas:
+                continue
+            if condition == 'price_above':
+                match &= price > mas[ma_type]
+            elif condition == 'price_below':
+                match &= price < mas[ma_type]
+    return {'match': match, 'values': values}
+
+def _float(value) -> Optional[float]:
+    value = float(value)
+    return None if value != value else value
+
+def match_record(panel: PricePanel, j: int, values: Dict[str, Any], dates: List[Optional[str]]) -> Dict[str, Any]:
+    """Latest price and the screened indicators of one panel column"""
+    indicators = {}
+    for name, value in values.items():
+        if isinstance(value, dict):
+            indicators[name] = {k: _float(v[j]) for k, v in value.items()}
+        else:
+            indicators[name] = _float(value[j])
+    return {
+        'symbol': panel.symbols[j],
+        'price': _float(panel.latest()[j]),
+        'date': dates[j],
+        'indicators': indicators
+    }
+
+def all_symbols(db_path: str) -> List[str]:
+    """Every symbol with stored prices, in symbol order"""
+    with sqlite3.connect(db_path) as conn:
+        return [row[0] for row in conn.execute("SELECT DISTINCT symbol FROM stock_prices ORDER BY symbol")]
+
+class ScreenRun:
+    """Screen the universe chunk by chunk, yielding each match as soon as its chunk is evaluated
+
+    Only one chunk of SCREEN_CHUNK symbols is held in memory at a time.
+    After iteration, `summary()` reports how many symbols were scanned,
+    matched and failed, and how long it took.
+
+    With a `deadline` (a time.perf_counter() value) the scan stops before
+    the first chunk that would start after it, so the matches so far come
+    back flagged `complete: False` instead of running over. The first
+    chunk is always evaluated.
+    """
+
+    def __init__(self, db_path: str, criteria: Dict, symbols: Optional[Sequence[str]] = None,
+                 chunk: int = SCREEN_CHUNK, deadline: Optional[float] = None):
+        self.db_path = db_path
+        self.criteria = validate_criteria(criteria)
+        self.symbols = symbols
+        self.chunk = chunk
+        self.deadline = deadline
+        self.scanned = 0
+        self.matched = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        self.complete = True
+
+    def _evaluated(self, indicators: Sequence[str] = ()) -> Iterator[Tuple[PricePanel, Dict[str, Any]]]:
+        """Load and evaluate one chunk of symbols at a time"""
+        start = time.perf_counter()
+        # The published shared panel, when current, replaces SQLite reads and indicator kernels
+        shared = current_panel(self.db_path)
+        if self.symbols is not None:
+            symbols = list(self.symbols)
+        else:
+            symbols = shared.panel.symbols if shared is not None else all_symbols(self.db_path)
+        try:
+            for offset in range(0, len(symbols), self.chunk):
+                if offset and self.deadline is not None and time.perf_counter() >= self.deadline:
+                    self.complete = False
+                    logger.warning(f"Screen deadline reached after {offset} of {len(symbols)} symbols")
+                    break
+                chunk = symbols[offset:offset + self.chunk]
+                try:
+                    if shared is not None and shared.has(chunk):
+                        panel, latest = shared.take(chunk)
+                    else:
+                        panel, latest = load_panel(self.db_path, chunk), None
+                    with stage('compute'):
+                        result = evaluate(panel, self.criteria, indicators, latest)
+                except Exception as e:
+                    logger.error(f"Error screening symbols {chunk[0]}..{chunk[-1]}: {str(e)}")
+                    self.errors += len(chunk)
+                    continue
+                self.scanned += len(chunk)
+                yield panel, result
+        finally:
+            self.elapsed = time.perf_counter() - start
+            logger.info("Screened %d symbols: %d matched, %d errors in %.3fs",
+                        self.scanned, self.matched, self.errors, self.elapsed,
+                        extra={'event': 'screen', 'criteria': self.criteria, **self.summary()})
+
+    def chunks(self) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the matches of each evaluated chunk as a list"""
+        for panel, result in self._evaluated():
+            dates = panel.latest_dates()
+            matches = [match_record(panel, j, result['values'], dates) for j in np.flatnonzero(result['match'])]
+            self.matched += len(matches)
+            if matches:
+                yield matches
+
+    def cross_section(self) -> 'CrossSection':
+        """Collect every column of COLUMNS for the matching symbols"""
+        symbols, dates, columns = [], [], {name: [] for name in COLUMNS}
+        for panel, result in self._evaluated(INDICATORS):
+            rows = np.flatnonzero(result['match'])
+            self.matched += len(rows)
+            values = result['values']
+            panel_dates = panel.latest_dates()
+            price = panel.latest()[rows]
+            symbols.extend(panel.symbols[j] for j in rows)
+            dates.extend(panel_dates[j] for j in rows)
+            columns['price'].append(price)
+            columns['RSI'].append(values['RSI'][rows])
+            columns['MACD'].append(values['MACD']['macd'][rows])
+            columns['MACD.signal'].append(values['MACD']['signal'][rows])
+            columns['MACD.histogram'].append(values['MACD']['histogram'][rows])
+            for name, ma in values['MA'].items():
+                columns[name].append(ma[rows])
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    columns[f"{name}_distance"].append(price / ma[rows] - 1)
+        return CrossSection(symbols, dates, {
+            name: np.concatenate(parts) if parts else np.empty(0) for name, parts in columns.items()
+        }, self.summary())
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for matches in self.chunks():
+            yield from matches
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'scanned': self.scanned,
+            'matched': self.matched,
+            'errors': self.errors,
+            'elapsed': round(self.elapsed, 4),
+            'complete': self.complete
+        }
+
+def encode_cursor(key: float, symbol: str) -> str:
+    """Opaque cursor pointing just past (key, symbol) in a sorted screen"""
+    payload = json.dumps([None if not np.isfinite(key) else key, symbol])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Inverse of encode_cursor; raises ValueError for cursors it didn't produce"""
+    try:
+        key, symbol = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return (np.inf if key is None else float(key)), str(symbol)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def parse_sort(sort_by: Optional[str]) -> Tuple[str, bool]:
+    """Split 'RSI' / '-RSI' into a column and a descending flag"""
+    sort_by = sort_by or 'symbol'
+    descending = sort_by.startswith('-')
+    column = sort_by.lstrip('-')
+    if column not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key {column!r}; expected one of {SORT_KEYS}")
+    return column, descending
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    names = [name for name in (fields or '').split(',') if name]
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}; expected some of {FIELDS}")
+    return names
+
+class CrossSection:
+    """Latest values of the symbols that matched a screen, one array per column
+
+    Pages are taken in (sort key, symbol) order with keyset cursors, so a
+    page costs a partial sort over the matches rather than a full one, and
+    pages stay consistent while the caller walks them.
+    """
+
+    def __init__(self, symbols: List[str], dates: List[Optional[str]], columns: Dict[str, np.ndarray],
+                 summary: Dict[str, Any]):
+        self.symbols = np.array(symbols, dtype=str)
+        self.dates = dates
+        self.columns = columns
+        self.summary = summary
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @property
+    def complete(self) -> bool:
+        """False when the screen stopped at its deadline and these are only the matches found so far"""
+        return self.summary.get('complete', True)
+
+    def _keys(self, column: str, descending: bool) -> np.ndarray:
+        """Ascending numeric sort keys with missing values last"""
+        if column == 'symbol':
+            # Ascending symbol order is the tie-break alone, which keeps cursors valid across versions
+            if not descending:
+                return np.zeros(len(self))
+            keys = np.argsort(np.argsort(self.symbols, kind='stable')).astype(float)
+        else:
+            keys = self.columns[column].astype(float)
+        if descending:
+            keys = -keys
+        return np.where(np.isnan(keys), np.inf, keys)
+
+    def page(self, limit: Optional[int] = None, sort_by: Optional[str] = None,
+             cursor: Optional[str] = None) -> Tuple[np.ndarray, Optional[str]]:
+        """Row indices of one page and the cursor for the next (None on the last page)"""
+        column, descending = parse_sort(sort_by)
+        keys = self._keys(column, descending)
+        candidates = np.arange(len(self))
+        if cursor:
+            after_key, after_symbol = decode_cursor(cursor)
+            candidates = np.flatnonzero((keys > after_key) | ((keys == after_key) & (self.symbols > after_symbol)))
+
+        if limit is None or limit >= len(candidates):
+            return candidates[np.lexsort((self.symbols[candidates], keys[candidates]))], None
+
+        # Everything tied with the limit-th key may still belong on the page
+        kth = np.partition(keys[candidates], limit - 1)[limit - 1]
+        candidates = candidates[keys[candidates] <= kth]
+        rows = candidates[np.lexsort((self.symbols[candidates], keys[candidates]))][:limit]
+        return rows, encode_cursor(keys[rows[-1]], self.symbols[rows[-1]])
+
+    def records(self, rows: np.ndarray, fields: Sequence[str]) -> List[Dict[str, Any]]:
+        """Projected records for the given rows"""
+        records = []
+        for j in rows:
+            record = {'symbol': str(self.symbols[j])}
+            for name in fields:
+                record[name] = self.dates[j] if name == 'date' else _float(self.columns[name][j])
+            records.append(record)
+        return records
+
+_sections: 'OrderedDict[Tuple[str, str, str], CrossSection]' = OrderedDict()
+_sections_lock = threading.Lock()
+section_cache = CacheStats()
+
+def cached_cross_section(db_path: str, criteria_json: str, version: str,
+                         deadline: Optional[float] = None) -> CrossSection:
+    """Cross-section of a screen, cached per criteria and published data version
+
+    A run cut short by `deadline` is returned but not cached, so the next
+    request for the same screen starts a full scan again.
+    """
+    key = (db_path, criteria_json, version)
+    with _sections_lock:
+        section = _sections.get(key)
+        if section is not None:
+            _sections.move_to_end(key)
+        section_cache.record(section is not None)
+    if section is not None:
+        return section
+
+    section = ScreenRun(db_path, json.loads(criteria_json), deadline=deadline).cross_section()
+    if section.complete:
+        with _sections_lock:
+            _sections[key] = section
+            while len(_sections) > SECTION_CACHE_SIZE:
+                _sections.popitem(last=False)
+    return section
@@ -0,0 +1,175 @@
+import json
+import os
+import shutil
+import logging
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+from scripts import kernels
+from scripts.panel import FIELDS, PricePanel, latest_indicators, load_panel, to_days
+from scripts.versioning import current_version
+from scripts.precision import current_mode
+from scripts.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# Published panel versions kept on disk; readers may still hold the previous one
+KEEP_VERSIONS = 2
+
+POINTER = 'CURRENT'
+
+def panel_dir(db_path) -> Path:
+    """Directory holding the memory-mapped panels published for a database"""
+    return Path(str(db_path) + '.panel')
+
+def _latest_arrays(panel: PricePanel) -> Dict[str, np.ndarray]:
+    """Latest indicator values per symbol, flattened to one array per name
+
+    Besides what latest_indicators returns, the histogram's previous bar is
+    kept so that MACD crossovers can be screened without the history.
+    """
+    latest = latest_indicators(panel, ('RSI', 'MACD', 'MA'))
+    arrays = {'RSI': latest['RSI']}
+    arrays.update({f'MACD.{key}': value for key, value in latest['MACD'].items()})
+    arrays.update(latest['MA'])
+    if len(panel.dates) > 1:
+        _, _, hist = kernels.macd_filled(panel.close, lengths=panel.lengths)
+        previous = np.where(panel.lengths > 1, hist[-2], np.nan)
+    else:
+        previous = np.full(len(panel), np.nan)
+    arrays['MACD.previous_histogram'] = previous
+    return arrays
+
+def publish_panel(db_path, version: int) -> Dict:
+    """Write the whole universe's adjusted panel and latest indicators for `version`
+
+    Each array is a .npy file that readers map read-only, so every worker
+    shares the same page-cache pages. The version directory is written
+    under a temporary name and renamed, then the CURRENT pointer is
+    replaced atomically; readers switch on their next lookup.
+    """
+    from scripts.screener import all_symbols
+
+    root = panel_dir(db_path)
+    root.mkdir(exist_ok=True)
+    panel = load_panel(str(db_path), all_symbols(str(db_path)), FIELDS)
+    latest = _latest_arrays(panel)
+
+    target = root / f'v{version}'
+    tmp = root / f'.v{version}.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+    arrays = {'dates': panel.dates, 'lengths': panel.lengths,
+              **{f'field.{name}': values for name, values in panel.fields.items()},
+              **{f'latest.{name}': values for name, values in latest.items()}}
+    for name, values in arrays.items():
+        np.save(tmp / f'{name}.npy', np.ascontiguousarray(values))
+    (tmp / 'meta.json').write_text(json.dumps({'version': version, 'precision': current_mode(),
+                                               'symbols': panel.symbols, 'arrays': sorted(arrays)}))
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+
+    pointer = root / POINTER
+    pointer_tmp = root / f'.{POINTER}.tmp'
+    pointer_tmp.write_text(json.dumps({'version': version, 'dir': target.name}))
+    os.replace(pointer_tmp, pointer)
+
+    # Unlinked files stay readable by anyone who still has them mapped
+    published = sorted((p for p in root.glob('v*') if p.is_dir()), key=lambda p: int(p.name[1:]))
+    for old in published[:-KEEP_VERSIONS]:
+        shutil.rmtree(old, ignore_errors=True)
+
+    size = sum(values.nbytes for values in arrays.values())
+    logger.info(f"Published panel v{version}: {len(panel)} symbols x {len(panel.dates)} bars, {size / 1e6:.1f} MB")
+    return {'version': version, 'symbols': len(panel), 'bars': len(panel.dates), 'bytes': size}
+
+class SharedPanel:
+    """A published panel mapped read-only, with its precomputed latest indicators"""
+
+    def __init__(self, directory: Path):
+        meta = json.loads((directory / 'meta.json').read_text())
+        self.version = str(meta['version'])
+        arrays = {name: np.load(directory / f'{name}.npy', mmap_mode='r') for name in meta['arrays']}
+        fields = {name[len('field.'):]: values for name, values in arrays.items() if name.startswith('field.')}
+        dates = arrays['dates']
+        if dates.dtype.kind == 'M':
+            # Published before dates were stored as day numbers
+            dates = to_days(dates)
+        self.panel = PricePanel(meta['symbols'], dates, fields, np.asarray(arrays['lengths']))
+        self.latest = {name[len('latest.'):]: values for name, values in arrays.items() if name.startswith('latest.')}
+
+    def has(self, symbols: Sequence[str]) -> bool:
+        index = self.panel.index
+        return all(symbol in index for symbol in symbols)
+
+    def take(self, symbols: Sequence[str]) -> Tuple[PricePanel, Dict]:
+        """The given symbols' columns and latest values, shaped like load_panel and evaluate expect
+
+        A run of consecutive symbols (the usual screen chunk) is a view of
+        the mapped arrays; any other selection copies just those columns.
+        Leading rows that are padding for every selected symbol are dropped.
+        Counted as the db_read stage, since it stands in for the SQLite read.
+        """
+        with stage('db_read'):
+            return self._take(symbols)
+
+    def _take(self, symbols: Sequence[str]) -> Tuple[PricePanel, Dict]:
+        symbols = list(dict.fromkeys(symbols))
+        columns = np.array([self.panel.index[symbol] for symbol in symbols], dtype=np.int64)
+        if len(columns) and np.array_equal(columns, np.arange(columns[0], columns[0] + len(columns))):
+            columns = slice(int(columns[0]), int(columns[0]) + len(columns))
+        lengths = self.panel.lengths[columns]
+        top = len(self.panel.dates) - (int(lengths.max()) if len(lengths) else 0)
+        panel = PricePanel(symbols, self.panel.dates[top:, columns],
+                           {name: values[top:, columns] for name, values in self.panel.fields.items()},
+                           lengths)
+        latest = self.latest
+        values = {
+            'RSI': latest['RSI'][columns],
+            'MACD': {key: latest[f'MACD.{key}'][columns] for key in ('macd', 'signal', 'histogram')},
+            'MA': {name: latest[name][columns] for name in kernels.MA_WINDOWS},
+            'MACD_previous': latest['MACD.previous_histogram'][columns],
+        }
+        return panel, values
+
+# Attached panel and the pointer file's stat when it was read, per database
+_attached: Dict[str, Tuple[tuple, Optional[SharedPanel]]] = {}
+
+def attach(db_path) -> Optional[SharedPanel]:
+    """The latest published panel for a database, mapped once per process and version"""
+    pointer = panel_dir(db_path) / POINTER
+    try:
+        st = os.stat(pointer)
+    except FileNotFoundError:
+        return None
+    key = (st.st_mtime_ns, st.st_size, st.st_ino)
+    cached = _attached.get(str(db_path))
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    try:
+        shared = SharedPanel(panel_dir(db_path) / json.loads(pointer.read_text())['dir'])
+    except (FileNotFoundError, ValueError, KeyError) as e:
+        logger.warning(f"Could not attach panel for {db_path}: {str(e)}")
+        shared = None
+    # Swapping the one reference is atomic; requests holding the old panel keep using it
+    _attached[str(db_path)] = (key, shared)
+    return shared
+
+def current_panel(db_path) -> Optional[SharedPanel]:
+    """The shared panel if it matches the published data version, else None"""
+    shared = attach(db_path)
+    if shared is None or shared.version != current_version(db_path)['version']:
+        return None
+    return shared
+
+def panel_for(db_path, symbols: Sequence[str], fields: Sequence[str] = ('close',)) -> Tuple[PricePanel, Optional[Dict]]:
+    """Columns from the shared panel when it is current and has every symbol, otherwise from SQLite
+
+    The second item is the precomputed latest values for evaluate(), or
+    None when the panel came from SQLite.
+    """
+    shared = current_panel(db_path)
+    if shared is not None and shared.has(symbols):
+        return shared.take(symbols)
+    return load_panel(db_path, symbols, fields), None
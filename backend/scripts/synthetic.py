@@ -0,0 +1,170 @@
+import sqlite3
+import argparse
+import logging
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Iterator, Sequence
+
+from scripts.bulk_insert import bulk_load, insert_frame
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+END_DATE = '2024-12-31'
+STORES = ('stock_prices', 'daily_prices', 'latest_close')
+
+def symbol_names(n_symbols: int) -> list:
+    """Get deterministic synthetic symbol names"""
+    width = max(4, len(str(n_symbols)))
+    return [f"SYN{i:0{width}d}.ST" for i in range(n_symbols)]
+
+def trading_dates(years: float, end: str = END_DATE) -> pd.DatetimeIndex:
+    """Get the business days covering `years` of bars up to `end`"""
+    return pd.bdate_range(end=end, periods=int(round(years * TRADING_DAYS_PER_YEAR)))
+
+def generate_symbol(index: int, n_bars: int, seed: int = 42) -> Dict[str, np.ndarray]:
+    """Generate one symbol's OHLCV arrays
+
+    Each symbol has its own random stream, so the output for a symbol does
+    not depend on how many other symbols are generated or in what chunks.
+    """
+    rng = np.random.default_rng([seed, index])
+    drift = rng.normal(0.05, 0.10) / TRADING_DAYS_PER_YEAR
+    vol = rng.uniform(0.15, 0.60) / np.sqrt(TRADING_DAYS_PER_YEAR)
+    start_price = np.exp(rng.normal(np.log(100), 1.0))
+
+    # Geometric Brownian motion with fat-tailed shocks
+    shocks = rng.standard_t(df=4, size=n_bars) / np.sqrt(2)
+    close = start_price * np.exp(np.cumsum(drift + vol * shocks))
+
+    gap = rng.normal(0, vol / 3, size=n_bars)
+    open_ = np.empty(n_bars)
+    open_[0] = start_price
+    open_[1:] = close[:-1] * np.exp(gap[1:])
+    wick = np.abs(rng.normal(0, vol / 2, size=(2, n_bars)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+
+    base_volume = np.exp(rng.normal(np.log(2e5), 1.0))
+    volume = np.maximum(1, base_volume * rng.lognormal(0, 0.5, size=n_bars) * (1 + 10 * np.abs(shocks) * vol))
+    return {
+        'open': np.round(open_, 4),
+        'high': np.round(high, 4),
+        'low': np.round(low, 4),
+        'close': np.round(close, 4),
+        'volume': volume.astype(np.int64)
+    }
+
+def iter_panel(n_symbols: int, years: float, seed: int = 42,
+               chunk_symbols: int = 250, end: str = END_DATE) -> Iterator[pd.DataFrame]:
+    """Yield the synthetic panel as long-format frames of `chunk_symbols` symbols
+
+    Frames have columns symbol, date ('YYYY-MM-DD'), open, high, low, close,
+    volume and are ordered by symbol then date.
+    """
+    dates = trading_dates(years, end).strftime('%Y-%m-%d').to_numpy()
+    symbols = symbol_names(n_symbols)
+    n_bars = len(dates)
+    for start in range(0, n_symbols, chunk_symbols):
+        chunk = range(start, min(start + chunk_symbols, n_symbols))
+        arrays = [generate_symbol(i, n_bars, seed) for i in chunk]
+        yield pd.DataFrame({
+            'symbol': np.repeat([symbols[i] for i in chunk], n_bars),
+            'date': np.tile(dates, len(chunk)),
+            **{field: np.concatenate([a[field] for a in arrays])
+               for field in ('open', 'high', 'low', 'close', 'volume')}
+        })
+
+def generate_panel(n_symbols: int, years: float, seed: int = 42, end: str = END_DATE) -> pd.DataFrame:
+    """Generate the whole synthetic panel as one long-format frame"""
+    return pd.concat(list(iter_panel(n_symbols, years, seed, end=end)), ignore_index=True)
+
+def write_stock_prices(conn: sqlite3.Connection, frame: pd.DataFrame):
+    """Write bars in the init_db stock_prices layout"""
+    insert_frame(conn, 'stock_prices', frame)
+
+def write_daily_prices(conn: sqlite3.Connection, frame: pd.DataFrame):
+    """Write bars in the database.py stocks/daily_prices layout"""
+    symbols = frame['symbol'].unique().tolist()
+    now = pd.Timestamp.now().isoformat(sep=' ')
+    conn.executemany('''
+        INSERT OR REPLACE INTO stocks (symbol, name, status, last_updated)
+        VALUES (?, ?, 'active', ?)
+    ''', [(s, f"Synthetic {s}", now) for s in symbols])
+    insert_frame(conn, 'daily_prices', frame)
+
+def latest_close_rows(frame: pd.DataFrame) -> pd.DataFrame:
+    """Build fetch_data's latest_close rows (last bar plus indicators) for each symbol"""
+    closes = frame.pivot(index='date', columns='symbol', values='close')
+    delta = closes.diff()
+    up = delta.clip(lower=0).fillna(0)
+    down = (-delta.clip(upper=0)).fillna(0)
+    avg_up = up.ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    avg_down = down.ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    rsi = (100 - 100 / (1 + avg_up / avg_down)).where(avg_down != 0, 100)
+    fast = closes.ewm(span=12, min_periods=12, adjust=False).mean()
+    slow = closes.ewm(span=26, min_periods=26, adjust=False).mean()
+    macd = fast - slow
+    signal = macd.ewm(span=9, min_periods=9, adjust=False).mean()
+    return pd.DataFrame({
+        'Ticker': closes.columns,
+        'Date': closes.index[-1],
+        'Close': closes.iloc[-1].to_numpy(),
+        'RSI': rsi.iloc[-1].to_numpy(),
+        'MACD': macd.iloc[-1].to_numpy(),
+        'MACD_Signal': signal.iloc[-1].to_numpy(),
+        'MA50': closes.rolling(50).mean().iloc[-1].to_numpy(),
+        'MA200': closes.rolling(200).mean().iloc[-1].to_numpy()
+    })
+
+def build_database(db_path, n_symbols: int, years: float, seed: int = 42,
+                   stores: Sequence[str] = STORES, chunk_symbols: int = 250) -> Dict[str, float]:
+    """Write a synthetic panel into every requested store and return write stats"""
+    from scripts.init_db import create_tables as create_stock_prices_tables
+    from scripts.database import create_tables as create_daily_prices_tables
+    from scripts.saved_screens import refresh_and_publish
+
+    unknown = set(stores) - set(STORES)
+    if unknown:
+        raise ValueError(f"Unknown stores: {sorted(unknown)}")
+
+    rows = 0
+    start = time.perf_counter()
+    with sqlite3.connect(db_path) as conn:
+        create_stock_prices_tables(conn)
+        create_daily_prices_tables(conn)
+        latest = []
+        with bulk_load(conn, ('stock_prices', 'daily_prices')):
+            for frame in iter_panel(n_symbols, years, seed, chunk_symbols):
+                if 'stock_prices' in stores:
+                    write_stock_prices(conn, frame)
+                if 'daily_prices' in stores:
+                    write_daily_prices(conn, frame)
+                if 'latest_close' in stores:
+                    latest.append(latest_close_rows(frame))
+                conn.commit()
+                rows += len(frame)
+        if latest:
+            pd.concat(latest, ignore_index=True).to_sql('latest_close', conn, if_exists='replace', index=False)
+    refresh_and_publish(db_path)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Wrote {rows} synthetic bars for {n_symbols} symbols to {db_path} in {elapsed:.1f}s")
+    return {'rows': rows, 'seconds': elapsed, 'rows_per_second': rows / elapsed if elapsed else 0.0}
+
+def main():
+    """Generate a synthetic database from the command line"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic OHLCV database")
+    parser.add_argument('--db', default=str(Path(__file__).parent.parent / 'data' / 'synthetic.db'))
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--stores', default=','.join(STORES))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
+    build_database(args.db, args.symbols, args.years, args.seed, args.stores.split(','))
+
+if __name__ == "__main__":
+    main()
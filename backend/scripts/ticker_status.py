@@ -0,0 +1,92 @@
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How long to stop asking Yahoo about a symbol after its first failure,
+# doubled for each further failure up to the cap
+FAILURE_TTL = {
+    'delisted': timedelta(days=30),
+    'no_data': timedelta(days=3),
+    'error': timedelta(hours=1),
+}
+MAX_TTL = {
+    'delisted': timedelta(days=365),
+    'no_data': timedelta(days=60),
+    'error': timedelta(days=1),
+}
+
+def create_ticker_status_table(conn: sqlite3.Connection):
+    """Create the ticker status registry if it doesn't exist
+
+    Unlike the `stocks` table this is never cleaned, so failures survive
+    across runs.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ticker_status (
+            symbol TEXT PRIMARY KEY,
+            status TEXT,
+            failures INTEGER,
+            last_attempt TEXT,
+            retry_after TEXT,
+            last_error TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_ticker_status_retry ON ticker_status (retry_after)')
+
+def classify_error(error: Exception) -> str:
+    """Map a yfinance exception to a failure status"""
+    message = str(error)
+    if 'No timezone found' in message or 'delisted' in message:
+        return 'delisted'
+    return 'error'
+
+def backoff(status: str, failures: int) -> timedelta:
+    """Time to wait before retrying a symbol that has failed `failures` times in a row"""
+    ttl = FAILURE_TTL.get(status, FAILURE_TTL['error'])
+    cap = MAX_TTL.get(status, MAX_TTL['error'])
+    # Keep the exponent small enough that the multiplication can't overflow
+    return min(ttl * 2 ** min(failures - 1, 16), cap)
+
+def record_failure(conn: sqlite3.Connection, symbol: str, status: str,
+                   error: Optional[str] = None, now: Optional[datetime] = None) -> datetime:
+    """Record a failed fetch and return when the symbol may be retried"""
+    now = now or datetime.now()
+    row = conn.execute('SELECT status, failures FROM ticker_status WHERE symbol = ?', (symbol,)).fetchone()
+    # A different failure reason restarts the backoff
+    failures = row[1] + 1 if row and row[0] == status else 1
+    retry_after = now + backoff(status, failures)
+    conn.execute('''
+        INSERT OR REPLACE INTO ticker_status
+        (symbol, status, failures, last_attempt, retry_after, last_error)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (symbol, status, failures, now.isoformat(sep=' '), retry_after.isoformat(sep=' '), error))
+    return retry_after
+
+def record_success(conn: sqlite3.Connection, symbol: str, now: Optional[datetime] = None):
+    """Record a successful fetch, clearing any backoff"""
+    now = now or datetime.now()
+    conn.execute('''
+        INSERT OR REPLACE INTO ticker_status
+        (symbol, status, failures, last_attempt, retry_after, last_error)
+        VALUES (?, 'active', 0, ?, NULL, NULL)
+    ''', (symbol, now.isoformat(sep=' ')))
+
+def blocked_symbols(conn: sqlite3.Connection, now: Optional[datetime] = None) -> Set[str]:
+    """Get the symbols whose failure TTL hasn't expired yet"""
+    now = now or datetime.now()
+    cursor = conn.execute('SELECT symbol FROM ticker_status WHERE retry_after > ?', (now.isoformat(sep=' '),))
+    return {row[0] for row in cursor}
+
+def filter_tickers(conn: sqlite3.Connection, symbols: Iterable[str],
+                   now: Optional[datetime] = None) -> Tuple[List[str], List[str]]:
+    """Split symbols into those to fetch and those still in backoff"""
+    blocked = blocked_symbols(conn, now)
+    to_fetch, skipped = [], []
+    for symbol in symbols:
+        (skipped if symbol in blocked else to_fetch).append(symbol)
+    if skipped:
+        logger.info(f"Skipping {len(skipped)} tickers in failure backoff")
+    return to_fetch, skipped
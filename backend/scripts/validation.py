@@ -0,0 +1,162 @@
+import sqlite3
+import pandas as pd
+import numpy as np
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A bar more than this many times away from both neighbours is treated as a spike
+SPIKE_RATIO = 10.0
+
+REASONS = ['nan_close', 'non_positive_price', 'zero_volume', 'inconsistent_ohlc',
+           'duplicate_date', 'non_monotonic_date', 'price_spike']
+
+def create_quarantine_table(conn: sqlite3.Connection):
+    """Create the side table for bars rejected by validation"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS price_quarantine (
+            symbol TEXT,
+            date TEXT,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume INTEGER,
+            reason TEXT,
+            quarantined_at TIMESTAMP
+        )
+    ''')
+
+def find_bad_bars(df: pd.DataFrame, spike_ratio: float = SPIKE_RATIO) -> Dict[str, np.ndarray]:
+    """Run every check over a batch of bars and return one boolean mask per reason
+
+    `df` has lowercase OHLCV columns plus `date` and optionally `symbol`, in
+    fetch order. A batch may hold several symbols; neighbour-based checks
+    never look across a symbol boundary.
+    """
+    n = len(df)
+    close = df['close'].to_numpy(dtype=float)
+    open_ = df['open'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    volume = df['volume'].to_numpy(dtype=float)
+    dates = pd.to_datetime(df['date']).to_numpy(dtype='datetime64[D]')
+    if 'symbol' in df.columns:
+        symbols = df['symbol'].to_numpy()
+        same_as_prev = np.zeros(n, dtype=bool)
+        same_as_prev[1:] = symbols[1:] == symbols[:-1]
+    else:
+        symbols = np.zeros(n, dtype=np.int8)
+        same_as_prev = np.arange(n) > 0
+
+    masks = {}
+    masks['nan_close'] = np.isnan(close)
+    with np.errstate(invalid='ignore'):
+        masks['non_positive_price'] = (close <= 0) | (open_ <= 0) | (high <= 0) | (low <= 0)
+        masks['zero_volume'] = ~(volume > 0)
+        masks['inconsistent_ohlc'] = (high < low) | (close > high) | (close < low) | (open_ > high) | (open_ < low)
+
+    keys = pd.DataFrame({'symbol': symbols, 'date': dates})
+    masks['duplicate_date'] = keys.duplicated(keep='first').to_numpy()
+
+    # Dates must strictly increase within a symbol; compare against the running max
+    day = dates.astype(np.int64)
+    running_max = pd.Series(day).groupby(np.cumsum(~same_as_prev)).cummax().to_numpy()
+    prev_max = np.empty(n, dtype=np.int64)
+    prev_max[:1] = np.iinfo(np.int64).min
+    prev_max[1:] = running_max[:-1]
+    masks['non_monotonic_date'] = same_as_prev & (day <= prev_max) & ~masks['duplicate_date']
+
+    # An isolated spike is far from both neighbours in the same direction. Both must exist:
+    # a jump on a symbol's newest bar may be a split or re-listing, so it is kept
+    prev_close = np.full(n, np.nan)
+    prev_close[1:] = np.where(same_as_prev[1:], close[:-1], np.nan)
+    next_close = np.full(n, np.nan)
+    next_close[:-1] = np.where(same_as_prev[1:], close[1:], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        up = (close > prev_close * spike_ratio) & (close > next_close * spike_ratio)
+        down = (close * spike_ratio < prev_close) & (close * spike_ratio < next_close)
+    masks['price_spike'] = up | down
+    return masks
+
+def validate_prices(df: pd.DataFrame, spike_ratio: float = SPIKE_RATIO) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Split a batch of bars into valid rows and rejected rows with a `reason` column"""
+    if df.empty:
+        return df, df.assign(reason=pd.Series(dtype=str))
+    masks = find_bad_bars(df, spike_ratio)
+    bad = np.zeros(len(df), dtype=bool)
+    for mask in masks.values():
+        bad |= mask
+
+    rejected = df[bad].copy()
+    if len(rejected):
+        flags = np.column_stack([masks[r][bad] for r in REASONS])
+        rejected['reason'] = [','.join(r for r, f in zip(REASONS, row) if f) for row in flags]
+    else:
+        rejected['reason'] = pd.Series(dtype=str)
+    return df[~bad], rejected
+
+def quarantine(conn: sqlite3.Connection, rejected: pd.DataFrame, symbol: str = None):
+    """Write rejected rows to the quarantine table"""
+    if rejected.empty:
+        return
+    symbols = rejected['symbol'].tolist() if 'symbol' in rejected.columns else [symbol] * len(rejected)
+    dates = pd.to_datetime(rejected['date']).dt.strftime('%Y-%m-%d').tolist()
+    now = datetime.now()
+    conn.executemany('''
+        INSERT INTO price_quarantine
+        (symbol, date, open, high, low, close, volume, reason, quarantined_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', zip(symbols, dates,
+             rejected['open'].tolist(), rejected['high'].tolist(), rejected['low'].tolist(),
+             rejected['close'].tolist(), rejected['volume'].tolist(),
+             rejected['reason'].tolist(), [now] * len(rejected)))
+
+class QualityReport:
+    """Per-run data quality counters"""
+
+    def __init__(self):
+        self.rows_checked = 0
+        self.rows_passed = 0
+        self.symbols_with_issues = 0
+        self.reason_counts = {reason: 0 for reason in REASONS}
+        self.seconds = 0.0
+
+    def check(self, df: pd.DataFrame, spike_ratio: float = SPIKE_RATIO) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Validate a batch and add its results to the report"""
+        start = time.perf_counter()
+        valid, rejected = validate_prices(df, spike_ratio)
+        self.seconds += time.perf_counter() - start
+        self.rows_checked += len(df)
+        self.rows_passed += len(valid)
+        if len(rejected):
+            self.symbols_with_issues += rejected['symbol'].nunique() if 'symbol' in rejected.columns else 1
+            for reasons in rejected['reason']:
+                for reason in reasons.split(','):
+                    self.reason_counts[reason] += 1
+        return valid, rejected
+
+    def summary(self) -> Dict:
+        """Get the run's quality metrics"""
+        quarantined = self.rows_checked - self.rows_passed
+        return {
+            'rows_checked': self.rows_checked,
+            'rows_passed': self.rows_passed,
+            'rows_quarantined': quarantined,
+            'quarantine_rate': quarantined / self.rows_checked if self.rows_checked else 0.0,
+            'symbols_with_issues': self.symbols_with_issues,
+            'reasons': {r: c for r, c in self.reason_counts.items() if c},
+            'validation_seconds': round(self.seconds, 4)
+        }
+
+    def log(self, log: logging.Logger = logger):
+        """Log the run's quality metrics"""
+        summary = self.summary()
+        log.info(f"Data quality: {summary['rows_passed']}/{summary['rows_checked']} rows passed, "
+                 f"{summary['rows_quarantined']} quarantined ({summary['quarantine_rate']:.2%}) "
+                 f"across {summary['symbols_with_issues']} symbols in {summary['validation_seconds']}s")
+        if summary['reasons']:
+            log.info(f"Quarantine reasons: {summary['reasons']}")
@@ -0,0 +1,78 @@
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Last marker read per path, keyed on its stat so unchanged markers are never re-read
+_cache: Dict[str, tuple] = {}
+
+def default_db_path() -> str:
+    """Database the API reads; STOCK_DB_PATH lets tests and benchmarks point it elsewhere"""
+    return str(os.environ.get('STOCK_DB_PATH', Path(__file__).parent.parent / 'data' / 'stock_data.db'))
+
+def version_path(db_path) -> Path:
+    """Marker file holding a database's published data version"""
+    return Path(str(db_path) + '.version')
+
+def _read(path: Path) -> Optional[Dict]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+def next_version(db_path) -> int:
+    """Number the next publish of a database will get"""
+    return ((_read(version_path(db_path)) or {'version': 0})['version']) + 1
+
+def publish(db_path, symbols: Optional[Iterable[str]] = None) -> Dict:
+    """Publish a new data version after ingestion has committed its writes
+
+    The marker is written to a temporary file and renamed into place, so
+    readers see either the old or the new version, never a partial file.
+    `symbols` lists what changed; None means everything may have.
+    """
+    path = version_path(db_path)
+    record = {
+        'version': next_version(db_path),
+        'published_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'symbols': None if symbols is None else sorted(set(symbols)),
+    }
+    tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+    tmp.write_text(json.dumps(record))
+    os.replace(tmp, path)
+    logger.info(f"Published data version {record['version']} for {db_path}")
+    return record
+
+def current_version(db_path) -> Dict:
+    """Currently published version of a database, found with a stat call
+
+    Databases that were never published fall back to a version derived
+    from the database file's own size and modification time.
+    """
+    path = version_path(db_path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        try:
+            stat = os.stat(db_path)
+        except OSError:
+            return {'version': '0', 'published_at': None, 'symbols': None}
+        return {
+            'version': f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+            'published_at': datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(timespec='seconds'),
+            'symbols': None,
+        }
+
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cached = _cache.get(str(path))
+    if cached and cached[0] == key:
+        return cached[1]
+    record = _read(path) or {'version': 0, 'published_at': None}
+    record = {'version': str(record['version']), 'published_at': record.get('published_at'),
+              'symbols': record.get('symbols')}
+    _cache[str(path)] = (key, record)
+    return record
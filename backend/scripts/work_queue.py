@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds a claimed item belongs to its worker; a crashed worker's items are reclaimed after this
+LEASE_SECONDS = 300
+
+# Fetch attempts before a transient error becomes a permanent failure
+MAX_ATTEMPTS = 5
+
+# Seconds before the first retry of a transient error, doubled for each further attempt
+RETRY_DELAY = 30
+
+# How long any statement waits for another process's write lock
+BUSY_TIMEOUT = 60
+
+def connect(db_path) -> sqlite3.Connection:
+    """Connection for queue workers and the writer, waiting on locks instead of failing
+
+    WAL lets readers and the writer proceed together. It needs shared
+    memory, so processes on other machines should use a database whose
+    journal_mode was left at the default (set QUEUE_JOURNAL_MODE=delete).
+    """
+    conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT, isolation_level=None)
+    conn.execute(f"PRAGMA journal_mode={os.environ.get('QUEUE_JOURNAL_MODE', 'wal')}")
+    return conn
+
+@contextmanager
+def transaction(conn: sqlite3.Connection):
+    """One write transaction on an autocommit connection, taking the write lock up front"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+def create_work_queue_tables(conn: sqlite3.Connection):
+    """Create the job and work item tables if they don't exist
+
+    Items move pending -> leased -> fetched -> done. Items that fail for
+    good become failed, then abandoned once the writer has recorded them.
+    Fetched items carry their downloaded bars in `payload` until the writer
+    stores them, so a crash after a fetch doesn't lose the download.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS work_jobs (
+            job TEXT PRIMARY KEY,
+            start_date TEXT,
+            end_date TEXT,
+            created_at REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS work_queue (
+            job TEXT,
+            symbol TEXT,
+            status TEXT,
+            attempts INTEGER DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires REAL,
+            not_before REAL DEFAULT 0,
+            failure TEXT,
+            last_error TEXT,
+            payload BLOB,
+            PRIMARY KEY (job, symbol)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_work_queue_status ON work_queue (job, status, not_before)')
+
+def create_job(conn: sqlite3.Connection, job: str, start_date: str, end_date: str, symbols: Iterable[str]) -> int:
+    """Register a job's date range and enqueue its symbols; returns the number newly queued
+
+    Re-running with the same job name only adds symbols it doesn't have yet,
+    so an interrupted backfill resumes where it stopped.
+    """
+    with transaction(conn):
+        conn.execute('INSERT OR IGNORE INTO work_jobs VALUES (?, ?, ?, ?)', (job, start_date, end_date, time.time()))
+        before = conn.total_changes
+        conn.executemany("INSERT OR IGNORE INTO work_queue (job, symbol, status) VALUES (?, ?, 'pending')",
+                         [(job, symbol) for symbol in symbols])
+        return conn.total_changes - before
+
+def job_range(conn: sqlite3.Connection, job: str) -> Tuple[str, str]:
+    row = conn.execute('SELECT start_date, end_date FROM work_jobs WHERE job = ?', (job,)).fetchone()
+    if row is None:
+        raise ValueError(f"Unknown job {job!r}")
+    return row
+
+def claim(conn: sqlite3.Connection, job: str, owner: str, n: int,
+          lease: float = LEASE_SECONDS, now: Optional[float] = None) -> List[str]:
+    """Lease up to `n` items that are due, including ones whose lease ran out"""
+    now = time.time() if now is None else now
+    with transaction(conn):
+        symbols = [row[0] for row in conn.execute('''
+            SELECT symbol FROM work_queue
+            WHERE job = ? AND ((status = 'pending' AND not_before <= ?) OR (status = 'leased' AND lease_expires < ?))
+            ORDER BY not_before, symbol LIMIT ?
+        ''', (job, now, now, n))]
+        conn.executemany('''
+            UPDATE work_queue SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1
+            WHERE job = ? AND symbol = ?
+        ''', [(owner, now + lease, job, symbol) for symbol in symbols])
+    return symbols
+
+def complete(conn: sqlite3.Connection, job: str, symbol: str, owner: str, payload: bytes) -> bool:
+    """Hand a fetched item to the writer; False if the lease was lost to another worker"""
+    with transaction(conn):
+        return conn.execute('''
+            UPDATE work_queue SET status = 'fetched', payload = ?, lease_owner = NULL, lease_expires = NULL
+            WHERE job = ? AND symbol = ? AND status = 'leased' AND lease_owner = ?
+        ''', (payload, job, symbol, owner)).rowcount == 1
+
+def fail(conn: sqlite3.Connection, job: str, symbol: str, owner: str, failure: str,
+         error: Optional[str] = None, now: Optional[float] = None) -> bool:
+    """Record a failed fetch; transient errors are retried with backoff until MAX_ATTEMPTS
+
+    Returns True if the item will be retried.
+    """
+    now = time.time() if now is None else now
+    with transaction(conn):
+        row = conn.execute('SELECT attempts FROM work_queue WHERE job = ? AND symbol = ? AND lease_owner = ?',
+                           (job, symbol, owner)).fetchone()
+        if row is None:
+            return False
+        retry = failure == 'error' and row[0] < MAX_ATTEMPTS
+        conn.execute('''
+            UPDATE work_queue SET status = ?, not_before = ?, failure = ?, last_error = ?,
+                                  lease_owner = NULL, lease_expires = NULL
+            WHERE job = ? AND symbol = ?
+        ''', ('pending' if retry else 'failed', now + RETRY_DELAY * 2 ** (row[0] - 1) if retry else 0,
+              failure, error, job, symbol))
+    return retry
+
+def fetched(conn: sqlite3.Connection, job: str, n: int) -> List[Tuple[str, bytes]]:
+    """Up to `n` fetched items waiting for the writer"""
+    return conn.execute("SELECT symbol, payload FROM work_queue WHERE job = ? AND status = 'fetched' LIMIT ?",
+                        (job, n)).fetchall()
+
+def unrecorded_failures(conn: sqlite3.Connection, job: str) -> List[Tuple[str, str, Optional[str]]]:
+    """Permanently failed items the writer hasn't recorded in ticker_status yet"""
+    return conn.execute("SELECT symbol, failure, last_error FROM work_queue WHERE job = ? AND status = 'failed'",
+                        (job,)).fetchall()
+
+def mark(conn: sqlite3.Connection, job: str, symbols: Iterable[str], status: str):
+    """Move items to a final status and drop their payloads; call inside the writer's transaction"""
+    conn.executemany('UPDATE work_queue SET status = ?, payload = NULL WHERE job = ? AND symbol = ?',
+                     [(status, job, symbol) for symbol in symbols])
+
+def progress(conn: sqlite3.Connection, job: str) -> Dict[str, int]:
+    """Item count per status"""
+    return dict(conn.execute('SELECT status, COUNT(*) FROM work_queue WHERE job = ? GROUP BY status', (job,)))
+
+def outstanding(counts: Dict[str, int], *statuses: str) -> int:
+    return sum(counts.get(status, 0) for status in statuses)
@@ -0,0 +1,10 @@
+import pytest
+from scripts.synthetic import build_database
+
+@pytest.fixture
+def synthetic_db(tmp_path, monkeypatch):
+    """Create a small synthetic database and point the API at it"""
+    db_path = tmp_path / 'synthetic.db'
+    build_database(db_path, n_symbols=12, years=1.5, seed=7)
+    monkeypatch.setenv('STOCK_DB_PATH', str(db_path))
+    return str(db_path)
@@ -0,0 +1,77 @@
+import sqlite3
+import pytest
+import pandas as pd
+import numpy as np
+from scripts.adjustments import (
+    create_corporate_actions_table, record_split, record_dividend,
+    get_adjustment_factors, apply_adjustments, unadjust_history, actions_from_history
+)
+
+@pytest.fixture
+def conn():
+    """Create an in-memory database with the corporate actions table"""
+    conn = sqlite3.connect(':memory:')
+    create_corporate_actions_table(conn)
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def raw_prices():
+    """As-traded prices around a 2-for-1 split on 2024-01-04"""
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05']),
+        'open': [200.0, 202.0, 101.0, 102.0],
+        'high': [204.0, 206.0, 103.0, 104.0],
+        'low': [198.0, 200.0, 99.0, 100.0],
+        'close': [202.0, 204.0, 102.0, 103.0],
+        'volume': [1000, 1200, 2400, 2600]
+    })
+
+def test_split_adjusts_earlier_bars_only(conn, raw_prices):
+    """Test that a split scales prices and volume before its ex-date"""
+    record_split(conn, 'TEST.ST', '2024-01-04', 2.0)
+    adjusted = apply_adjustments(raw_prices, get_adjustment_factors(conn, 'TEST.ST'))
+
+    np.testing.assert_allclose(adjusted['close'], [101.0, 102.0, 102.0, 103.0])
+    assert adjusted['volume'].tolist() == [2000, 2400, 2400, 2600]
+    assert pd.api.types.is_integer_dtype(adjusted['volume'])
+
+    # The raw frame is left untouched
+    assert raw_prices['close'].iloc[0] == 202.0
+
+def test_factors_compound(conn, raw_prices):
+    """Test that multiple actions multiply into a cumulative factor"""
+    record_split(conn, 'TEST.ST', '2024-01-04', 2.0)
+    record_dividend(conn, 'TEST.ST', '2024-01-03', 2.02, 202.0)
+    adjusted = apply_adjustments(raw_prices, get_adjustment_factors(conn, 'TEST.ST'))
+
+    np.testing.assert_allclose(adjusted['close'], [202.0 * 0.5 * 0.99, 102.0, 102.0, 103.0])
+
+def test_no_actions_is_noop(conn, raw_prices):
+    """Test that symbols without actions come back unchanged"""
+    adjusted = apply_adjustments(raw_prices, get_adjustment_factors(conn, 'OTHER.ST'))
+    pd.testing.assert_frame_equal(adjusted, raw_prices)
+
+def test_missing_table():
+    """Test that databases without the table read as having no actions"""
+    with sqlite3.connect(':memory:') as conn:
+        assert get_adjustment_factors(conn, 'TEST.ST').empty
+
+def test_unadjust_yfinance_history():
+    """Test that split-adjusted yfinance output is restored to as-traded prices"""
+    hist = pd.DataFrame({
+        'Open': [100.0, 101.0, 101.0],
+        'High': [102.0, 103.0, 103.0],
+        'Low': [99.0, 100.0, 99.0],
+        'Close': [101.0, 102.0, 102.0],
+        'Volume': [2000, 2400, 2400],
+        'Dividends': [0.0, 0.0, 0.0],
+        'Stock Splits': [0.0, 0.0, 2.0]
+    }, index=pd.DatetimeIndex(['2024-01-02', '2024-01-03', '2024-01-04'], name='Date'))
+
+    raw = unadjust_history(hist)
+    np.testing.assert_allclose(raw['Close'], [202.0, 204.0, 102.0])
+    assert raw['Volume'].tolist() == [1000, 1200, 2400]
+
+    rows = actions_from_history('TEST.ST', raw.reset_index())
+    assert rows == [('TEST.ST', '2024-01-04', 'split', 2.0, 0.5, 2.0)]
@@ -0,0 +1,81 @@
+import asyncio
+import functools
+import time
+import httpx
+from fastapi.testclient import TestClient
+from main import app
+from api import endpoints
+from api.admission import AdmissionController, admission
+from scripts import screener
+from scripts.screener import ScreenRun, cached_cross_section
+
+client = TestClient(app)
+
+def test_queue_hands_over_slots_and_sheds_overflow():
+    """Test that waiters get freed slots in order and requests beyond the queue are shed"""
+    async def scenario():
+        controller = AdmissionController(slots=1, queue=1, timeout=1)
+        assert await controller.acquire()
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        assert not await controller.acquire()
+        assert controller.retry_after() >= 1
+
+        controller.release(0.5)
+        assert await waiting
+        assert controller.running == 1
+        controller.release()
+        assert (controller.running, controller.admitted, controller.rejected) == (0, 2, 1)
+    asyncio.run(scenario())
+
+def test_queued_requests_time_out():
+    """Test that a request waiting longer than the queue timeout is rejected and leaves the queue"""
+    async def scenario():
+        controller = AdmissionController(slots=1, queue=4, timeout=0.01)
+        assert await controller.acquire()
+        assert not await controller.acquire()
+        assert not controller.waiters
+    asyncio.run(scenario())
+
+def test_screen_deadline_returns_partial_results(synthetic_db, monkeypatch):
+    """Test that a screen past its deadline stops between chunks and is not cached"""
+    run = ScreenRun(synthetic_db, {}, chunk=4, deadline=time.perf_counter())
+    matches = list(run)
+    assert run.summary()['scanned'] == len(matches) == 4
+    assert run.summary()['complete'] is False
+
+    monkeypatch.setattr(screener, 'ScreenRun', functools.partial(ScreenRun, chunk=4))
+    partial = cached_cross_section(synthetic_db, '{}', 'v-deadline', time.perf_counter())
+    assert not partial.complete and len(partial) == 4
+    full = cached_cross_section(synthetic_db, '{}', 'v-deadline')
+    assert full.complete and len(full) == 12
+    assert cached_cross_section(synthetic_db, '{}', 'v-deadline', time.perf_counter()) is full
+
+def test_joined_screen_keeps_its_own_deadline(synthetic_db, monkeypatch):
+    """Test that a caller joining a run cut short by another caller's deadline still gets full results"""
+    monkeypatch.setattr(admission, 'slots', 4)
+    monkeypatch.setattr(screener, 'ScreenRun', functools.partial(ScreenRun, chunk=4))
+    def slow_cross_section(*args):
+        time.sleep(0.2)
+        return cached_cross_section(*args)
+    monkeypatch.setattr(endpoints, 'cached_cross_section', slow_cross_section)
+    criteria = {"RSI": {"below": 101}}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as http:
+            hasty = asyncio.ensure_future(http.post('/api/screen?deadline=0.01', json=criteria))
+            await asyncio.sleep(0.05)
+            patient = await http.post('/api/screen?deadline=30', json=criteria)
+            return (await hasty).json(), patient.json()
+    hasty, patient = asyncio.run(scenario())
+    assert hasty["complete"] is False and len(hasty["stocks"]) == 4
+    assert "complete" not in patient and len(patient["stocks"]) == 12
+
+def test_heavy_requests_shed_while_cheap_ones_pass(synthetic_db, monkeypatch):
+    """Test that a full heavy queue answers 429 with Retry-After and cheap routes are not queued"""
+    monkeypatch.setattr(admission, 'slots', 0)
+    monkeypatch.setattr(admission, 'queue', 0)
+    response = client.post("/api/screen", json={"RSI": {"below": 50}})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/api/stocks").status_code == 200
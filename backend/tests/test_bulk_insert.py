@@ -0,0 +1,73 @@
+import sqlite3
+import pytest
+from scripts.bulk_insert import BulkWriter, bulk_load, frame_rows, insert_frame
+from scripts.init_db import create_tables
+from scripts.synthetic import generate_panel
+
+@pytest.fixture
+def conn():
+    """Create an in-memory database with the stock_prices layout"""
+    conn = sqlite3.connect(':memory:')
+    create_tables(conn)
+    yield conn
+    conn.close()
+
+def test_frame_rows_are_python_scalars():
+    """Test that rows come out as native types sqlite3 can bind"""
+    frame = generate_panel(2, 0.1, seed=3)
+    rows = list(frame_rows(frame, ['symbol', 'close', 'volume']))
+    assert len(rows) == len(frame)
+    assert [type(value) for value in rows[0]] == [str, float, int]
+
+def test_bulk_writer_batches_and_round_trips(conn):
+    """Test that BulkWriter commits per batch and stores every bar unchanged"""
+    frame = generate_panel(5, 0.5, seed=3)
+    with BulkWriter(conn, 'stock_prices', batch_rows=200) as writer:
+        for _, group in frame.groupby('symbol'):
+            writer.add(group)
+            assert writer.pending < 200
+    assert writer.rows == len(frame)
+    assert writer.rows_per_second > 0
+
+    stored = conn.execute('SELECT symbol, date, open, high, low, close, volume FROM stock_prices '
+                          'ORDER BY symbol, date').fetchall()
+    assert stored == list(frame_rows(frame, ['symbol', 'date', 'open', 'high', 'low', 'close', 'volume']))
+
+    # Replaying a batch replaces rows instead of failing on the primary key
+    assert insert_frame(conn, 'stock_prices', frame.head(10)) == 10
+    assert conn.execute('SELECT COUNT(*) FROM stock_prices').fetchone()[0] == len(frame)
+
+def test_bulk_load_defers_secondary_indexes(conn):
+    """Test that secondary indexes are dropped during a load and rebuilt after it"""
+    conn.execute('CREATE INDEX idx_stock_prices_date ON stock_prices (date)')
+    indexes = "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'stock_prices' AND sql IS NOT NULL"
+    with bulk_load(conn, ['stock_prices']):
+        assert conn.execute(indexes).fetchall() == []
+        insert_frame(conn, 'stock_prices', generate_panel(2, 0.2, seed=3))
+    assert conn.execute(indexes).fetchall() == [('idx_stock_prices_date',)]
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM stock_prices WHERE date = '2024-12-31'").fetchall()
+    assert 'idx_stock_prices_date' in str(plan)
+
+def test_deferred_writes_hold_no_lock_between_flushes(tmp_path):
+    """Test that side-table writes wait for the flush, so other writers aren't locked out meanwhile"""
+    path = tmp_path / 'prices.db'
+    conn = sqlite3.connect(path)
+    create_tables(conn)
+    conn.execute('CREATE TABLE notes (symbol TEXT)')
+    conn.commit()
+
+    writer = BulkWriter(conn, 'stock_prices', batch_rows=10_000)
+    frame = generate_panel(2, 0.1, seed=3)
+    writer.add(frame)
+    writer.defer(lambda c, symbol: c.execute('INSERT INTO notes VALUES (?)', (symbol,)), 'SYN0000.ST')
+    assert not conn.in_transaction
+
+    other = sqlite3.connect(path, timeout=0)
+    with other:
+        other.execute("INSERT INTO notes VALUES ('OTHER')")
+    writer.flush()
+    assert not conn.in_transaction
+    assert sorted(row[0] for row in other.execute('SELECT symbol FROM notes')) == ['OTHER', 'SYN0000.ST']
+    assert other.execute('SELECT COUNT(*) FROM stock_prices').fetchone()[0] == len(frame)
+    other.close()
+    conn.close()
@@ -0,0 +1,63 @@
+import sqlite3
+import pyarrow.dataset as ds
+from scripts.columnar import export_history, import_history, read_manifest
+from scripts.synthetic import symbol_names
+from scripts.versioning import current_version
+
+PRICES = 'SELECT symbol, date, open, high, low, close, volume FROM stock_prices ORDER BY symbol, date'
+
+def test_export_is_partitioned_and_readable_by_arrow(synthetic_db, tmp_path):
+    """Test that the export is a Hive-partitioned dataset holding every bar"""
+    stats = export_history(synthetic_db, tmp_path / 'export')
+    manifest = read_manifest(tmp_path / 'export')
+    assert stats['partitions'] == len(manifest['partitions']) == 12 * 2
+    assert stats['tables'] == ['corporate_actions', 'latest_close']
+
+    dataset = ds.dataset(tmp_path / 'export' / 'stock_prices', format='parquet', partitioning='hive')
+    table = dataset.to_table(filter=ds.field('symbol') == symbol_names(12)[0])
+    with sqlite3.connect(synthetic_db) as conn:
+        assert table.num_rows == conn.execute('SELECT COUNT(*) FROM stock_prices WHERE symbol = ?',
+                                              (symbol_names(12)[0],)).fetchone()[0]
+        assert dataset.count_rows() == conn.execute('SELECT COUNT(*) FROM stock_prices').fetchone()[0]
+
+def test_export_only_rewrites_changed_partitions(synthetic_db, tmp_path):
+    """Test that a second export skips partitions whose data did not change"""
+    export_history(synthetic_db, tmp_path / 'export')
+    with sqlite3.connect(synthetic_db) as conn:
+        conn.execute("UPDATE stock_prices SET close = close + 1 WHERE symbol = ? AND date = "
+                     "(SELECT MAX(date) FROM stock_prices)", (symbol_names(12)[3],))
+    stats = export_history(synthetic_db, tmp_path / 'export')
+    assert (stats['partitions'], stats['skipped']) == (1, 23)
+
+def test_full_export_removes_deleted_symbols(synthetic_db, tmp_path):
+    """Test that a full export rewrites every partition and still drops those of deleted symbols"""
+    export_history(synthetic_db, tmp_path / 'export')
+    symbol = symbol_names(12)[2]
+    with sqlite3.connect(synthetic_db) as conn:
+        conn.execute('DELETE FROM stock_prices WHERE symbol = ?', (symbol,))
+    stats = export_history(synthetic_db, tmp_path / 'export', full=True)
+    assert (stats['partitions'], stats['skipped']) == (11 * 2, 0)
+    assert not (tmp_path / 'export' / 'stock_prices' / f'symbol={symbol}').exists()
+    assert len(read_manifest(tmp_path / 'export')['partitions']) == 11 * 2
+
+def test_import_round_trips_and_is_incremental(synthetic_db, tmp_path):
+    """Test that a fresh import copies the database and a repeat only reads newer partitions"""
+    export_history(synthetic_db, tmp_path / 'export')
+    target = tmp_path / 'fresh.db'
+    stats = import_history(tmp_path / 'export', target)
+    assert stats['skipped'] == 0
+    assert current_version(target)['version'] == '1'
+    with sqlite3.connect(synthetic_db) as source, sqlite3.connect(target) as copy:
+        assert copy.execute(PRICES).fetchall() == source.execute(PRICES).fetchall()
+        assert copy.execute('SELECT * FROM latest_close').fetchall() == source.execute('SELECT * FROM latest_close').fetchall()
+
+    assert import_history(tmp_path / 'export', target)['rows'] == 0
+
+    # Cut one symbol back to an older high-water mark: only its last partition is read
+    symbol = symbol_names(12)[5]
+    with sqlite3.connect(target) as copy:
+        removed = copy.execute("DELETE FROM stock_prices WHERE symbol = ? AND date > '2024-06-28'", (symbol,)).rowcount
+    stats = import_history(tmp_path / 'export', target)
+    assert (stats['symbols'], stats['rows'], stats['partitions']) == ([symbol], removed, 1)
+    with sqlite3.connect(synthetic_db) as source, sqlite3.connect(target) as copy:
+        assert copy.execute(PRICES).fetchall() == source.execute(PRICES).fetchall()
@@ -124,3 +124,125 @@ def test_error_handling():
     response = client.post("/api/screen", json=payload)
     assert response.status_code == 200  # Should still return 200 but with no stocks
     assert response.json()["stocks"] == []
+
+def test_batch_stocks(synthetic_db):
+    """Test batch endpoint against per-symbol indicator calculation"""
+    from scripts.indicators import TechnicalIndicators
+    indicators = TechnicalIndicators()
+    symbols = indicators.get_all_stocks()[:5]
+
+    response = client.post("/api/stocks/batch", json={"symbols": symbols + ["INVALID"]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["symbols"] == symbols
+    assert data["missing"] == ["INVALID"]
+
+    for i, symbol in enumerate(symbols):
+        df = indicators.get_stock_data(symbol)
+        macd, signal, _ = indicators.calculate_macd(df)
+        assert data["price"][i] == pytest.approx(df['close'].iloc[-1])
+        assert data["date"][i] == df['date'].iloc[-1].strftime('%Y-%m-%d')
+        assert data["indicators"]["RSI"][i] == pytest.approx(indicators.calculate_rsi(df).iloc[-1])
+        assert data["indicators"]["MACD"]["signal"][i] == pytest.approx(signal.iloc[-1])
+        assert data["indicators"]["MA"]["MA50"][i] == pytest.approx(
+            indicators.calculate_moving_averages(df)['MA50'].iloc[-1])
+
+    # Only requested indicators are returned
+    response = client.post("/api/stocks/batch", json={"symbols": symbols, "indicators": ["RSI"]})
+    assert list(response.json()["indicators"]) == ["RSI"]
+
+    # Unknown indicators are rejected, as on the history endpoint
+    response = client.post("/api/stocks/batch", json={"symbols": symbols, "indicators": ["RSI", "BOGUS"]})
+    assert response.status_code == 400
+
+def test_stock_history(synthetic_db):
+    """Test history endpoint ranges, indicators, downsampling and Arrow output"""
+    from scripts.indicators import TechnicalIndicators
+    indicators = TechnicalIndicators()
+    symbol = indicators.get_all_stocks()[0]
+    df = indicators.get_stock_data(symbol)
+
+    response = client.get(f"/api/stocks/{symbol}/history")
+    assert response.status_code == 200
+    assert "max-age" in response.headers["cache-control"]
+    data = response.json()
+    assert data["total"] == len(df) == len(data["date"])
+    assert data["close"] == pytest.approx(df['close'].tolist())
+    assert data["indicators"]["RSI"] == pytest.approx(indicators.calculate_rsi(df).tolist())
+
+    # Indicators in a range are warmed up on the full history
+    response = client.get(f"/api/stocks/{symbol}/history", params={"start": "2024-06-03", "indicators": "MA"})
+    data = response.json()
+    in_range = df['date'] >= "2024-06-03"
+    assert data["date"][0] == "2024-06-03"
+    assert list(data["indicators"]) == ["MA"]
+    assert data["indicators"]["MA"]["MA50"] == pytest.approx(
+        indicators.calculate_moving_averages(df)['MA50'][in_range].tolist())
+
+    response = client.get(f"/api/stocks/{symbol}/history", params={"points": 50})
+    data = response.json()
+    assert len(data["date"]) == 50
+    assert data["total"] == len(df)
+    assert data["date"][0] == df['date'].iloc[0].strftime('%Y-%m-%d')
+    assert data["date"][-1] == df['date'].iloc[-1].strftime('%Y-%m-%d')
+
+    response = client.get(f"/api/stocks/{symbol}/history", params={"points": 50, "format": "arrow"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    pa = pytest.importorskip("pyarrow")
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 50
+    assert "MACD.histogram" in table.column_names
+
+    assert client.get("/api/stocks/INVALID/history").status_code == 404
+    assert client.get(f"/api/stocks/{symbol}/history", params={"indicators": "FOO"}).status_code == 400
+
+def test_stream_screen(synthetic_db):
+    """Test NDJSON and SSE screen streams end with a summary record"""
+    import json
+    criteria = {"RSI": {"below": 60}}
+    response = client.post("/api/screen/stream", json=criteria)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    matches = [r for r in records if r["type"] == "match"]
+    assert records[-1]["type"] == "summary"
+    assert records[-1]["scanned"] == 12
+    assert records[-1]["matched"] == len(matches)
+    assert sorted(r["symbol"] for r in matches) == sorted(client.post("/api/screen", json=criteria).json()["stocks"])
+
+    response = client.post("/api/screen/stream", params={"format": "sse"}, json=criteria)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [e[0] for e in events[:-1]] == ["event: match"] * len(matches)
+    assert events[-1][0] == "event: summary"
+
+    assert client.post("/api/screen/stream", json={"RSI": {"below": "x"}}).status_code == 400
+
+def test_screen_pagination(synthetic_db):
+    """Test limit/cursor/sort_by/fields on the screen endpoint"""
+    criteria = {"RSI": {"below": 100}}
+    everything = client.post("/api/screen", json=criteria).json()
+    assert set(everything) == {"stocks"}
+
+    params = {"limit": 5, "sort_by": "-MA200_distance", "fields": "price,RSI,MA200,MA200_distance"}
+    pages, cursor = [], None
+    while True:
+        response = client.post("/api/screen", params={**params, **({"cursor": cursor} if cursor else {})}, json=criteria)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == len(everything["stocks"])
+        assert len(data["results"]) == len(data["stocks"]) <= 5
+        assert set(data["results"][0]) == {"symbol", "price", "RSI", "MA200", "MA200_distance"}
+        pages.extend(data["results"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(r["symbol"] for r in pages) == sorted(everything["stocks"])
+    distances = [r["MA200_distance"] for r in pages]
+    assert distances == sorted(distances, reverse=True)
+    assert pages[0]["MA200_distance"] == pytest.approx(pages[0]["price"] / pages[0]["MA200"] - 1)
+
+    assert client.post("/api/screen", params={"sort_by": "volume"}, json=criteria).status_code == 400
+    assert client.post("/api/screen", params={"fields": "foo"}, json=criteria).status_code == 400
+    assert client.post("/api/screen", params={"cursor": "bogus"}, json=criteria).status_code == 400
@@ -0,0 +1,78 @@
+import csv
+import io
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow.parquet as pq
+from fastapi.testclient import TestClient
+from main import app
+from scripts import columnar
+from scripts.columnar import iter_price_rows, parquet_stream
+from scripts.screener import ScreenRun
+from scripts.synthetic import symbol_names
+
+client = TestClient(app)
+
+def test_csv_export_of_symbols_and_dates(synthetic_db):
+    """Test that a CSV export holds exactly the stored rows for the symbols and date range"""
+    symbols = symbol_names(12)[:2]
+    response = client.post("/api/export", json={"symbols": symbols, "start": "2024-01-01", "end": "2024-03-31"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["symbol", "date", "open", "high", "low", "close", "volume"]
+    with sqlite3.connect(synthetic_db) as conn:
+        expected = conn.execute("SELECT symbol, date FROM stock_prices WHERE symbol IN (?, ?) "
+                                "AND date BETWEEN '2024-01-01' AND '2024-03-31' ORDER BY symbol, date",
+                                symbols).fetchall()
+    assert [tuple(row[:2]) for row in rows[1:]] == expected
+
+def test_parquet_export_streams_row_groups(synthetic_db):
+    """Test that a Parquet export of every symbol is readable and written one batch at a time"""
+    response = client.post("/api/export?format=parquet", json={})
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    with sqlite3.connect(synthetic_db) as conn:
+        assert table.num_rows == conn.execute("SELECT COUNT(*) FROM stock_prices").fetchone()[0]
+    assert sorted(set(table.column("symbol").to_pylist())) == symbol_names(12)
+
+    chunks = list(parquet_stream(iter_price_rows(synthetic_db, batch_rows=500)))
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet.metadata.num_rows == table.num_rows
+    assert len(chunks) == parquet.num_row_groups + 1 > 2
+
+def test_export_of_screen_matches(synthetic_db):
+    """Test that exporting with criteria returns history for the screen's matches only"""
+    criteria = {"RSI": {"below": 50}}
+    matches = sorted(match["symbol"] for match in ScreenRun(synthetic_db, criteria))
+    response = client.post("/api/export", json={"criteria": criteria, "start": "2024-12-01"})
+    assert response.status_code == 200
+    symbols = {row[0] for row in list(csv.reader(io.StringIO(response.text)))[1:]}
+    assert sorted(symbols) == matches
+
+def test_export_rejects_bad_requests(synthetic_db):
+    """Test that bad dates, invalid criteria and symbols with criteria are rejected"""
+    assert client.post("/api/export", json={"start": "last week"}).status_code == 400
+    assert client.post("/api/export", json={"symbols": ["A"], "criteria": {}}).status_code == 400
+    assert client.post("/api/export", json={"criteria": {"RSI": {"below": "low"}}}).status_code == 400
+    assert client.post("/api/export?format=xlsx", json={}).status_code == 422
+
+def test_export_generator_moves_between_threads(synthetic_db):
+    """Test that the row stream can be advanced from a different thread each batch, as the threadpool does"""
+    batches = iter_price_rows(synthetic_db, batch_rows=100)
+    with ThreadPoolExecutor(1) as first, ThreadPoolExecutor(1) as second:
+        rows = [first.submit(next, batches).result(), second.submit(next, batches).result()]
+        rows += list(second.submit(list, batches).result())
+    with sqlite3.connect(synthetic_db) as conn:
+        assert sum(map(len, rows)) == conn.execute("SELECT COUNT(*) FROM stock_prices").fetchone()[0]
+
+def test_export_of_many_batches_through_the_app(synthetic_db, monkeypatch):
+    """Test that an export spanning many cursor batches arrives whole"""
+    monkeypatch.setattr(columnar, "STREAM_BATCH_ROWS", 97)
+    response = client.post("/api/export", json={})
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.text)))[1:]
+    with sqlite3.connect(synthetic_db) as conn:
+        expected = conn.execute("SELECT symbol, date FROM stock_prices ORDER BY symbol, date").fetchall()
+    assert [tuple(row[:2]) for row in rows] == expected
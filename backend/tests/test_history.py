@@ -0,0 +1,19 @@
+import numpy as np
+from scripts.history import lttb
+
+def test_lttb_keeps_end_points_and_extremes():
+    """Test that LTTB keeps the first and last bars and isolated peaks"""
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    y[437] = 10.0
+    y[812] = -10.0
+    rows = lttb(x, y, 100)
+    assert len(rows) == 100
+    assert rows[0] == 0 and rows[-1] == 999
+    assert np.all(np.diff(rows) > 0)
+    assert 437 in rows and 812 in rows
+
+def test_lttb_short_series_unchanged():
+    """Test that series already within the point budget are returned whole"""
+    assert np.array_equal(lttb(np.arange(10), np.ones(10), 50), np.arange(10))
+    assert np.array_equal(lttb(np.arange(10), np.ones(10), 10), np.arange(10))
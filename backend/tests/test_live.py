@@ -0,0 +1,120 @@
+import os
+import sqlite3
+import threading
+from fastapi.testclient import TestClient
+from main import app
+from api import live
+from api.live import hub
+from scripts.versioning import current_version, publish, version_path
+
+client = TestClient(app)
+
+def _append_falling_bars(db_path, symbol, bars=8):
+    """Append bars with a steady 8% daily drop after the symbol's last bar"""
+    with sqlite3.connect(db_path) as conn:
+        date, close = conn.execute(
+            "SELECT date, close FROM stock_prices WHERE symbol = ? ORDER BY date DESC LIMIT 1", (symbol,)
+        ).fetchone()
+        rows = []
+        for i in range(1, bars + 1):
+            close *= 0.92
+            rows.append((symbol, f"2025-01-{i + 1:02d}", close, close, close, close, 1000))
+        conn.executemany("INSERT INTO stock_prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+def test_push_after_publish(synthetic_db, monkeypatch):
+    """Test that a publish pushes changed values and screen entries to subscribers"""
+    monkeypatch.setattr(hub, 'interval', 0.02)
+    with client.websocket_connect("/api/ws") as ws:
+        ws.send_json({"action": "subscribe", "screen": {"id": "oversold", "criteria": {"RSI": {"below": 30}}}})
+        initial = ws.receive_json()
+        assert initial["type"] == "screen" and initial["id"] == "oversold"
+        symbols = client.post("/api/screen", json={"RSI": {"above": 30}}).json()["stocks"]
+        target, other = symbols[0], symbols[1]
+        assert target not in initial["members"]
+
+        ws.send_json({"action": "subscribe", "symbols": [target, other]})
+        snapshot = ws.receive_json()
+        assert snapshot["type"] == "snapshot"
+        assert set(snapshot["values"]) == {target, other}
+
+        _append_falling_bars(synthetic_db, target)
+        publish(synthetic_db, [target])
+
+        update = ws.receive_json()
+        assert update["type"] == "update"
+        assert list(update["values"]) == [target]
+        assert update["values"][target]["date"] == "2025-01-09"
+        assert update["values"][target]["indicators"]["RSI"] < 30
+
+        diff = ws.receive_json()
+        assert diff == {"type": "screen_diff", "id": "oversold", "version": update["version"],
+                        "entered": [target], "exited": []}
+
+def test_bad_messages_get_errors(synthetic_db):
+    """Test that malformed messages are answered with an error and keep the connection open"""
+    with client.websocket_connect("/api/ws") as ws:
+        ws.send_text("not json")
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"action": "watch"})
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"action": "subscribe", "screen": {"criteria": {}}})
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"action": "subscribe", "screen": {"id": "x", "criteria": {"RSI": {"below": "low"}}}})
+        assert ws.receive_json()["type"] == "error"
+        ws.send_text("[]")
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"action": "subscribe", "symbols": "SYN0000.ST"})
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"action": "subscribe", "symbols": [1]})
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"action": "unsubscribe", "screen": ["x"]})
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"action": "subscribe", "symbols": ["INVALID"]})
+        assert ws.receive_json() == {"type": "snapshot", "version": "1", "values": {}}
+
+def test_push_covers_versions_published_between_polls(synthetic_db, monkeypatch):
+    """Test that two publishes seen in one poll push the changes of both"""
+    monkeypatch.setattr(hub, 'interval', 0.02)
+    polling = threading.Lock()
+    def gated_version(db_path):
+        with polling:
+            return current_version(db_path)
+    monkeypatch.setattr(live, 'current_version', gated_version)
+
+    with client.websocket_connect("/api/ws") as ws:
+        ws.send_json({"action": "subscribe", "screen": {"id": "oversold", "criteria": {"RSI": {"below": 30}}}})
+        initial = ws.receive_json()
+        symbols = client.post("/api/screen", json={"RSI": {"above": 30}}).json()["stocks"]
+        target, other = symbols[0], symbols[1]
+        ws.send_json({"action": "subscribe", "symbols": [target, other]})
+        assert ws.receive_json()["type"] == "snapshot"
+
+        # The watcher can't poll between the two publishes
+        with polling:
+            _append_falling_bars(synthetic_db, target)
+            publish(synthetic_db, [target])
+            publish(synthetic_db, [other])
+
+        update = ws.receive_json()
+        assert update["type"] == "update" and update["version"] == "3"
+        assert update["values"][target]["date"] == "2025-01-09"
+        diff = ws.receive_json()
+        assert diff == {"type": "screen_diff", "id": "oversold", "version": "3",
+                        "entered": [target], "exited": []}
+
+def test_push_from_an_unpublished_database(synthetic_db, monkeypatch):
+    """Test that a file-based version still pushes values when saved screens are subscribed"""
+    from scripts.saved_screens import save_screen
+    monkeypatch.setattr(hub, 'interval', 0.02)
+    save_screen(synthetic_db, "oversold", {"RSI": {"below": 30}})
+    os.remove(version_path(synthetic_db))
+    with client.websocket_connect("/api/ws") as ws:
+        target = client.get("/api/stocks").json()[0]
+        ws.send_json({"action": "subscribe", "symbols": [target], "saved_screen": "oversold"})
+        assert ws.receive_json()["type"] == "snapshot"
+        assert ws.receive_json()["type"] == "saved_screen"
+
+        _append_falling_bars(synthetic_db, target)
+        update = ws.receive_json()
+        assert update["type"] == "update" and not update["version"].isdigit()
+        assert update["values"][target]["date"] == "2025-01-09"
@@ -0,0 +1,47 @@
+import json
+import logging
+import subprocess
+import sys
+from scripts.indicators import TechnicalIndicators
+from scripts.logs import JsonFormatter, Sampler, sampled
+from scripts.screener import ScreenRun
+
+def test_import_does_not_configure_logging():
+    """Test that importing library modules leaves the root logger alone"""
+    code = ("import logging, scripts.indicators, scripts.database, scripts.screener; "
+            "print(len(logging.getLogger().handlers), logging.getLogger().level)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.split() == ["0", str(logging.WARNING)]
+
+def test_screen_logs_one_summary(synthetic_db, caplog):
+    """Test that a per-symbol screen logs a single INFO summary instead of per-symbol records"""
+    caplog.set_level(logging.INFO)
+    matches = TechnicalIndicators(synthetic_db).screen_stocks({"RSI": {"below": 50}, "MACD": {"signal": "bullish"}})
+    records = [r for r in caplog.records if r.levelno >= logging.INFO and r.name == "scripts.indicators"]
+    assert len(records) == 1
+    assert records[0].event == "screen"
+    assert (records[0].scanned, records[0].matched) == (12, len(matches))
+
+    caplog.clear()
+    run = ScreenRun(synthetic_db, {"RSI": {"below": 50}}, chunk=5)
+    list(run)
+    records = [r for r in caplog.records if r.name == "scripts.screener"]
+    assert len(records) == 1
+    assert records[0].scanned == 12 and records[0].matched == run.matched
+
+def test_sampled_checks_level_first():
+    """Test that sampling only advances when the level is enabled"""
+    logger = logging.getLogger("tests.sampled")
+    logger.setLevel(logging.INFO)
+    sampler = Sampler(3)
+    assert not any(sampled(logger, sampler) for _ in range(5))
+    logger.setLevel(logging.DEBUG)
+    assert [sampled(logger, sampler) for _ in range(6)] == [True, False, False, True, False, False]
+
+def test_json_formatter_includes_extra():
+    """Test that structured records carry their extra fields as top-level keys"""
+    record = logging.LogRecord("screen", logging.INFO, __file__, 1, "Screened %d", (3,), None)
+    record.matched = 2
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Screened 3"
+    assert entry["matched"] == 2 and entry["level"] == "INFO"
@@ -0,0 +1,57 @@
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from main import app
+from scripts.metrics import record_ingest_run, stage
+
+client = TestClient(app)
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_request_latency_by_route_template(synthetic_db):
+    """Test that requests are recorded under their route template, including 304s and 404s"""
+    symbol = client.get("/api/stocks").json()[0]
+    route = {"method": "GET", "route": "/api/stocks/{symbol}/history"}
+    before = _sample("screener_request_duration_seconds_count", status="200", **route)
+    etag = client.get(f"/api/stocks/{symbol}/history").headers["etag"]
+    assert _sample("screener_request_duration_seconds_count", status="200", **route) == before + 1
+
+    not_modified = _sample("screener_request_duration_seconds_count", status="304", **route)
+    assert client.get(f"/api/stocks/{symbol}/history", headers={"If-None-Match": etag}).status_code == 304
+    assert _sample("screener_request_duration_seconds_count", status="304", **route) == not_modified + 1
+
+    unmatched = _sample("screener_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+    client.get("/nowhere")
+    assert _sample("screener_request_duration_seconds_count",
+                   method="GET", route="unmatched", status="404") == unmatched + 1
+
+def test_stage_timers_and_caches(synthetic_db):
+    """Test that a screen records db_read, compute and serialize time and cache lookups"""
+    counts = {name: _sample("screener_stage_duration_seconds_count", stage=name)
+              for name in ("db_read", "compute", "serialize")}
+    criteria = {"RSI": {"below": 50}}
+    etag = client.post("/api/screen", json=criteria).headers["etag"]
+    for name, count in counts.items():
+        assert _sample("screener_stage_duration_seconds_count", stage=name) > count
+
+    hits = _sample("screener_cache_requests_total", cache="etag", result="hit")
+    client.post("/api/screen", json=criteria, headers={"If-None-Match": etag})
+    assert _sample("screener_cache_requests_total", cache="etag", result="hit") == hits + 1
+    assert 0 < _sample("screener_cache_hit_ratio", cache="etag") <= 1
+
+    with stage("compute"):
+        pass
+    text = client.get("/metrics").text
+    assert 'screener_cache_requests_total{cache="cross_section",result="miss"}' in text
+    assert 'screener_stage_duration_seconds_bucket{le="0.0005",stage="compute"}' in text
+
+def test_ingest_runs_accumulate(synthetic_db):
+    """Test that ingestion stats written by the ingest process are exposed as totals and last run"""
+    record_ingest_run(synthetic_db, "update", symbols=10, rows=2500, failures=1, duration=4.0)
+    record_ingest_run(synthetic_db, "update", symbols=12, rows=100, failures=0, duration=1.5)
+    client.get("/metrics")
+    assert _sample("screener_ingest_runs_total", job="update") == 2
+    assert _sample("screener_ingest_symbols_fetched_total", job="update") == 22
+    assert _sample("screener_ingest_rows_written_total", job="update") == 2600
+    assert _sample("screener_ingest_failures_total", job="update") == 1
+    assert _sample("screener_ingest_last_duration_seconds", job="update") == 1.5
@@ -0,0 +1,83 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from scripts.versioning import publish, current_version, version_path
+
+client = TestClient(app)
+
+def test_publish_increments_version(tmp_path):
+    """Test that publishing bumps the version and records changed symbols"""
+    db_path = tmp_path / 'prices.db'
+    db_path.write_bytes(b'')
+    fallback = current_version(db_path)['version']
+
+    first = publish(db_path, ['B.ST', 'A.ST'])
+    assert first['version'] == 1
+    assert current_version(db_path)['version'] == '1' != fallback
+    assert current_version(db_path)['symbols'] == ['A.ST', 'B.ST']
+    assert publish(db_path)['version'] == 2
+    assert current_version(db_path)['symbols'] is None
+    assert version_path(db_path).exists()
+    assert not list(tmp_path.glob('*.tmp'))
+
+def test_conditional_get(synthetic_db):
+    """Test that a matching If-None-Match gets 304 until a new version is published"""
+    response = client.get("/api/stocks")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert "last-modified" in response.headers
+    assert response.headers["cache-control"] == "no-cache"
+
+    # Answered from the version marker alone, even with the database gone
+    os.rename(synthetic_db, synthetic_db + '.moved')
+    response = client.get("/api/stocks", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b''
+    os.rename(synthetic_db + '.moved', synthetic_db)
+
+    response = client.get("/api/stocks", headers={"If-Modified-Since": response.headers["last-modified"]})
+    assert response.status_code == 304
+
+    publish(synthetic_db)
+    response = client.get("/api/stocks", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+def test_conditional_post_depends_on_body(synthetic_db):
+    """Test that screen ETags cover the criteria in the request body"""
+    criteria = {"RSI": {"below": 50}}
+    etag = client.post("/api/screen", json=criteria).headers["etag"]
+    assert client.post("/api/screen", json=criteria, headers={"If-None-Match": etag}).status_code == 304
+    other = client.post("/api/screen", json={"RSI": {"below": 40}}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    assert other.headers["etag"] != etag
+
+def test_history_keeps_cache_control(synthetic_db):
+    """Test that routes setting their own Cache-Control keep it alongside the ETag"""
+    symbol = client.get("/api/stocks").json()[0]
+    response = client.get(f"/api/stocks/{symbol}/history")
+    assert "max-age" in response.headers["cache-control"]
+    assert "etag" in response.headers
+
+@pytest.mark.parametrize('encoding', ['gzip', 'br'])
+def test_compression(synthetic_db, encoding):
+    """Test that large responses are compressed with the negotiated encoding"""
+    if encoding == 'br':
+        pytest.importorskip('brotli')
+    symbol = client.get("/api/stocks").json()[0]
+    plain = client.get(f"/api/stocks/{symbol}/history", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    response = client.get(f"/api/stocks/{symbol}/history", headers={"Accept-Encoding": encoding})
+    assert response.headers["content-encoding"] == encoding
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert int(response.headers["content-length"]) < len(plain.content) / 2
+    assert response.json() == plain.json()
+
+def test_small_responses_not_compressed(synthetic_db):
+    """Test that responses under the size threshold are sent as is"""
+    response = client.get("/api/stocks/INVALID/history", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 404
+    assert "content-encoding" not in response.headers
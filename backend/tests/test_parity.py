@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from scripts import kernels
+from scripts.parity import ENGINES, RTOL, ATOL, parity_cases, check_parity, find_regressions
+from scripts.synthetic import generate_symbol
+
+@pytest.mark.parametrize('engine', [name for name in ENGINES if name != 'reference'])
+def test_engine_matches_reference(engine):
+    """Test that every alternative engine matches the ta-based reference"""
+    failures = check_parity(ENGINES[engine](), parity_cases())
+    assert failures == []
+
+@pytest.mark.parametrize('columns', [kernels.BLOCKED_COLUMNS - 1, kernels.VECTOR_COLUMNS + 2])
+def test_panel_kernels_match_single_series(columns):
+    """Test that (time, symbols) inputs give the same result as one series at a time"""
+    panel = np.column_stack([generate_symbol(i, 300)['close'] for i in range(columns)])
+    panel[:25, 1] = np.nan
+    panel[100:103, 2] = np.nan
+    panel[:, -1] = 42.0
+
+    rsi = kernels.rsi(panel)
+    line, signal = kernels.macd(panel)
+    for j in range(columns):
+        np.testing.assert_allclose(rsi[:, j], kernels.rsi(panel[:, j]), rtol=RTOL, atol=ATOL)
+        np.testing.assert_allclose(line[:, j], kernels.macd(panel[:, j])[0], rtol=RTOL, atol=ATOL)
+        np.testing.assert_allclose(signal[:, j], kernels.macd(panel[:, j])[1], rtol=RTOL, atol=ATOL)
+    # A flat column stays exactly flat, so crossover checks can't trip on rounding
+    assert np.all(line[35:, -1] == 0)
+
+def test_regression_detection():
+    """Test that only slowdowns past the threshold are reported"""
+    baseline = {'numpy': {'RSI': {'seconds': 1.0, 'ratio': 0.10}, 'MA': {'seconds': 1.0, 'ratio': 0.50}}}
+    current = {
+        'reference': {'RSI': {'seconds': 9.0, 'ratio': 1.0}},
+        'numpy': {'RSI': {'seconds': 1.2, 'ratio': 0.14}, 'MA': {'seconds': 1.1, 'ratio': 0.55}},
+    }
+    regressions = find_regressions(current, baseline, max_slowdown=0.25)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('numpy.RSI')
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from scripts import kernels
+from scripts.panel import FIELDS, load_panel
+from scripts.precision import cast_field, field_dtype
+from scripts.shared_panel import current_panel, publish_panel
+from scripts.synthetic import build_database, symbol_names
+
+# Bounds on float32 error against float64, with roughly 10x headroom over
+# the worst case on 300 synthetic symbols x 10 years (seed 11): RSI 1.2e-4
+# points, MACD line and histogram 1.7e-6 x close, SMA 8e-8 relative.
+# The fixture below checks a smaller 60 x 8 universe with the same seed,
+# whose worst cases are 9.4e-5, 5.7e-7 and 7.5e-8.
+RSI_POINTS = 1e-3
+MACD_OF_CLOSE = 2e-5
+SMA_RELATIVE = 1e-6
+
+@pytest.fixture(scope='module')
+def panels(tmp_path_factory):
+    """Load one synthetic universe in both precision modes"""
+    db_path = tmp_path_factory.mktemp('precision') / 'precision.db'
+    build_database(db_path, 60, 8, seed=11, stores=('stock_prices',))
+    symbols = symbol_names(60)
+    return (load_panel(str(db_path), symbols, FIELDS, mode='float64'),
+            load_panel(str(db_path), symbols, FIELDS, mode='compact'))
+
+def test_compact_panel_dtypes_and_size(panels):
+    """Test that compact mode stores float32 prices, uint32 volume and int32 dates in ~55% of the memory"""
+    full, compact = panels
+    assert compact.close.dtype == np.float32 and compact.fields['volume'].dtype == np.uint32
+    assert compact.dates.dtype == np.int32
+
+    def size(panel):
+        return panel.dates.nbytes + sum(values.nbytes for values in panel.fields.values())
+    assert size(compact) / size(full) == pytest.approx((4 * 4 + 4 + 4) / (5 * 8 + 4))
+
+    present = ~np.isnan(full.fields['volume'])
+    assert np.array_equal(compact.fields['volume'][present], full.fields['volume'][present])
+    assert (compact.fields['volume'][~present] == 0).all()
+
+def test_indicator_accuracy_bounds(panels):
+    """Test RSI, MACD and SMA in float32 against float64 within the documented bounds"""
+    full, compact = panels
+    rsi = kernels.rsi_filled(compact.close, lengths=compact.lengths)
+    assert rsi.dtype == np.float32
+    assert np.nanmax(np.abs(rsi - kernels.rsi_filled(full.close, lengths=full.lengths))) < RSI_POINTS
+
+    for got, want in zip(kernels.macd_filled(compact.close, lengths=compact.lengths),
+                         kernels.macd_filled(full.close, lengths=full.lengths)):
+        assert np.nanmax(np.abs(got - want) / full.close) < MACD_OF_CLOSE
+
+    for window in kernels.MA_WINDOWS.values():
+        want = kernels.sma(full.close, window)
+        assert np.nanmax(np.abs(kernels.sma(compact.close, window) - want) / want) < SMA_RELATIVE
+
+    # A single series takes the scalar EMA path
+    j = 0
+    close = compact.close[-compact.lengths[j]:, j]
+    assert np.nanmax(np.abs(kernels.rsi_filled(close) - kernels.rsi_filled(full.close[-full.lengths[j]:, j]))) < RSI_POINTS
+
+def test_volume_saturates_instead_of_wrapping():
+    """Test that volumes beyond uint32 clamp to its maximum"""
+    volume = cast_field([1.4, np.nan, 2.0 ** 33], field_dtype('volume', 'compact'))
+    assert volume.tolist() == [1, 0, 2 ** 32 - 1]
+
+def test_published_panel_keeps_compact_dtypes(synthetic_db, monkeypatch):
+    """Test that the shared panel is published and mapped in compact mode"""
+    monkeypatch.setenv('PANEL_PRECISION', 'compact')
+    publish_panel(synthetic_db, 1)
+    shared = current_panel(synthetic_db)
+    assert shared.panel.close.dtype == np.float32
+    assert shared.latest['RSI'].dtype == np.float32
@@ -0,0 +1,105 @@
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from api.profiler import profiler
+from models.schemas import ProfilerSettings
+from scripts.metrics import stage
+from scripts.profiling import Profile, StackSampler, current_profile
+
+client = TestClient(app)
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    yield
+    profiler.settings = ProfilerSettings()
+    profiler.profiles.clear()
+
+def test_server_timing_breakdown(synthetic_db):
+    """Test that responses carry per-stage Server-Timing entries and a total"""
+    response = client.post("/api/screen", json={"RSI": {"below": 50}}, params={"limit": 5})
+    entries = dict(part.strip().split(";dur=") for part in response.headers["server-timing"].split(","))
+    assert {"db_read", "compute", "serialize", "total"} <= set(entries)
+    assert float(entries["total"]) >= float(entries["db_read"])
+
+    # Answered by the cache middleware, so nothing but the total
+    etag = response.headers["etag"]
+    cached = client.post("/api/screen", json={"RSI": {"below": 50}}, params={"limit": 5},
+                         headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["server-timing"].startswith("total;dur=")
+
+def test_stock_list_timing_and_empty_database(synthetic_db, monkeypatch, tmp_path):
+    """Test that /api/stocks reports its read and lists nothing for a database without prices"""
+    response = client.get("/api/stocks")
+    assert "db_read;dur=" in response.headers["server-timing"]
+    monkeypatch.setenv("STOCK_DB_PATH", str(tmp_path / "empty.db"))
+    response = client.get("/api/stocks")
+    assert (response.status_code, response.json()) == (200, [])
+
+def test_admin_gate(monkeypatch):
+    """Test that profiler endpoints need ADMIN_TOKEN set and sent"""
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.get("/api/admin/profiler").status_code == 403
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.get("/api/admin/profiler", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/api/admin/profiler", headers=ADMIN).status_code == 200
+
+def test_profile_on_demand(synthetic_db, admin):
+    """Test that an admin can profile one request and fetch the result by id"""
+    response = client.post("/api/screen", json={"RSI": {"below": 45}}, headers={"X-Profile": "1", **ADMIN})
+    profile_id = response.headers["x-profile-id"]
+    record = client.get(f"/api/admin/profiler/{profile_id}", headers=ADMIN).json()
+    assert record["path"] == "/api/screen" and record["forced"]
+    assert "db_read" in record["stages_ms"]
+    assert isinstance(record["stacks"], list)
+
+    # Without the token the header is ignored
+    response = client.post("/api/screen", json={"RSI": {"below": 45}}, headers={"X-Profile": "1"})
+    assert "x-profile-id" not in response.headers
+    assert client.get("/api/admin/profiler/missing", headers=ADMIN).status_code == 404
+
+def test_sampled_profiles_over_threshold(synthetic_db, admin):
+    """Test that sampled requests are kept only when slower than the threshold"""
+    client.put("/api/admin/profiler", json={"sample_rate": 1.0, "threshold_ms": 60000}, headers=ADMIN)
+    client.get("/api/stocks")
+    assert client.get("/api/admin/profiler", headers=ADMIN).json()["profiles"] == []
+
+    client.put("/api/admin/profiler", json={"sample_rate": 1.0, "threshold_ms": 0}, headers=ADMIN)
+    client.get("/api/stocks")
+    profiles = client.get("/api/admin/profiler", headers=ADMIN).json()["profiles"]
+    assert [p["path"] for p in profiles] == ["/api/stocks"]
+    assert client.put("/api/admin/profiler", json={"sample_rate": 2}, headers=ADMIN).status_code == 422
+    client.delete("/api/admin/profiler", headers=ADMIN)
+    assert client.get("/api/admin/profiler", headers=ADMIN).json()["profiles"] == []
+
+def test_sampler_collects_staged_threads():
+    """Test that only threads inside a stage of the profiled context are sampled"""
+    sampler = StackSampler(interval=0.001)
+    profile = Profile()
+
+    def busy_compute():
+        end = time.perf_counter() + 0.05
+        while time.perf_counter() < end:
+            pass
+
+    def staged():
+        current_profile.set(profile)
+        with stage("compute"):
+            busy_compute()
+        busy_compute()
+
+    sampler.start(profile)
+    worker = threading.Thread(target=staged)
+    worker.start()
+    worker.join()
+    sampler.stop(profile)
+    stacks = profile.top(5)
+    assert stacks and all("busy_compute" in s["stack"] for s in stacks)
+    assert all("staged" in s["stack"] for s in stacks)
+    # Samples stop once the stage is left, so the second busy loop adds little
+    assert sum(s["samples"] for s in stacks) < 100
@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+from fastapi.testclient import TestClient
+from main import app
+from api import live
+from api.live import hub
+from scripts import saved_screens
+from scripts.saved_screens import save_screen, get_screen, get_changes, refresh_and_publish
+from scripts.versioning import current_version
+
+client = TestClient(app)
+
+OVERSOLD = {"RSI": {"below": 30}}
+
+def _append_bars(db_path, symbol, change, bars=8):
+    """Append bars moving by `change` per day after the symbol's last bar"""
+    with sqlite3.connect(db_path) as conn:
+        last = conn.execute(
+            "SELECT date, close FROM stock_prices WHERE symbol = ? ORDER BY date DESC LIMIT 1", (symbol,)
+        ).fetchone()
+        close = last[1]
+        start = len(conn.execute("SELECT 1 FROM stock_prices WHERE symbol = ? AND date >= '2025'", (symbol,)).fetchall())
+        rows = []
+        for i in range(start + 1, start + bars + 1):
+            close *= 1 + change
+            rows.append((symbol, f"2025-01-{i + 1:02d}", close, close, close, close, 1000))
+        conn.executemany("INSERT INTO stock_prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+def _outside(db_path):
+    members = set(save_screen(db_path, "probe", OVERSOLD)["members"])
+    with sqlite3.connect(db_path) as conn:
+        saved_screens.delete_screen(conn, "probe")
+    return [s for s in client.get("/api/stocks").json() if s not in members]
+
+def test_refresh_records_entries_and_exits(synthetic_db):
+    """Test that an ingest updates saved members and history from the changed symbols only"""
+    target, untouched = _outside(synthetic_db)[:2]
+    saved = save_screen(synthetic_db, "oversold", OVERSOLD)
+    assert saved["version"] == 1
+
+    # Bars for `untouched` change too, but the ingest doesn't report it, so it isn't re-screened
+    _append_bars(synthetic_db, target, -0.08)
+    _append_bars(synthetic_db, untouched, -0.08)
+    assert refresh_and_publish(synthetic_db, [target])["version"] == 2
+
+    with sqlite3.connect(synthetic_db) as conn:
+        screen = get_screen(conn, "oversold")
+        assert target in screen["members"] and untouched not in screen["members"]
+        assert screen["since"][target] == 2
+        assert [(c["version"], c["symbol"], c["change"]) for c in get_changes(conn, "oversold")] == [
+            (2, target, "entered")]
+
+    _append_bars(synthetic_db, target, 0.08, bars=20)
+    refresh_and_publish(synthetic_db, [target])
+    with sqlite3.connect(synthetic_db) as conn:
+        assert target not in get_screen(conn, "oversold")["members"]
+        assert [(c["version"], c["change"]) for c in get_changes(conn, "oversold", since=2)] == [(3, "exited")]
+        assert len(get_changes(conn, "oversold", limit=1)) == 1
+
+def test_saved_screen_endpoints(synthetic_db, monkeypatch):
+    """Test creating, reading, listing and deleting saved screens over HTTP"""
+    response = client.post("/api/screens", json={"name": "oversold", "criteria": OVERSOLD})
+    assert response.status_code == 200
+    members = response.json()["members"]
+    assert members == client.post("/api/screen", json=OVERSOLD).json()["stocks"]
+
+    # Reads come from storage; nothing is re-screened
+    def fail(*args, **kwargs):
+        raise AssertionError("screen re-evaluated on read")
+    monkeypatch.setattr(saved_screens, "ScreenRun", fail)
+    assert client.get("/api/screens/oversold").json()["members"] == members
+    assert client.get("/api/screens").json() == [
+        {"name": "oversold", "criteria": OVERSOLD, "version": 1, "count": len(members)}]
+    assert client.get("/api/screens/oversold/changes?since=0").json() == {"name": "oversold", "changes": []}
+
+    assert client.post("/api/screens", json={"name": "bad", "criteria": {"RSI": {"below": "low"}}}).status_code == 400
+    assert client.get("/api/screens/missing").status_code == 404
+    assert client.get("/api/screens/missing/changes").status_code == 404
+    assert client.delete("/api/screens/oversold").status_code == 200
+    assert client.delete("/api/screens/oversold").status_code == 404
+
+def test_saved_screen_push(synthetic_db, monkeypatch):
+    """Test that WebSocket subscribers to a saved screen get the stored diff after an ingest"""
+    monkeypatch.setattr(hub, 'interval', 0.02)
+    target = _outside(synthetic_db)[0]
+    save_screen(synthetic_db, "oversold", OVERSOLD)
+    with client.websocket_connect("/api/ws") as ws:
+        ws.send_json({"action": "subscribe", "saved_screen": "missing"})
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"action": "subscribe", "saved_screen": "oversold"})
+        initial = ws.receive_json()
+        assert initial["type"] == "saved_screen" and target not in initial["members"]
+
+        _append_bars(synthetic_db, target, -0.08)
+        refresh_and_publish(synthetic_db, [target])
+        assert ws.receive_json() == {"type": "saved_screen_diff", "name": "oversold", "version": "2",
+                                     "entered": [target], "exited": []}
+
+def test_saved_screen_push_covers_skipped_versions(synthetic_db, monkeypatch):
+    """Test that entries from a version published between two polls are still pushed"""
+    monkeypatch.setattr(hub, 'interval', 0.02)
+    polling = threading.Lock()
+    def gated_version(db_path):
+        with polling:
+            return current_version(db_path)
+    monkeypatch.setattr(live, 'current_version', gated_version)
+    target, other = _outside(synthetic_db)[:2]
+    save_screen(synthetic_db, "oversold", OVERSOLD)
+    with client.websocket_connect("/api/ws") as ws:
+        ws.send_json({"action": "subscribe", "saved_screen": "oversold"})
+        assert ws.receive_json()["type"] == "saved_screen"
+
+        with polling:
+            _append_bars(synthetic_db, target, -0.08)
+            refresh_and_publish(synthetic_db, [target])
+            refresh_and_publish(synthetic_db, [other])
+        assert ws.receive_json() == {"type": "saved_screen_diff", "name": "oversold", "version": "3",
+                                     "entered": [target], "exited": []}
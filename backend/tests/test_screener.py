@@ -0,0 +1,124 @@
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from scripts.indicators import TechnicalIndicators
+from scripts.screener import ScreenRun, CrossSection, decode_cursor, validate_criteria
+
+client = TestClient(app)
+
+MALFORMED = [{"RSI": 30}, {"MACD": "bullish"}, {"MA": ["MA50"]}]
+
+def reference_screen(criteria):
+    """Per-symbol screen with TechnicalIndicators, as /api/screen used to run it"""
+    indicators = TechnicalIndicators()
+    if not criteria or criteria.get('show_all', False):
+        return indicators.get_all_stocks()
+    matches = []
+    for symbol in indicators.get_all_stocks():
+        df = indicators.get_stock_data(symbol)
+        ok = True
+        if 'RSI' in criteria:
+            rsi = indicators.calculate_rsi(df).iloc[-1]
+            if 'below' in criteria['RSI']:
+                ok = ok and rsi < criteria['RSI']['below']
+            if 'above' in criteria['RSI']:
+                ok = ok and rsi > criteria['RSI']['above']
+        if 'MACD' in criteria:
+            hist = indicators.calculate_macd(df)[2]
+            if criteria['MACD'].get('signal') == 'bullish':
+                ok = ok and hist.iloc[-1] > 0 and hist.iloc[-2] <= 0
+            elif criteria['MACD'].get('signal') == 'bearish':
+                ok = ok and hist.iloc[-1] < 0 and hist.iloc[-2] >= 0
+        if 'MA' in criteria:
+            mas = indicators.calculate_moving_averages(df)
+            for ma_type, condition in criteria['MA'].items():
+                if condition == 'price_above':
+                    ok = ok and df['close'].iloc[-1] > mas[ma_type].iloc[-1]
+                elif condition == 'price_below':
+                    ok = ok and df['close'].iloc[-1] < mas[ma_type].iloc[-1]
+        if ok:
+            matches.append(symbol)
+    return matches
+
+CRITERIA = [
+    {},
+    {"RSI": {"below": 50}},
+    {"RSI": {"above": 40, "below": 60}},
+    {"MACD": {"signal": "bullish"}},
+    {"MACD": {"signal": "bearish"}},
+    {"MA": {"MA50": "price_above"}},
+    {"MA": {"MA20": "price_below", "MA200": "price_above"}},
+    {"RSI": {"above": 30}, "MA": {"MA50": "price_above"}},
+]
+
+@pytest.mark.parametrize('criteria', CRITERIA)
+def test_matches_per_symbol_screen(synthetic_db, criteria):
+    """Test that the chunked vectorized screen matches the per-symbol screen"""
+    run = ScreenRun(synthetic_db, criteria, chunk=5)
+    matches = [record["symbol"] for record in run]
+    assert sorted(matches) == sorted(reference_screen(criteria))
+    assert run.summary()["scanned"] == 12
+    assert run.summary()["matched"] == len(matches)
+
+def test_match_records_carry_screened_indicators(synthetic_db):
+    """Test that each match reports its price, date and the screened indicators"""
+    indicators = TechnicalIndicators()
+    record = next(iter(ScreenRun(synthetic_db, {"RSI": {"below": 100}})))
+    df = indicators.get_stock_data(record["symbol"])
+    assert record["price"] == pytest.approx(df['close'].iloc[-1])
+    assert record["date"] == df['date'].iloc[-1].strftime('%Y-%m-%d')
+    assert list(record["indicators"]) == ["RSI"]
+    assert record["indicators"]["RSI"] == pytest.approx(indicators.calculate_rsi(df).iloc[-1])
+
+def test_invalid_criteria_rejected():
+    """Test that malformed criteria fail before any scanning"""
+    with pytest.raises(ValueError):
+        validate_criteria({"RSI": {"below": "low"}})
+    with pytest.raises(ValueError):
+        validate_criteria({"MACD": {"signal": "sideways"}})
+    with pytest.raises(ValueError):
+        validate_criteria({"MA": {"MA50": "near"}})
+
+@pytest.mark.parametrize("criteria", MALFORMED)
+def test_criteria_entries_must_be_objects(synthetic_db, criteria):
+    """Test that an indicator entry that isn't an object is a 400 on every endpoint taking criteria"""
+    with pytest.raises(ValueError, match="must be an object"):
+        validate_criteria(criteria)
+    assert client.post("/api/screen", json=criteria).status_code == 400
+    assert client.post("/api/screen/stream", json=criteria).status_code == 400
+    assert client.post("/api/export", json={"criteria": criteria}).status_code == 400
+    assert client.post("/api/screens", json={"name": "bad", "criteria": criteria}).status_code == 400
+
+def test_cross_section_pages_follow_full_sort(synthetic_db):
+    """Test that walking pages gives the fully sorted matches, ties broken by symbol"""
+    section = ScreenRun(synthetic_db, {"RSI": {"below": 100}}).cross_section()
+    assert len(section) == 12
+    rsi = section.columns['RSI']
+    for sort_by, expected in [
+        ("RSI", sorted(range(12), key=lambda j: (rsi[j], section.symbols[j]))),
+        ("-RSI", sorted(range(12), key=lambda j: (-rsi[j], section.symbols[j]))),
+        (None, sorted(range(12), key=lambda j: section.symbols[j])),
+        ("-symbol", sorted(range(12), key=lambda j: section.symbols[j], reverse=True)),
+    ]:
+        walked, cursor = [], None
+        while True:
+            rows, cursor = section.page(5, sort_by, cursor)
+            walked.extend(rows.tolist())
+            if cursor is None:
+                break
+        assert walked == expected
+
+def test_top_k_with_ties_and_missing_values():
+    """Test that top-K keeps ties in symbol order and puts missing values last"""
+    import numpy as np
+    values = np.array([3.0, 1.0, np.nan, 1.0, 2.0, 1.0])
+    section = CrossSection(list("FEDCBA"), [None] * 6, {'RSI': values}, {})
+    rows, cursor = section.page(2, "RSI")
+    assert section.symbols[rows].tolist() == ["A", "C"]
+    rows, cursor = section.page(2, "RSI", cursor)
+    assert section.symbols[rows].tolist() == ["E", "B"]
+    rows, cursor = section.page(2, "RSI", cursor)
+    assert section.symbols[rows].tolist() == ["F", "D"]
+    assert cursor is None
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scripts.indicators import TechnicalIndicators
+from scripts.panel import FIELDS, NO_DATE, PriceSeries, day_strings, load_panel, to_days
+from scripts.synthetic import symbol_names
+
+def test_day_numbers_round_trip():
+    """Test that dates become int32 day numbers and padding maps to None"""
+    days = to_days(['2024-02-29', None, np.datetime64('1970-01-01')])
+    assert days.dtype == np.int32
+    assert days.tolist() == [19782, NO_DATE, 0]
+    assert day_strings(days) == ['2024-02-29', None, '1970-01-01']
+
+def test_slicing_is_zero_copy(synthetic_db):
+    """Test that panel columns and date ranges are views, not copies"""
+    panel = load_panel(synthetic_db, symbol_names(12)[:3], FIELDS)
+    series = panel.series(panel.symbols[1])
+    assert len(series) == panel.lengths[1]
+    assert np.shares_memory(series.close, panel.close)
+
+    window = series.between('2024-06-03', '2024-06-28')
+    assert np.shares_memory(window.dates, panel.dates)
+    assert day_strings(window.dates[[0, -1]]) == ['2024-06-03', '2024-06-28']
+    assert len(series.between('2030-01-01')) == 0
+    with pytest.raises(TypeError):
+        series[[0, 1]]
+
+def test_indicators_match_pandas_engine(synthetic_db):
+    """Test that PriceSeries kernels give TechnicalIndicators' values and take less memory"""
+    indicators = TechnicalIndicators(synthetic_db)
+    symbol = symbol_names(12)[4]
+    df = indicators.get_stock_data(symbol)
+    series = load_panel(synthetic_db, [symbol], FIELDS).series(symbol)
+
+    np.testing.assert_allclose(series.rsi(), indicators.calculate_rsi(df), rtol=1e-9)
+    for got, want in zip(series.macd(), indicators.calculate_macd(df)):
+        np.testing.assert_allclose(got, want, rtol=1e-9, atol=1e-12)
+    for name, values in series.moving_averages().items():
+        np.testing.assert_allclose(values, indicators.calculate_moving_averages(df)[name], rtol=1e-9)
+    assert series.last_date() == df['date'].iloc[-1].strftime('%Y-%m-%d')
+
+    series_bytes = series.dates.nbytes + sum(values.nbytes for values in series.fields.values())
+    assert series_bytes < df.memory_usage(index=True, deep=True).sum()
+
+def test_from_yahoo_frame():
+    """Test building a series from a yfinance frame with a tz-aware index"""
+    index = pd.date_range('2024-01-02', periods=3, freq='B', tz='Europe/Stockholm', name='Date')
+    df = pd.DataFrame({'Open': [1.0, 2, 3], 'High': [1.0, 2, 3], 'Low': [1.0, 2, 3], 'Close': [1.0, 2, 3],
+                       'Volume': [10, 20, 30], 'Dividends': 0.0}, index=index)
+    series = PriceSeries.from_frame(df, 'TEST.ST')
+    assert set(series.fields) == set(FIELDS)
+    assert series.close.flags.c_contiguous
+    assert series.last_date() == '2024-01-04'
+    assert series[1:].close.tolist() == [2.0, 3.0]
@@ -0,0 +1,83 @@
+import multiprocessing
+import sqlite3
+import numpy as np
+import pytest
+from scripts.panel import FIELDS, load_panel
+from scripts.saved_screens import refresh_and_publish
+from scripts.screener import ScreenRun, evaluate, all_symbols
+from scripts.shared_panel import KEEP_VERSIONS, attach, current_panel, panel_dir
+from scripts.versioning import publish
+
+CRITERIA = [
+    {"RSI": {"below": 50}},
+    {"RSI": {"above": 55}},
+    {"MACD": {"signal": "bullish"}},
+    {"MACD": {"signal": "bearish"}},
+    {"MA": {"MA20": "price_above", "MA50": "price_below"}},
+]
+
+def test_take_matches_sqlite(synthetic_db):
+    """Test that shared panel columns and latest values match a fresh SQLite load"""
+    shared = current_panel(synthetic_db)
+    assert shared is not None
+    symbols = all_symbols(synthetic_db)[::3]
+    panel, latest = shared.take(symbols)
+    fresh = load_panel(synthetic_db, symbols, FIELDS)
+    assert panel.symbols == fresh.symbols
+    assert np.array_equal(panel.lengths, fresh.lengths)
+    for field in FIELDS:
+        np.testing.assert_array_equal(panel.fields[field], fresh.fields[field])
+    for criteria in CRITERIA:
+        expected = evaluate(fresh, criteria, ("RSI", "MACD", "MA"))
+        result = evaluate(panel, criteria, ("RSI", "MACD", "MA"), latest)
+        assert np.array_equal(result["match"], expected["match"]), criteria
+        np.testing.assert_allclose(result["values"]["RSI"], expected["values"]["RSI"], rtol=1e-9)
+
+def test_chunks_are_read_only_views(synthetic_db):
+    """Test that consecutive symbols are taken as views of the read-only mapping"""
+    shared = current_panel(synthetic_db)
+    panel, _ = shared.take(shared.panel.symbols[2:7])
+    assert np.shares_memory(panel.close, shared.panel.close)
+    assert not panel.close.flags.writeable
+    with pytest.raises(ValueError):
+        panel.close[-1, 0] = 0.0
+
+def test_version_swap(synthetic_db):
+    """Test that readers move to a newly published panel and ignore one that lags the data"""
+    first = current_panel(synthetic_db)
+    symbol = first.panel.symbols[0]
+    with sqlite3.connect(synthetic_db) as conn:
+        conn.execute("INSERT INTO stock_prices VALUES (?, '2030-01-02', 1, 1, 1, 1, 10)", (symbol,))
+
+    # A version published without a panel makes the mapped one stale
+    publish(synthetic_db, [symbol])
+    assert current_panel(synthetic_db) is None
+    matches = [r["symbol"] for r in ScreenRun(synthetic_db, {"RSI": {"below": 101}})]
+    assert symbol in matches
+
+    for _ in range(KEEP_VERSIONS + 1):
+        refresh_and_publish(synthetic_db, [symbol])
+    second = current_panel(synthetic_db)
+    assert second is not first and second.version == "5"
+    assert second.panel.latest_dates()[0] == "2030-01-02"
+    # The old mapping stays usable after its files are pruned
+    assert first.panel.latest_dates()[0] != "2030-01-02"
+    assert len([p for p in panel_dir(synthetic_db).glob("v*")]) == KEEP_VERSIONS
+
+def _worker_view(db_path, queue):
+    shared = attach(db_path)
+    queue.put((shared.version, float(np.nansum(shared.panel.close)), type(shared.panel.close.base).__name__))
+
+def test_workers_share_one_panel(synthetic_db):
+    """Test that separate processes map the same published panel"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    workers = [context.Process(target=_worker_view, args=(synthetic_db, queue)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    views = [queue.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join()
+    shared = attach(synthetic_db)
+    expected = (shared.version, float(np.nansum(shared.panel.close)), "mmap")
+    assert views == [expected, expected]
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+import pytest
+from api.singleflight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_run():
+    """Test that concurrent callers with the same key run the work once"""
+    group = SingleFlight("test")
+    runs = []
+
+    def work(value):
+        runs.append(threading.get_ident())
+        time.sleep(0.05)
+        return {"value": value}
+
+    results = await asyncio.gather(*[group.do("key", work, 1) for _ in range(10)])
+    assert len(runs) == 1
+    assert all(result is results[0] for result in results)
+    assert (group.calls, group.shared) == (1, 9)
+    assert group.in_flight() == 0
+
+    # Different keys run independently, and finished keys run again
+    await asyncio.gather(group.do("key", work, 2), group.do("other", work, 3))
+    assert len(runs) == 3
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    """Test that an exception is raised to all callers sharing the run"""
+    group = SingleFlight("test")
+
+    def fail():
+        time.sleep(0.02)
+        raise ValueError("upstream down")
+
+    results = await asyncio.gather(*[group.do("key", fail) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert group.calls == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_others():
+    """Test that one caller going away leaves the shared run going for the rest"""
+    group = SingleFlight("test")
+
+    def work():
+        time.sleep(0.05)
+        return 42
+
+    first = asyncio.ensure_future(group.do("key", work))
+    second = asyncio.ensure_future(group.do("key", work))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == 42
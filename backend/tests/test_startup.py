@@ -0,0 +1,15 @@
+from scripts.benchmark import import_cost
+
+def test_app_import_skips_heavy_modules():
+    """Test that importing the app loads no pandas, yfinance, ta or pyarrow and configures no logging"""
+    for module in ('main', 'api.endpoints', 'scripts.screener'):
+        cost = import_cost(module)
+        assert cost['heavy'] == [], module
+        assert cost['handlers'] == 0, module
+
+def test_scripts_import_without_side_effects():
+    """Test that ingestion and command-line modules only do work when called"""
+    assert 'yfinance' not in import_cost('scripts.backfill')['heavy']
+    assert 'yfinance' not in import_cost('scripts.database')['heavy']
+    for module in ('scripts.fetch_data', 'scripts.fetch_tickers', 'scripts.view_tables', 'scripts.init_db'):
+        assert import_cost(module)['handlers'] == 0, module
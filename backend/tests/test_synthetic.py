@@ -0,0 +1,50 @@
+import sqlite3
+import pandas as pd
+from scripts.synthetic import generate_panel, iter_panel
+from scripts.validation import validate_prices
+from scripts.indicators import TechnicalIndicators
+from scripts.benchmark import run
+
+def test_generator_is_deterministic():
+    """Test that the same seed gives the same panel regardless of chunking"""
+    whole = generate_panel(n_symbols=5, years=1, seed=3)
+    chunked = pd.concat(list(iter_panel(5, 1, seed=3, chunk_symbols=2)), ignore_index=True)
+    pd.testing.assert_frame_equal(whole, chunked)
+
+    # Adding symbols doesn't change the existing ones
+    larger = generate_panel(n_symbols=8, years=1, seed=3)
+    pd.testing.assert_frame_equal(larger.iloc[:len(whole)], whole)
+
+    assert not generate_panel(n_symbols=5, years=1, seed=4).equals(whole)
+
+def test_generated_bars_are_valid():
+    """Test that generated bars pass data-quality validation"""
+    panel = generate_panel(n_symbols=20, years=2)
+    valid, rejected = validate_prices(panel)
+    assert rejected.empty
+    assert (panel['high'] >= panel[['open', 'close']].max(axis=1)).all()
+    assert (panel['low'] <= panel[['open', 'close']].min(axis=1)).all()
+
+def test_every_store_is_written(synthetic_db):
+    """Test that the synthetic database fills every store"""
+    with sqlite3.connect(synthetic_db) as conn:
+        count = lambda table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        assert count('stock_prices') == 12 * 378
+        assert count('daily_prices') == 12 * 378
+        assert count('stocks') == 12
+        assert count('latest_close') == 12
+
+    indicators = TechnicalIndicators()
+    stocks = indicators.get_all_stocks()
+    assert len(stocks) == 12
+    df = indicators.get_stock_data(stocks[0])
+    assert pd.api.types.is_integer_dtype(df['volume'])
+    assert 0 <= indicators.calculate_rsi(df).iloc[-1] <= 100
+
+def test_benchmark_suite_runs_offline(synthetic_db):
+    """Test that every benchmark produces results on a tiny universe"""
+    results = run(['ingest', 'panel', 'indicators', 'screen', 'api'], symbols=12, years=1.5,
+                  sample=3, repeat=2, db_path=synthetic_db)
+    names = {r['name'] for r in results}
+    assert {'ingest.all_stores', 'panel.get_stock_data', 'indicators.rsi', 'screen.rsi_below_50', 'api.screen'} <= names
+    assert all(r['throughput'] > 0 for r in results)
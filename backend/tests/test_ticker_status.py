@@ -0,0 +1,59 @@
+import sqlite3
+import pytest
+from datetime import datetime, timedelta
+from scripts.ticker_status import (
+    create_ticker_status_table, record_failure, record_success, filter_tickers, backoff
+)
+
+@pytest.fixture
+def conn():
+    """Create an in-memory database with the ticker status registry"""
+    conn = sqlite3.connect(':memory:')
+    create_ticker_status_table(conn)
+    yield conn
+    conn.close()
+
+def test_failed_ticker_is_skipped_until_ttl(conn):
+    """Test that a failed ticker is skipped until its TTL expires"""
+    now = datetime(2025, 1, 1)
+    record_failure(conn, 'DEAD.ST', 'no_data', now=now)
+
+    to_fetch, skipped = filter_tickers(conn, ['DEAD.ST', 'LIVE.ST'], now=now + timedelta(days=1))
+    assert to_fetch == ['LIVE.ST']
+    assert skipped == ['DEAD.ST']
+
+    to_fetch, skipped = filter_tickers(conn, ['DEAD.ST', 'LIVE.ST'], now=now + timedelta(days=4))
+    assert to_fetch == ['DEAD.ST', 'LIVE.ST']
+
+def test_backoff_escalates_and_caps(conn):
+    """Test that repeated failures double the TTL up to the cap"""
+    now = datetime(2025, 1, 1)
+    first = record_failure(conn, 'DEAD.ST', 'delisted', now=now)
+    second = record_failure(conn, 'DEAD.ST', 'delisted', now=now)
+    assert first - now == timedelta(days=30)
+    assert second - now == timedelta(days=60)
+    assert backoff('delisted', 50) == timedelta(days=365)
+
+def test_success_and_new_reason_reset_backoff(conn):
+    """Test that success clears the backoff and a new reason restarts it"""
+    now = datetime(2025, 1, 1)
+    record_failure(conn, 'FLAKY.ST', 'error', now=now)
+    record_failure(conn, 'FLAKY.ST', 'error', now=now)
+    retry = record_failure(conn, 'FLAKY.ST', 'no_data', now=now)
+    assert retry - now == timedelta(days=3)
+
+    record_success(conn, 'FLAKY.ST', now=now)
+    to_fetch, _ = filter_tickers(conn, ['FLAKY.ST'], now=now)
+    assert to_fetch == ['FLAKY.ST']
+
+def test_failures_survive_database_setup(tmp_path, monkeypatch):
+    """Test that setting up the fetch database again keeps the failure registry"""
+    from scripts import database
+    monkeypatch.setattr(database, 'DB_FILE', tmp_path / 'stock_data.db')
+    database.create_database()
+    with sqlite3.connect(database.DB_FILE) as conn:
+        record_failure(conn, 'DEAD.ST', 'delisted')
+    database.create_database()
+    database.create_database(rebuild=True)
+    with sqlite3.connect(database.DB_FILE) as conn:
+        assert filter_tickers(conn, ['DEAD.ST', 'LIVE.ST']) == (['LIVE.ST'], ['DEAD.ST'])
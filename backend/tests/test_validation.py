@@ -0,0 +1,92 @@
+import sqlite3
+import pytest
+import pandas as pd
+import numpy as np
+from scripts.validation import validate_prices, quarantine, create_quarantine_table, QualityReport
+
+@pytest.fixture
+def bars():
+    """Create a clean two-symbol batch of bars"""
+    dates = pd.date_range(start='2024-01-01', periods=10, freq='B')
+    frames = []
+    for symbol in ['AAA.ST', 'BBB.ST']:
+        close = np.linspace(100, 110, len(dates))
+        frames.append(pd.DataFrame({
+            'symbol': symbol,
+            'date': dates,
+            'open': close - 0.5,
+            'high': close + 1,
+            'low': close - 1,
+            'close': close,
+            'volume': np.full(len(dates), 1000)
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def test_clean_batch_passes(bars):
+    """Test that valid bars are untouched"""
+    valid, rejected = validate_prices(bars)
+    assert len(valid) == len(bars)
+    assert rejected.empty
+
+def test_bad_bars_are_flagged(bars):
+    """Test each rejection reason"""
+    bars.loc[1, 'close'] = np.nan
+    bars.loc[2, 'volume'] = 0
+    bars.loc[4, ['close', 'high']] = bars.loc[4, 'close'] * 20
+    bars.loc[6, 'date'] = bars.loc[5, 'date']
+    bars.loc[8, 'date'] = bars.loc[2, 'date'] - pd.Timedelta(days=7)
+    bars.loc[12, 'low'] = bars.loc[12, 'high'] + 1
+
+    valid, rejected = validate_prices(bars)
+    reasons = dict(zip(rejected.index, rejected['reason']))
+    assert 'nan_close' in reasons[1]
+    assert reasons[2] == 'zero_volume'
+    assert reasons[4] == 'price_spike'
+    assert reasons[6] == 'duplicate_date'
+    assert reasons[8] == 'non_monotonic_date'
+    assert 'inconsistent_ohlc' in reasons[12]
+    assert len(valid) == len(bars) - 6
+
+def test_open_outside_range_is_inconsistent(bars):
+    """Test that an open above the high or below the low is rejected"""
+    bars.loc[3, 'open'] = bars.loc[3, 'high'] + 1
+    bars.loc[13, 'open'] = bars.loc[13, 'low'] - 1
+    valid, rejected = validate_prices(bars)
+    assert dict(zip(rejected.index, rejected['reason'])) == {3: 'inconsistent_ohlc', 13: 'inconsistent_ohlc'}
+
+def test_checks_do_not_cross_symbols(bars):
+    """Test that a jump at a symbol boundary is not a spike"""
+    bars.loc[bars['symbol'] == 'BBB.ST', ['open', 'high', 'low', 'close']] *= 20
+    valid, rejected = validate_prices(bars)
+    assert rejected.empty
+
+def test_level_shift_is_not_a_spike(bars):
+    """Test that a persistent jump (e.g. an unrecorded split) is kept"""
+    bars.loc[5:9, ['open', 'high', 'low', 'close']] /= 20
+    valid, rejected = validate_prices(bars)
+    assert rejected.empty
+
+def test_jump_on_last_bar_is_kept(bars):
+    """Test that a jump on a symbol's newest bar (e.g. a reverse split) is not quarantined"""
+    last = bars.index[bars['symbol'] == 'AAA.ST'][-1]
+    bars.loc[last, ['open', 'high', 'low', 'close']] *= 20
+    bars.loc[len(bars) - 1, ['open', 'high', 'low', 'close']] /= 20
+    valid, rejected = validate_prices(bars)
+    assert rejected.empty
+
+def test_quarantine_and_report(bars):
+    """Test that rejected rows are stored with reasons and counted"""
+    bars.loc[3, 'volume'] = 0
+    report = QualityReport()
+    valid, rejected = report.check(bars)
+
+    with sqlite3.connect(':memory:') as conn:
+        create_quarantine_table(conn)
+        quarantine(conn, rejected)
+        rows = conn.execute("SELECT symbol, reason FROM price_quarantine").fetchall()
+    assert rows == [('AAA.ST', 'zero_volume')]
+
+    summary = report.summary()
+    assert summary['rows_checked'] == len(bars)
+    assert summary['rows_quarantined'] == 1
+    assert summary['reasons'] == {'zero_volume': 1}
@@ -0,0 +1,97 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from scripts.synthetic import generate_symbol
+from scripts.work_queue import (
+    connect, create_work_queue_tables, create_job, claim, complete, fail, progress, MAX_ATTEMPTS, RETRY_DELAY
+)
+from scripts.backfill import enqueue, encode_history, run, run_worker, run_writer
+from scripts.versioning import current_version
+
+def fake_history(symbol, start_date, end_date):
+    """Yahoo-shaped bars for synthetic symbols; DEAD.ST has none and FLAKY.ST always errors"""
+    if symbol == 'DEAD.ST':
+        return pd.DataFrame()
+    if symbol == 'FLAKY.ST':
+        raise ConnectionError('Read timed out')
+    bars = generate_symbol(sum(map(ord, symbol)), 60)
+    dates = pd.bdate_range(end=end_date, periods=60, name='Date')
+    return pd.DataFrame({'Open': bars['open'], 'High': bars['high'], 'Low': bars['low'],
+                         'Close': bars['close'], 'Volume': bars['volume'],
+                         'Dividends': 0.0, 'Stock Splits': 0.0}, index=dates)
+
+@pytest.fixture
+def conn(tmp_path):
+    """Create a queue database with one job of three symbols"""
+    conn = connect(tmp_path / 'queue.db')
+    create_work_queue_tables(conn)
+    create_job(conn, 'job', '2024-01-01', '2024-12-31', ['A.ST', 'B.ST', 'C.ST'])
+    yield conn
+    conn.close()
+
+def test_claims_are_exclusive_until_the_lease_expires(conn):
+    """Test that a leased item is only reclaimed after its lease runs out"""
+    assert claim(conn, 'job', 'w1', 2, lease=10, now=100) == ['A.ST', 'B.ST']
+    assert claim(conn, 'job', 'w2', 5, lease=10, now=105) == ['C.ST']
+    assert claim(conn, 'job', 'w2', 5, lease=10, now=109) == []
+
+    # w1 crashed: its items go to w2 and w1 can no longer complete them
+    assert claim(conn, 'job', 'w2', 5, lease=10, now=111) == ['A.ST', 'B.ST']
+    assert not complete(conn, 'job', 'A.ST', 'w1', b'late')
+    assert complete(conn, 'job', 'A.ST', 'w2', b'bars')
+    assert progress(conn, 'job') == {'fetched': 1, 'leased': 2}
+
+def test_requeue_is_resumable(conn):
+    """Test that enqueueing a job again only adds new symbols"""
+    assert create_job(conn, 'job', '2024-01-01', '2024-12-31', ['A.ST', 'D.ST']) == 1
+    assert progress(conn, 'job') == {'pending': 4}
+
+def test_transient_errors_back_off_then_fail(conn):
+    """Test that errors are retried with growing delays and permanent failures are not"""
+    create_job(conn, 'retry', '2024-01-01', '2024-12-31', ['DEAD.ST', 'FLAKY.ST'])
+    now = 1000.0
+    assert claim(conn, 'retry', 'w', 1, now=now) == ['DEAD.ST']
+    assert not fail(conn, 'retry', 'DEAD.ST', 'w', 'delisted', now=now)
+    for attempt in range(1, MAX_ATTEMPTS):
+        assert claim(conn, 'retry', 'w', 1, now=now) == ['FLAKY.ST']
+        assert fail(conn, 'retry', 'FLAKY.ST', 'w', 'error', 'timeout', now=now)
+        now += RETRY_DELAY * 2 ** (attempt - 1)
+        assert claim(conn, 'retry', 'w', 1, now=now - 1) == []
+    assert claim(conn, 'retry', 'w', 1, now=now) == ['FLAKY.ST']
+    assert not fail(conn, 'retry', 'FLAKY.ST', 'w', 'error', 'timeout', now=now)
+    assert progress(conn, 'retry') == {'failed': 2}
+
+def test_backfill_writes_fetched_bars_and_records_failures(tmp_path):
+    """Test a full run with two worker processes against the stock_prices store"""
+    db_path = tmp_path / 'backfill.db'
+    symbols = ['A.ST', 'B.ST', 'C.ST', 'D.ST', 'DEAD.ST']
+    stats = run(db_path, 'job', symbols, '2024-01-01', '2024-12-31', workers=2, fetch=fake_history)
+
+    assert sorted(stats['symbols']) == ['A.ST', 'B.ST', 'C.ST', 'D.ST']
+    assert stats['failures'] == 1
+    with sqlite3.connect(db_path) as db:
+        counts = dict(db.execute('SELECT symbol, COUNT(*) FROM stock_prices GROUP BY symbol'))
+        status = db.execute("SELECT status FROM ticker_status WHERE symbol = 'DEAD.ST'").fetchone()
+        queue = dict(db.execute('SELECT status, COUNT(*) FROM work_queue GROUP BY status'))
+    assert sum(counts.values()) == stats['rows'] == 240
+    assert status == ('no_data',)
+    assert queue == {'done': 4, 'abandoned': 1}
+    assert current_version(db_path)['version'] == '1'
+
+def test_fetched_work_survives_a_crash(tmp_path):
+    """Test that a download staged before the writer ran is written by a later writer"""
+    db_path = tmp_path / 'crash.db'
+    enqueue(db_path, 'job', ['A.ST'], '2024-01-01', '2024-12-31')
+    conn = connect(db_path)
+    claim(conn, 'job', 'w', 1)
+    complete(conn, 'job', 'A.ST', 'w', encode_history('A.ST', fake_history('A.ST', None, '2024-12-31')))
+    conn.close()
+
+    # Nothing is left to fetch, so a restarted worker exits at once
+    assert run_worker(db_path, 'job', fetch=fake_history) == 0
+    stats = run_writer(db_path, 'job')
+    assert stats['symbols'] == ['A.ST']
+    with sqlite3.connect(db_path) as db:
+        closes = [row[0] for row in db.execute("SELECT close FROM stock_prices WHERE symbol = 'A.ST' ORDER BY date")]
+    np.testing.assert_allclose(closes, fake_history('A.ST', None, '2024-12-31')['Close'])
@@ -1,12 +1,28 @@
 import React, { useEffect, useRef } from 'react';
 import { createChart } from 'lightweight-charts';
 
-const Chart = ({ data, indicators }) => {
+// Build lightweight-charts points from the history endpoint's parallel arrays
+const toCandles = (history) =>
+  history.date.map((time, i) => ({
+    time,
+    open: history.open[i],
+    high: history.high[i],
+    low: history.low[i],
+    close: history.close[i],
+  }));
+
+const toLine = (dates, values) =>
+  dates
+    .map((time, i) => ({ time, value: values[i] }))
+    .filter((point) => point.value !== null);
+
+const Chart = ({ data, history, indicators }) => {
   const chartContainerRef = useRef();
   const chartRef = useRef();
 
   useEffect(() => {
-    if (!data || data.length === 0) return;
+    const candles = history ? toCandles(history) : data;
+    if (!candles || candles.length === 0) return;
 
     // Create chart
     const chart = createChart(chartContainerRef.current, {
@@ -24,13 +40,17 @@ const Chart = ({ data, indicators }) => {
 
     // Add candlestick series
     const candlestickSeries = chart.addCandlestickSeries();
-    candlestickSeries.setData(data);
+    candlestickSeries.setData(candles);
 
     // Add indicators if selected
     if (indicators.includes('MA')) {
       const ma20Series = chart.addLineSeries({ color: '#2962FF' });
       const ma50Series = chart.addLineSeries({ color: '#FF6D00' });
-      // Add MA data...
+      const mas = history?.indicators?.MA;
+      if (mas) {
+        ma20Series.setData(toLine(history.date, mas.MA20));
+        ma50Series.setData(toLine(history.date, mas.MA50));
+      }
     }
 
     // Store chart reference
@@ -40,7 +60,7 @@ const Chart = ({ data, indicators }) => {
     return () => {
       chart.remove();
     };
-  }, [data, indicators]);
+  }, [data, history, indicators]);
 
   return <div ref={chartContainerRef} />;
 };
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { screenStocks, getStockData } from '../services/api';
+import { streamScreen, getStockData } from '../services/api';
 
 const StockList = ({ selectedIndicators }) => {
   const [stocks, setStocks] = useState([]);
@@ -9,20 +9,29 @@ const StockList = ({ selectedIndicators }) => {
   const [stockDetails, setStockDetails] = useState(null);
 
   useEffect(() => {
+    let cancelled = false;
     const fetchStocks = async () => {
       setLoading(true);
       setError(null);
+      setStocks([]);
       try {
-        const response = await screenStocks(selectedIndicators);
-        setStocks(response.stocks || []);
+        // Show matches as they stream in instead of waiting for the whole universe
+        await streamScreen(selectedIndicators, (match) => {
+          if (cancelled) return;
+          setStocks((previous) => [...previous, match.symbol]);
+          setLoading(false);
+        });
       } catch (err) {
-        setError('Failed to fetch stocks: ' + err.message);
+        if (!cancelled) setError('Failed to fetch stocks: ' + err.message);
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
     };
 
     fetchStocks();
+    return () => {
+      cancelled = true;
+    };
   }, [selectedIndicators]);
 
   const handleStockClick = async (symbol) => {
@@ -30,8 +30,63 @@ export const analyzeStock = async (symbol, indicators) => {
   return response.json();
 };
 
+// Last screen result per criteria, revalidated with its ETag (browsers don't cache POSTs)
+const screenCache = new Map();
+
 export const screenStocks = async (criteria) => {
+  const body = JSON.stringify(criteria);
+  const cached = screenCache.get(body);
   const response = await fetch(`${API_BASE_URL}/screen`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      ...(cached ? { 'If-None-Match': cached.etag } : {}),
+    },
+    body,
+  });
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+  if (!response.ok) {
+    throw new Error('Failed to screen stocks');
+  }
+  const data = await response.json();
+  const etag = response.headers.get('ETag');
+  if (etag) {
+    screenCache.set(body, { etag, data });
+  }
+  return data;
+};
+
+export const getStocksBatch = async (symbols, indicators = ['RSI', 'MACD', 'MA']) => {
+  const response = await fetch(`${API_BASE_URL}/stocks/batch`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ symbols, indicators }),
+  });
+  if (!response.ok) {
+    throw new Error('Failed to fetch batch stock data');
+  }
+  return response.json();
+};
+
+export const getStockHistory = async (symbol, { start, end, indicators = ['MA'], points = 500 } = {}) => {
+  const params = new URLSearchParams({ indicators: indicators.join(','), points });
+  if (start) params.set('start', start);
+  if (end) params.set('end', end);
+  const response = await fetch(`${API_BASE_URL}/stocks/${symbol}/history?${params}`);
+  if (!response.ok) {
+    throw new Error(`Failed to fetch history for ${symbol}`);
+  }
+  return response.json();
+};
+
+// Screen with results streamed as NDJSON; onMatch runs for each match as it arrives.
+// Resolves with the final summary record ({ scanned, matched, errors, elapsed }).
+export const streamScreen = async (criteria, onMatch) => {
+  const response = await fetch(`${API_BASE_URL}/screen/stream`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
@@ -41,5 +96,73 @@ export const screenStocks = async (criteria) => {
   if (!response.ok) {
     throw new Error('Failed to screen stocks');
   }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let summary = null;
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (!line) continue;
+      const record = JSON.parse(line);
+      if (record.type === 'summary') {
+        summary = record;
+      } else {
+        onMatch(record);
+      }
+    }
+    if (done) break;
+  }
+  return summary;
+};
+
+// Named screens kept up to date by each ingest
+export const saveScreen = async (name, criteria) => {
+  const response = await fetch(`${API_BASE_URL}/screens`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ name, criteria }),
+  });
+  if (!response.ok) {
+    throw new Error('Failed to save screen');
+  }
   return response.json();
 };
+
+export const getSavedScreen = async (name) => {
+  const response = await fetch(`${API_BASE_URL}/screens/${encodeURIComponent(name)}`);
+  if (!response.ok) {
+    throw new Error('Failed to fetch saved screen');
+  }
+  return response.json();
+};
+
+export const getSavedScreenChanges = async (name, since = 0) => {
+  const response = await fetch(`${API_BASE_URL}/screens/${encodeURIComponent(name)}/changes?since=${since}`);
+  if (!response.ok) {
+    throw new Error('Failed to fetch saved screen changes');
+  }
+  return response.json();
+};
+
+// Live updates after each data publish. screens are { id, criteria } objects and
+// savedScreens are names. onMessage receives snapshot, update, screen, screen_diff,
+// saved_screen and saved_screen_diff messages; call the returned function to close
+// the connection.
+export const subscribeUpdates = ({ symbols = [], screens = [], savedScreens = [] }, onMessage) => {
+  const socket = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws')}/ws`);
+  socket.onopen = () => {
+    if (symbols.length) {
+      socket.send(JSON.stringify({ action: 'subscribe', symbols }));
+    }
+    screens.forEach((screen) => socket.send(JSON.stringify({ action: 'subscribe', screen })));
+    savedScreens.forEach((name) => socket.send(JSON.stringify({ action: 'subscribe', saved_screen: name })));
+  };
+  socket.onmessage = (event) => onMessage(JSON.parse(event.data));
+  return () => socket.close();
+};